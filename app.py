@@ -1,30 +1,237 @@
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for
+from flask import Flask, render_template, request, jsonify, session, redirect, url_for, g
 from flask_session import Session
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
-from google.oauth2 import id_token
-from google.auth.transport import requests as google_requests
-import random
+import atexit
 import os
+import base64
+import gzip
+import hashlib
+import secrets
+import logging
+import time
 from dotenv import load_dotenv
 import json
 import tempfile
 import pathlib
-import time
 from datetime import timedelta
-from functools import wraps
-from werkzeug.security import check_password_hash, generate_password_hash
+from functools import lru_cache, wraps
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+import sheets_client
+from attempt_store import AttemptStore, question_key
+from bank_cache import BankCache, SnapshotRegistry
+from session_backends import create_session_cache, TimedSessionInterface
+from question_bank import combine_banks, compile_bank
+from question_sources import SourceError, open_source
+from shuffling import AttemptOrder, new_seed
+from logs import configure_logging
+from profiling import ProfilingMiddleware, RequestProfiler
+from precompiled import PrecompiledBanks
+from prewarm import PRIORITY_ADMIN, PrewarmPool, parse_tab_list
+from resilience import UpstreamUnavailable
+from response_policy import ResponsePolicy, bank_etag, cache_control, not_modified
+from static_assets import StaticAssets
+import metrics
 
 app = Flask(__name__)
 
+load_dotenv()
+
+# Logging
+app.config['LOG_LEVEL'] = os.environ.get('LOG_LEVEL', 'INFO')
+app.config['LOG_FORMAT'] = os.environ.get('LOG_FORMAT', 'json')  # json or text
+app.config['LOG_SAMPLE_RATE'] = float(os.environ.get('LOG_SAMPLE_RATE', 0.1))  # Fraction of per-request lines kept
+configure_logging(app.config['LOG_LEVEL'], app.config['LOG_FORMAT'], app.config['LOG_SAMPLE_RATE'])
+log = logging.getLogger('quizmaker')
+request_log = logging.getLogger('quizmaker.request')
+
+# Metrics, scraped from /metrics
+app.config['METRICS_TOKEN'] = os.environ.get('METRICS_TOKEN')  # Bearer token required by /metrics when set
+REQUEST_LATENCY = metrics.REGISTRY.histogram(
+    'quizmaker_request_duration_seconds', 'Request latency by route', ('route', 'method', 'status'))
+SHEETS_LATENCY = metrics.REGISTRY.histogram(
+    'quizmaker_sheets_request_duration_seconds', 'Google Sheets API call latency', ('call',))
+SESSION_IO = metrics.REGISTRY.histogram(
+    'quizmaker_session_io_seconds', 'Session load and save latency', ('operation',))
+
 # Session configuration
 app.config['SECRET_KEY'] = os.environ.get('FLASK_SECRET_KEY', os.urandom(24))
-app.config['SESSION_TYPE'] = 'filesystem'
-app.config['SESSION_FILE_DIR'] = tempfile.gettempdir()
 app.config['SESSION_PERMANENT'] = False
 app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(hours=5)
-app.config['ADMIN_PASSWORD_HASH'] = generate_password_hash('quizmaster2024')  # Default password
+app.config['SESSION_BACKEND'] = os.environ.get('SESSION_BACKEND', 'sqlite')  # memory, sqlite, redis or filesystem
+app.config['SESSION_SQLITE_PATH'] = os.environ.get('SESSION_SQLITE_PATH', os.path.join(tempfile.gettempdir(), 'quizmaker_sessions.db'))
+app.config['SESSION_REDIS_URL'] = os.environ.get('SESSION_REDIS_URL', 'redis://localhost:6379/0')
+app.config['SESSION_MEMORY_MAX_ENTRIES'] = int(os.environ.get('SESSION_MEMORY_MAX_ENTRIES', 10000))
+app.config['SESSION_SWEEP_INTERVAL'] = int(os.environ.get('SESSION_SWEEP_INTERVAL', 300))  # Seconds between expired-session sweeps
+if app.config['SESSION_BACKEND'] == 'filesystem':
+    app.config['SESSION_TYPE'] = 'filesystem'
+    app.config['SESSION_FILE_DIR'] = tempfile.gettempdir()
+else:
+    app.config['SESSION_TYPE'] = 'cachelib'
+    app.config['SESSION_CACHELIB'] = create_session_cache(app.config)
 Session(app)
+app.session_interface = TimedSessionInterface(app.session_interface, SESSION_IO)
+
+# Question bank cache
+app.config['BANK_CACHE_SIZE'] = int(os.environ.get('BANK_CACHE_SIZE', 128))
+app.config['BANK_CACHE_TTL'] = int(os.environ.get('BANK_CACHE_TTL', 300))  # Serve without refreshing
+app.config['BANK_CACHE_STALE_TTL'] = int(os.environ.get('BANK_CACHE_STALE_TTL', 3600))  # Serve while refreshing
+app.config['BANK_CACHE_FAILURE_TTL'] = int(os.environ.get('BANK_CACHE_FAILURE_TTL', 5))  # Share a failed load
+bank_cache = BankCache(max_entries=app.config['BANK_CACHE_SIZE'],
+                       ttl=app.config['BANK_CACHE_TTL'],
+                       stale_ttl=app.config['BANK_CACHE_STALE_TTL'],
+                       failure_ttl=app.config['BANK_CACHE_FAILURE_TTL'])
+# Superseded bank versions kept for the attempts that started on them
+app.config['BANK_SNAPSHOT_TTL'] = int(os.environ.get('BANK_SNAPSHOT_TTL', 3600))  # Since an attempt last used it
+app.config['BANK_SNAPSHOT_MAX'] = int(os.environ.get('BANK_SNAPSHOT_MAX', 256))
+bank_snapshots = SnapshotRegistry(idle_ttl=app.config['BANK_SNAPSHOT_TTL'],
+                                  max_entries=app.config['BANK_SNAPSHOT_MAX'])
+
+# Local question banks addressed as csv:<name>, jsonl:<name> or sqlite:<name>
+app.config['QUESTION_BANK_DIR'] = os.environ.get('QUESTION_BANK_DIR', os.path.join(app.root_path, 'banks'))
+
+# Tabs compiled ahead of time by export_banks.py; opened on first use
+app.config['PRECOMPILED_BANKS'] = os.environ.get('PRECOMPILED_BANKS',
+                                                 os.path.join(app.root_path, 'precompiled', 'banks.qmb'))
+precompiled_banks = PrecompiledBanks(app.config['PRECOMPILED_BANKS'])
+
+# Background prewarming, triggered from the admin page and on a schedule
+app.config['PREWARM_WORKERS'] = int(os.environ.get('PREWARM_WORKERS', 2))  # Concurrent background loads
+app.config['PREWARM_QUEUE_SIZE'] = int(os.environ.get('PREWARM_QUEUE_SIZE', 256))
+app.config['PREWARM_TABS'] = os.environ.get('PREWARM_TABS', '')  # spreadsheet_id/tab, comma separated
+app.config['PREWARM_INTERVAL'] = int(os.environ.get('PREWARM_INTERVAL', 240))  # Below BANK_CACHE_TTL keeps them fresh
+
+# Sampled request profiling, managed from /admin/profiling
+app.config['PROFILE_SAMPLE_RATE'] = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))  # Off by default
+app.config['PROFILE_KEEP'] = int(os.environ.get('PROFILE_KEEP', 20))  # Slowest profiles retained
+request_profiler = RequestProfiler(sample_rate=app.config['PROFILE_SAMPLE_RATE'], keep=app.config['PROFILE_KEEP'])
+app.wsgi_app = ProfilingMiddleware(app.wsgi_app, request_profiler)
+
+# Questions returned ahead of time by /answer_and_next
+app.config['MAX_PREFETCH_QUESTIONS'] = 10
+
+# Attempts and per-question statistics, written to SQLite in the background; an empty path turns it off
+app.config['ATTEMPT_STORE_PATH'] = os.environ.get('ATTEMPT_STORE_PATH', os.path.join(tempfile.gettempdir(), 'quizmaker_attempts.db'))
+app.config['ATTEMPT_BATCH_SIZE'] = int(os.environ.get('ATTEMPT_BATCH_SIZE', 500))  # Events per transaction
+app.config['ATTEMPT_FLUSH_INTERVAL'] = float(os.environ.get('ATTEMPT_FLUSH_INTERVAL', 1.0))  # Seconds an event may wait
+app.config['ATTEMPT_QUEUE_SIZE'] = int(os.environ.get('ATTEMPT_QUEUE_SIZE', 10000))  # Events beyond this are dropped
+attempt_store = None
+if app.config['ATTEMPT_STORE_PATH']:
+    attempt_store = AttemptStore(app.config['ATTEMPT_STORE_PATH'],
+                                 batch_size=app.config['ATTEMPT_BATCH_SIZE'],
+                                 flush_interval=app.config['ATTEMPT_FLUSH_INTERVAL'],
+                                 max_queue=app.config['ATTEMPT_QUEUE_SIZE'])
+    atexit.register(attempt_store.close)  # Write what is still queued when the worker exits
+
+def collect_cache_metrics():
+    stats = bank_cache.stats()
+    samples = [
+        ('quizmaker_bank_cache_entries', 'gauge', 'Question banks held in the cache', None, stats['size']),
+        ('quizmaker_bank_loads_in_flight', 'gauge', 'Bank loads currently running', None, stats['in_flight']),
+    ]
+    for event in ('hits', 'stale_hits', 'misses', 'evictions', 'refreshes', 'refresh_failures',
+                  'invalidations', 'failed_loads', 'suppressed_retries', 'stale_if_error', 'batch_loads',
+                  'batch_failures', 'executions', 'coalesced'):
+        samples.append(('quizmaker_bank_cache_events_total', 'counter', 'Bank cache events by kind',
+                        {'event': event}, stats[event]))
+    snapshots = bank_snapshots.stats()
+    samples.append(('quizmaker_bank_snapshot_versions', 'gauge', 'Bank versions held for attempts in progress',
+                    None, snapshots['versions']))
+    for event in ('superseded_hits', 'misses', 'expired'):
+        samples.append(('quizmaker_bank_snapshot_events_total', 'counter', 'Bank snapshot lookups and expiries by kind',
+                        {'event': event}, snapshots[event]))
+    return samples
+
+
+def collect_sheets_metrics():
+    client = sheets_client.peek_client()
+    if client is None:  # Don't build credentials just to report on them
+        return []
+    stats = client.stats()
+    return [
+        ('quizmaker_sheets_credential_builds_total', 'counter', 'Service account credentials built', None, stats['credential_builds']),
+        ('quizmaker_sheets_token_refreshes_total', 'counter', 'Access token refreshes', None, stats['token_refreshes']),
+        ('quizmaker_sheets_service_builds_total', 'counter', 'Sheets API service objects built', None, stats['service_builds']),
+        ('quizmaker_sheets_service_reuses_total', 'counter', 'Sheets API service objects reused', None, stats['service_reuses']),
+        ('quizmaker_sheets_calls_total', 'counter', 'Sheets API calls attempted through the guard', None, stats['calls']),
+        ('quizmaker_sheets_retries_total', 'counter', 'Sheets API calls retried after a transient error', None, stats['retries']),
+        ('quizmaker_sheets_failures_total', 'counter', 'Sheets API calls that failed after retries', None, stats['failures']),
+        ('quizmaker_sheets_throttled_total', 'counter', 'Sheets API calls delayed by the rate limit', None, stats['throttled']),
+        ('quizmaker_sheets_throttle_wait_seconds_total', 'counter', 'Time spent waiting for the rate limit', None, stats['throttle_wait_seconds']),
+        ('quizmaker_sheets_rejected_total', 'counter', 'Sheets API calls refused without being sent',
+         {'reason': 'rate_limit'}, stats['rate_limit_rejections']),
+        ('quizmaker_sheets_rejected_total', 'counter', 'Sheets API calls refused without being sent',
+         {'reason': 'circuit_open'}, stats['short_circuited']),
+        ('quizmaker_sheets_circuit_open', 'gauge', 'Whether the Sheets circuit breaker is open', None,
+         int(stats['circuit_state'] == 'open')),
+        ('quizmaker_sheets_circuit_opened_total', 'counter', 'Times the Sheets circuit breaker opened', None, stats['circuit_opened']),
+    ]
+
+
+def collect_prewarm_metrics():
+    status = prewarm_pool.status()
+    samples = [('quizmaker_prewarm_queue_depth', 'gauge', 'Prewarm jobs waiting', None, status['queue_depth']),
+               ('quizmaker_prewarm_running', 'gauge', 'Prewarm jobs running', None, len(status['running']))]
+    for outcome in ('completed', 'failed', 'rejected', 'deduplicated'):
+        samples.append(('quizmaker_prewarm_jobs_total', 'counter', 'Prewarm jobs by outcome',
+                        {'outcome': outcome}, status[outcome]))
+    return samples
+
+
+def collect_attempt_metrics():
+    if attempt_store is None:
+        return []
+    stats = attempt_store.stats()
+    samples = [
+        ('quizmaker_attempt_queue_depth', 'gauge', 'Attempt events waiting to be written', None, stats['queue_depth']),
+        ('quizmaker_attempt_batches_total', 'counter', 'Attempt event batches written', None, stats['batches']),
+        ('quizmaker_attempt_flush_seconds_total', 'counter', 'Time spent writing attempt event batches', None, stats['flush_seconds']),
+    ]
+    for outcome in ('written', 'ignored', 'dropped', 'lost'):
+        samples.append(('quizmaker_attempt_events_total', 'counter', 'Attempt events by outcome',
+                        {'outcome': outcome}, stats[outcome]))
+    return samples
+
+
+def collect_response_metrics():
+    stats = response_policy.stats()
+    return [
+        ('quizmaker_responses_not_modified_total', 'counter', 'Conditional requests answered with 304', None, stats['not_modified']),
+        ('quizmaker_responses_compressed_total', 'counter', 'Responses sent compressed', None, stats['compressed']),
+        ('quizmaker_response_body_bytes_total', 'counter', 'Body bytes of compressed responses',
+         {'stage': 'uncompressed'}, stats['bytes_before']),
+        ('quizmaker_response_body_bytes_total', 'counter', 'Body bytes of compressed responses',
+         {'stage': 'compressed'}, stats['bytes_after']),
+    ]
+
+
+metrics.REGISTRY.register_collector(collect_cache_metrics)
+metrics.REGISTRY.register_collector(collect_prewarm_metrics)
+metrics.REGISTRY.register_collector(collect_sheets_metrics)
+metrics.REGISTRY.register_collector(collect_response_metrics)
+metrics.REGISTRY.register_collector(collect_attempt_metrics)
+
+
+@app.before_request
+def start_timer():
+    g.request_start = time.perf_counter()
+
+
+@app.after_request
+def record_status(response):
+    g.response_status = response.status_code
+    return response
+
+
+@app.teardown_request
+def record_latency(exc):
+    start = g.pop('request_start', None)
+    if start is None:
+        return
+    elapsed = time.perf_counter() - start
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    status = g.pop('response_status', 500)
+    REQUEST_LATENCY.observe(elapsed, route=route, method=request.method, status=status)
+    request_log.info("Request handled", extra={
+        'route': route, 'method': request.method, 'status': status, 'duration_ms': round(elapsed * 1000, 2)})
 
 # Enable file-based caching
 app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 31536000  # 1 year in seconds
@@ -33,57 +240,28 @@ app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 31536000  # 1 year in seconds
 @app.after_request
 def add_header(response):
     response.headers['Access-Control-Allow-Origin'] = '*'
-    if 'Cache-Control' not in response.headers:
-        response.headers['Cache-Control'] = 'public, max-age=300'  # Cache for 5 minutes by default
     return response
 
-load_dotenv()
+# Per-route Cache-Control (no-store unless a view declares otherwise), ETags and compression
+app.config['COMPRESS_MIN_SIZE'] = int(os.environ.get('COMPRESS_MIN_SIZE', 1024))  # Bytes; smaller bodies go as-is
+response_policy = ResponsePolicy(app, min_size=app.config['COMPRESS_MIN_SIZE'])
+
+# Minified, fingerprinted CSS and JS from build_assets.py; url_for('static', ...) links the current build
+app.config['STATIC_MANIFEST'] = os.environ.get('STATIC_MANIFEST', os.path.join(app.static_folder, 'manifest.json'))
+static_assets = StaticAssets(app, app.config['STATIC_MANIFEST'])
+
+def question_source(spreadsheet_id):
+    """QuestionSource for the first quiz URL segment: a spreadsheet ID or e.g. csv:<name>"""
+    return open_source(spreadsheet_id, app.config['QUESTION_BANK_DIR'], sheets_latency=SHEETS_LATENCY)
 
 def get_sheet_data(spreadsheet_id, tab_name):
-    print(f"\n=== LOADING SHEET DATA ===")
-    print(f"Loading sheet data for spreadsheet {spreadsheet_id}, tab {tab_name}")
-    SCOPES = ['https://www.googleapis.com/auth/spreadsheets.readonly']
-    creds = None
-    
     try:
-        google_creds = os.environ.get('GOOGLE_CREDENTIALS')
-        if google_creds:
-            print("Found GOOGLE_CREDENTIALS in environment, loading...")
-            try:
-                creds_dict = json.loads(google_creds)
-                print("Successfully parsed credentials JSON")
-                creds = service_account.Credentials.from_service_account_info(creds_dict, scopes=SCOPES)
-                print("Successfully created credentials object")
-            except json.JSONDecodeError as e:
-                print(f"Error parsing credentials JSON: {e}")
-                return None
-            except Exception as e:
-                print(f"Error creating credentials object: {e}")
-                return None
-        else:
-            print("ERROR: No credentials found!")
-            return None
-
-        print("Building sheets service...")
-        service = build('sheets', 'v4', credentials=creds)
-        sheet = service.spreadsheets()
-        
-        # Get all data from the specified tab
-        range_name = f'{tab_name}!A:F'  # Get all rows
-        print(f"Fetching range: {range_name}")
-        
-        try:
-            result = sheet.values().get(spreadsheetId=spreadsheet_id,
-                                      range=range_name).execute()
-            values = result.get('values', [])
-            print(f"Successfully fetched {len(values)} rows from sheet")
-            return values
-        except Exception as e:
-            print(f"Error fetching sheet data: {e}")
-            return None
-            
+        return list(question_source(spreadsheet_id).rows(tab_name))
+    except ValueError as e:
+        log.error("Sheets credentials unavailable: %s", e)
+        return None
     except Exception as e:
-        print(f"Unexpected error: {e}")
+        log.error("Error fetching sheet data: %s", e, extra={'spreadsheet_id': spreadsheet_id, 'tab_name': tab_name})
         return None
 
 GOOGLE_CLIENT_ID = os.environ.get('GOOGLE_CLIENT_ID', '1080262359768-j0cfallo8d887lqj3bsjk9fdkguklml4.apps.googleusercontent.com')
@@ -98,128 +276,174 @@ def callback():
     return redirect(url_for('index'))
 
 @app.route('/')
+@cache_control('public, max-age=300', etag=True)
 def index():
     return render_template('admin.html')
 
 @app.route('/get_tabs/<spreadsheet_id>')
+@cache_control('private, max-age=60', etag=True)
 def get_tabs(spreadsheet_id):
     try:
-        print("\n=== DEBUG: GET_TABS ===")
-        print(f"Spreadsheet ID: {spreadsheet_id}")
+        titles = question_source(spreadsheet_id).tabs()
+        log.info("Listed sheet tabs", extra={'spreadsheet_id': spreadsheet_id, 'tabs': len(titles)})
         
-        try:
-            creds = None
-            google_creds = os.environ.get('GOOGLE_CREDENTIALS')
-            if google_creds:
-                print("Found GOOGLE_CREDENTIALS in environment, loading...")
-                creds_dict = json.loads(google_creds)
-                creds = service_account.Credentials.from_service_account_info(creds_dict, scopes=['https://www.googleapis.com/auth/spreadsheets.readonly'])
-            else:
-                print("ERROR: No credentials found!")
-                raise ValueError("No credentials found")
-
-            print("Building sheets service...")
-            service = build('sheets', 'v4', credentials=creds)
-            print("Successfully built service")
-            
-            print("Getting sheet metadata...")
-            sheet_metadata = service.spreadsheets().get(spreadsheetId=spreadsheet_id).execute()
-            sheets = sheet_metadata.get('sheets', '')
-            titles = [sheet['properties']['title'] for sheet in sheets]
-            print(f"Found sheets: {titles}")
-            
-            return jsonify(titles)
-        except Exception as e:
-            print(f"Error in get_tabs: {str(e)}")
-            print(f"Error type: {type(e)}")
-            import traceback
-            print(f"Traceback: {traceback.format_exc()}")
-            return jsonify({'error': str(e)}), 400
+        return jsonify(titles)
         
+    except SourceError as e:
+        return jsonify({'error': str(e)}), 404
+    except UpstreamUnavailable as e:
+        response = jsonify({'error': 'Google Sheets is unavailable right now, please try again shortly'})
+        response.headers['Retry-After'] = str(max(1, round(e.retry_after or 0)))
+        return response, 503
     except Exception as e:
-        print(f"Error in get_tabs: {str(e)}")
-        print(f"Error type: {type(e)}")
-        import traceback
-        print(f"Traceback: {traceback.format_exc()}")
+        log.exception("Error in get_tabs", extra={'spreadsheet_id': spreadsheet_id})
         return jsonify({'error': str(e)}), 400
 
+def load_question_bank(spreadsheet_id, tab_name):
+    """Fetch and compile one tab, reusing unchanged rows of the cached copy; None if the source could not be read
+
+    A tab in the precompiled bank file is served from there until the file
+    expires, and from the expired copy if the source cannot be read.
+    """
+    bank = precompiled_banks.get(spreadsheet_id, tab_name)
+    if bank is not None:
+        return bank
+    try:
+        source = question_source(spreadsheet_id)
+        bank = compile_bank(source.rows(tab_name), source.header_rows,
+                            previous=bank_cache.peek((spreadsheet_id, tab_name)))
+    except Exception as e:
+        log.error("Error loading question bank: %s", e, extra={'spreadsheet_id': spreadsheet_id, 'tab_name': tab_name})
+        return precompiled_banks.get(spreadsheet_id, tab_name, allow_expired=True)
+    log.info("Compiled question bank", extra={
+        'spreadsheet_id': spreadsheet_id, 'tab_name': tab_name, 'questions': len(bank),
+        'rows': bank.row_count, 'skipped': bank.diagnostics['skipped'], 'version': bank.version,
+        'recompiled_rows': bank.diagnostics.get('recompiled_rows', 0)})
+    return bank
+
+def load_question_banks(spreadsheet_id, tab_names):
+    """Fetch several tabs in one round trip where the source allows (precompiled tabs need none); {(spreadsheet_id, tab): bank or None}"""
+    banks = {}
+    for tab_name in tab_names:
+        bank = precompiled_banks.get(spreadsheet_id, tab_name)
+        if bank is not None:
+            banks[(spreadsheet_id, tab_name)] = bank
+    tab_names = [tab_name for tab_name in tab_names if (spreadsheet_id, tab_name) not in banks]
+    if not tab_names:
+        return banks
+    source = question_source(spreadsheet_id)
+    for tab_name, rows in source.batch_rows(tab_names).items():
+        try:
+            bank = compile_bank(rows, source.header_rows, previous=bank_cache.peek((spreadsheet_id, tab_name)))
+        except Exception as e:
+            log.error("Error loading question bank: %s", e, extra={'spreadsheet_id': spreadsheet_id, 'tab_name': tab_name})
+            bank = None
+        banks[(spreadsheet_id, tab_name)] = bank
+    log.info("Compiled question banks", extra={
+        'spreadsheet_id': spreadsheet_id, 'tabs': len(tab_names),
+        'questions': sum(len(bank) for bank in banks.values() if bank is not None)})
+    return banks
+
+@lru_cache(maxsize=32)
+def combined_bank(*banks):
+    # Keyed on the component bank objects, so a reloaded tab yields a new combination
+    return combine_banks(banks)
+
+def get_banks(spreadsheet_id, tab_names):
+    """{(spreadsheet_id, tab): bank or None}, loading every uncached tab in one batch"""
+    keys = [(spreadsheet_id, tab_name) for tab_name in tab_names]
+    return bank_cache.get_many(keys, lambda key: load_question_bank(*key),
+                               lambda missing: load_question_banks(spreadsheet_id, [key[1] for key in missing]))
+
+def get_bank(spreadsheet_id, tabs):
+    """Shared bank for one tab name, or the combined bank for a list of tabs; None if any tab failed to load"""
+    if isinstance(tabs, str):
+        return bank_cache.get((spreadsheet_id, tabs), lambda: load_question_bank(spreadsheet_id, tabs))
+    keys = [(spreadsheet_id, tab_name) for tab_name in tabs]
+    banks = get_banks(spreadsheet_id, tabs)
+    if any(banks[key] is None for key in keys):
+        return None
+    return combined_bank(*(banks[key] for key in keys))
+
+def prewarm_bank(spreadsheet_id, tab_name):
+    """Load a tab now, replacing any cached copy (run by the prewarm workers)"""
+    return bank_cache.reload((spreadsheet_id, tab_name), lambda: load_question_bank(spreadsheet_id, tab_name))
+
+prewarm_pool = PrewarmPool(prewarm_bank, workers=app.config['PREWARM_WORKERS'],
+                           max_queue=app.config['PREWARM_QUEUE_SIZE'])
+prewarm_pool.schedule(parse_tab_list(app.config['PREWARM_TABS']), app.config['PREWARM_INTERVAL'])
+
+def snapshot_bank(spreadsheet_id, tabs, version, current):
+    """The bank an attempt started on: current if unchanged, else the retained snapshot, else None"""
+    bank_id = (spreadsheet_id, tabs if isinstance(tabs, str) else tuple(tabs))
+    return bank_snapshots.use(bank_id, version, current)
+
+def get_attempt_bank():
+    """Resolve the bank version the attempt in the session started on, as (bank, error)"""
+    spreadsheet_id, tabs = session['bank']
+    current = get_bank(spreadsheet_id, tabs)
+    bank = snapshot_bank(spreadsheet_id, tabs, session.get('bank_version'), current)
+    if bank is not None:
+        return bank, None
+    if current is None:
+        return None, 'Could not load questions from spreadsheet'
+    return None, 'The quiz has changed since it was started. Please restart the quiz.'
+
+def attempt_question(bank, seed, position, sections=None):
+    """Question shown at position for the attempt with this seed, plus its answer order
+
+    The attempt draws from the pool of questions in `sections` (the whole bank
+    when empty). The first N positions of the seeded permutation are a uniform
+    sample of N questions, so a short quiz never touches the rest of the pool.
+    """
+    pool = bank.pool(sections)
+    order = AttemptOrder(seed, len(pool))
+    question = bank.questions[pool[order.question_index(position)]]
+    return question, order.arrange_answers(position, question.answers)
+
 @app.route('/quiz/<spreadsheet_id>/<tab_name>')
-def quiz(spreadsheet_id, tab_name):
+@app.route('/quiz/<spreadsheet_id>')
+def quiz(spreadsheet_id, tab_name=None):
     try:
-        print(f"\n=== QUIZ ROUTE ===")
-        print(f"Starting quiz for spreadsheet {spreadsheet_id}, tab {tab_name}")
+        # /quiz/<id>?tabs=A,B,C combines several tabs into one quiz
+        if tab_name is None:
+            tabs = list(dict.fromkeys(name.strip() for name in request.args.get('tabs', '').split(',') if name.strip()))
+            if not tabs:
+                return render_template('quiz.html', error="Choose the sheets for this quiz with ?tabs=A,B.")
+            tab_name = tabs[0] if len(tabs) == 1 else tabs
+        
+        # Self-contained quizzes are graded in the browser and never touch the session
+        offline = request.args.get('mode') == 'offline'
         
         # Clear any existing session data
-        session.clear()
+        if not offline:
+            session.clear()
         
         # Get questions
-        print("Getting questions from spreadsheet...")
         try:
-            raw_data = get_sheet_data(spreadsheet_id, tab_name)
-            if not raw_data:
+            bank = get_bank(spreadsheet_id, tab_name)
+            if bank is None:
                 return render_template('quiz.html', error="Could not load questions from spreadsheet.")
-                
-            print(f"Successfully loaded {len(raw_data)} rows")
-            
-            # Skip header rows and format questions
-            if len(raw_data) > 2:
-                questions = []
-                skipped = 0
-                for row in raw_data[2:]:  # Skip first two rows
-                    try:
-                        # Must have at least question and one answer
-                        if len(row) >= 3 and row[1].strip() and row[2].strip():
-                            # Get question and correct answer
-                            question_text = row[1].strip()
-                            correct_answer = row[2].strip()  # C is always correct answer
-                            
-                            # Get available wrong answers (D, E, F)
-                            wrong_answers = []
-                            for i in range(3, min(len(row), 6)):  # Check columns D, E, F
-                                if row[i].strip():
-                                    wrong_answers.append(row[i].strip())
-                            
-                            if wrong_answers:  # Must have at least one wrong answer
-                                # Combine correct and wrong answers
-                                all_answers = [correct_answer] + wrong_answers
-                                
-                                # Shuffle answers
-                                random.seed(time.time())
-                                shuffled_answers = shuffle_multiple_times(all_answers)
-                                
-                                question = {
-                                    'question': question_text,
-                                    'answers': shuffled_answers,
-                                    'correct_answer': correct_answer
-                                }
-                                questions.append(question)
-                            else:
-                                skipped += 1
-                                print(f"Skipping row {len(questions) + skipped}: No wrong answers")
-                        else:
-                            skipped += 1
-                            print(f"Skipping row {len(questions) + skipped}: Missing question or correct answer")
-                    except Exception as row_error:
-                        skipped += 1
-                        print(f"Error processing row: {row_error}")
-                        continue
-                        
-                print(f"Processed {len(questions)} valid questions (skipped {skipped})")
             
-                if not questions:
-                    return render_template('quiz.html', error="No valid questions found in the spreadsheet.")
-                
-                # Shuffle questions
-                random.seed(time.time())
-                questions = shuffle_multiple_times(questions)
-                print("Shuffled questions")
-                
-            else:
-                print("Not enough rows in sheet")
+            if not bank.row_count:
                 return render_template('quiz.html', error="Not enough questions in the spreadsheet.")
             
+            if not bank.questions:
+                return render_template('quiz.html', error="No valid questions found in the spreadsheet.")
+            
+            # Optional sampling: ?count=N questions from ?sections=A,B (column A)
+            sections = [name.strip() for name in request.args.get('sections', '').split(',') if name.strip()]
+            try:
+                pool = bank.pool(sections)
+            except KeyError as e:
+                return render_template('quiz.html', error=f"Section {e} not found in the spreadsheet.")
+            count = request.args.get('count', type=int)
+            if count is not None and count < 1:
+                return render_template('quiz.html', error="The question count must be at least 1.")
+            total = min(count, len(pool)) if count else len(pool)
+            
         except Exception as e:
-            print(f"Error getting sheet data: {str(e)}")
+            log.exception("Error getting sheet data", extra={'spreadsheet_id': spreadsheet_id, 'tab_name': tab_name})
             import traceback
             debug_info = f"""
 Spreadsheet ID: {spreadsheet_id}
@@ -231,77 +455,196 @@ Traceback:
 """
             return render_template('quiz.html', error=f"Error loading questions: {str(e)}", debug_info=debug_info)
         
-        # Store in session
+        if offline:
+            return render_offline_quiz(bank, spreadsheet_id, tab_name, sections, total)
+        
+        # Store a compact attempt descriptor; question content stays in the shared bank
         try:
-            print("Storing questions in session...")
-            # Shuffle questions one final time before storing
-            random.seed(time.time())
-            questions = shuffle_multiple_times(questions)
-            session['questions'] = questions
+            session['bank'] = [spreadsheet_id, tab_name]
+            session['bank_version'] = bank.version
+            snapshot_bank(spreadsheet_id, tab_name, bank.version, bank)
+            session['seed'] = new_seed()
+            session['sections'] = sections
             session['current_question'] = 0
             session['score'] = 0
-            session['total_questions'] = len(questions)
-            session['wrong_answers'] = []
-            print(f"Stored {len(questions)} questions in session")
+            session['total_questions'] = total
+            session['wrong'] = []  # [position, submitted answer] per wrong answer
+            session['attempt_id'] = secrets.token_hex(8)
+            if attempt_store is not None:
+                attempt_store.record_start(session['attempt_id'], spreadsheet_id, tab_name, bank.version, total,
+                                           seed=session['seed'], sections=sections, count=count)
+            # Everything /admin/attempt needs to rebuild the attempt; not sampled, unlike per-request lines
+            log.info("Started attempt", extra={
+                'attempt_id': session['attempt_id'], 'spreadsheet_id': spreadsheet_id, 'tab_name': tab_name,
+                'bank_version': bank.version, 'seed': session['seed'], 'sections': sections, 'count': count,
+                'questions': total, 'pool': len(pool)})
             
             # Get first question ready
-            current_q = questions[0]
+            current_q, answers = attempt_question(bank, session['seed'], 0, sections)
             first_question = {
-                'question': current_q['question'],
-                'answers': current_q['answers'],
+                'question': current_q.text,
+                'answers': answers,
                 'current': 1,
-                'total': len(questions)
+                'total': session['total_questions']
             }
             
             return render_template('quiz.html', question=first_question)
             
         except Exception as se:
-            print(f"Session error: {str(se)}")
+            log.exception("Failed to initialize quiz session")
             return render_template('quiz.html', error="Failed to initialize quiz session.")
         
     except Exception as e:
-        print(f"ERROR in quiz route: {str(e)}")
-        import traceback
-        print(f"Traceback: {traceback.format_exc()}")
+        log.exception("Error in quiz route")
         return render_template('quiz.html', error=str(e))
 
+def offline_serializer():
+    return URLSafeTimedSerializer(app.config['SECRET_KEY'], salt='offline-attempt')
+
+def answer_hash(salt, position, answer):
+    return hashlib.sha256(f'{salt}:{position}:{answer}'.encode('utf-8')).hexdigest()
+
+def render_offline_quiz(bank, spreadsheet_id, tab_name, sections, total):
+    """Render a whole attempt in one gzip+base64 payload, graded client-side
+
+    Correct answers are only present as salted SHA-256 hashes. The signed
+    attempt token lets /submit_offline re-grade the final answers from the
+    seed without any session state.
+    """
+    seed = new_seed()
+    salt = secrets.token_hex(8)
+    questions = []
+    for position in range(total):
+        question, answers = attempt_question(bank, seed, position, sections)
+        questions.append({
+            'q': question.text,
+            'a': answers,
+            'h': answer_hash(salt, position, question.correct_answer)
+        })
+    payload = json.dumps({'salt': salt, 'questions': questions}, separators=(',', ':'))
+    snapshot_bank(spreadsheet_id, tab_name, bank.version, bank)
+    token = offline_serializer().dumps({
+        'b': [spreadsheet_id, tab_name],
+        'v': bank.version,
+        's': seed,
+        'sec': sections,
+        'n': total
+    })
+    request_log.info("Started offline attempt", extra={
+        'spreadsheet_id': spreadsheet_id, 'tab_name': tab_name, 'questions': total})
+    first_question = {
+        'question': questions[0]['q'],
+        'answers': questions[0]['a'],
+        'current': 1,
+        'total': total
+    }
+    return render_template('quiz.html', question=first_question,
+                           offline_payload=base64.b64encode(gzip.compress(payload.encode('utf-8'))).decode('ascii'),
+                           attempt_token=token)
+
+def question_payload(bank, position, total):
+    """Client-facing data for the question at position (no correct answer)"""
+    question, answers = attempt_question(bank, session['seed'], position, session.get('sections'))
+    return {
+        'question': question.text,
+        'answers': answers,
+        'current': position + 1,
+        'total': total
+    }
+
+def upcoming_questions(bank, count):
+    """The next `count` questions of the attempt, starting at the current one"""
+    total = session.get('total_questions', 0)
+    current = session.get('current_question', 0)
+    return [question_payload(bank, position, total)
+            for position in range(current, min(current + count, total))]
+
+def wrong_answer_entry(bank, position, your_answer):
+    question, _ = attempt_question(bank, session['seed'], position, session.get('sections'))
+    return {
+        'question': question.text,
+        'yourAnswer': your_answer,
+        'correctAnswer': question.correct_answer
+    }
+
+def grade_answer(bank, answer):
+    """Grade an answer to the current question and advance the attempt
+
+    Only this question's outcome is returned; the full review is served by
+    /results so responses do not grow with the number of mistakes.
+    """
+    current = session.get('current_question', 0)
+    current_q, _ = attempt_question(bank, session['seed'], current, session.get('sections'))
+    is_correct = answer == current_q.correct_answer.strip()
+    result = {
+        'correct': is_correct,
+        'correct_answer': current_q.correct_answer
+    }
+    
+    if attempt_store is not None and 'attempt_id' in session:
+        attempt_store.record_answer(session['attempt_id'], session['bank'][0], current, current_q.text,
+                                    current_q.correct_answer, answer, is_correct)
+    
+    if is_correct:
+        session['score'] = session.get('score', 0) + 1
+    else:
+        # Store wrong answer as a position into the attempt
+        wrong = session.get('wrong', [])
+        wrong.append([current, answer])
+        session['wrong'] = wrong
+        result['wrong_answer'] = {
+            'question': current_q.text,
+            'yourAnswer': answer,
+            'correctAnswer': current_q.correct_answer
+        }
+    
+    # Move to next question
+    session['current_question'] = current + 1
+    session.modified = True
+    
+    result['score'] = session.get('score', 0)
+    result['wrong_count'] = len(session.get('wrong', []))
+    return result
+
+def attempt_summary():
+    """End-of-quiz summary, computed once when the attempt is complete"""
+    summary = session.get('summary')
+    if summary is None:
+        score = session.get('score', 0)
+        total = session.get('total_questions', 0)
+        summary = {
+            'complete': True,
+            'score': score,
+            'total': total,
+            'percentage': round(score * 100 / total) if total else 0,
+            'wrong_count': len(session.get('wrong', []))
+        }
+        session['summary'] = summary
+    return dict(summary)
+
 @app.route('/get_question', methods=['POST'])
 def get_question():
     try:
-        questions = session.get('questions', [])
+        total = session.get('total_questions', 0)
         current = session.get('current_question', 0)
-        wrong_answers = session.get('wrong_answers', [])
-        
-        print(f"Getting question {current + 1} of {len(questions)}")
         
-        if not questions:
-            print("No questions found in session")
+        if not total:
             return jsonify({'error': 'No questions found'}), 400
             
-        if current >= len(questions):
-            print("Quiz complete")
-            score = session.get('score', 0)
-            return jsonify({
-                'complete': True,
-                'score': score,
-                'total': len(questions),
-                'wrong_answers': wrong_answers
-            })
-            
-        current_q = questions[current]
-        response_data = {
-            'complete': False,
-            'question': current_q['question'],
-            'answers': current_q['answers'],
-            'current': current + 1,
-            'total': len(questions),
-            'wrong_answers': wrong_answers
-        }
-        print(f"Returning question data: {response_data}")
+        if current >= total:
+            return jsonify(attempt_summary())
+        
+        bank, error = get_attempt_bank()
+        if error:
+            return jsonify({'error': error}), 409
+        
+        response_data = question_payload(bank, current, total)
+        response_data['complete'] = False
+        response_data['wrong_count'] = len(session.get('wrong', []))
         return jsonify(response_data)
         
     except Exception as e:
-        print(f"Error in get_question: {str(e)}")
+        log.exception("Error in get_question")
         return jsonify({'error': str(e)}), 400
 
 @app.route('/check_answer', methods=['POST'])
@@ -309,59 +652,207 @@ def check_answer():
     try:
         data = request.get_json()
         if not data:
-            print("No data received in check_answer")
             return jsonify({'error': 'No answer provided'}), 400
             
         answer = data.get('answer', '').strip()
         if not answer:
-            print("Empty answer received")
             return jsonify({'error': 'Empty answer'}), 400
         
-        questions = session.get('questions', [])
+        total = session.get('total_questions', 0)
         current = session.get('current_question', 0)
-        wrong_answers = session.get('wrong_answers', [])
         
-        print(f"Checking answer for question {current + 1} of {len(questions)}")
-        print(f"Received answer: {answer}")
+        if not total or current >= total:
+            return jsonify({'error': 'No question to check'}), 400
+        
+        bank, error = get_attempt_bank()
+        if error:
+            return jsonify({'error': error}), 409
+        
+        return jsonify(grade_answer(bank, answer))
+        
+    except Exception as e:
+        log.exception("Error in check_answer")
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/answer_and_next', methods=['POST'])
+def answer_and_next():
+    """Grade the current answer and return the next question in one round trip (up to `prefetch` questions)"""
+    try:
+        data = request.get_json(silent=True) or {}
+        answer = (data.get('answer') or '').strip()
+        if not answer:
+            return jsonify({'error': 'Empty answer'}), 400
+        prefetch = max(1, min(int(data.get('prefetch', 1)), app.config['MAX_PREFETCH_QUESTIONS']))
         
-        if not questions or current >= len(questions):
-            print("No valid question to check")
+        total = session.get('total_questions', 0)
+        if not total or session.get('current_question', 0) >= total:
             return jsonify({'error': 'No question to check'}), 400
-            
-        current_q = questions[current]
-        is_correct = answer.strip() == current_q['correct_answer'].strip()
-        print(f"Answer is {'correct' if is_correct else 'incorrect'}")
         
-        if is_correct:
-            session['score'] = session.get('score', 0) + 1
-            print(f"New score: {session['score']}")
+        bank, error = get_attempt_bank()
+        if error:
+            return jsonify({'error': error}), 409
+        
+        result = grade_answer(bank, answer)
+        if session['current_question'] >= total:
+            result.update(attempt_summary())
         else:
-            # Store wrong answer
-            wrong_answers.append({
-                'question': current_q['question'],
-                'yourAnswer': answer,
-                'correctAnswer': current_q['correct_answer']
-            })
-            session['wrong_answers'] = wrong_answers
-            print("Added to wrong answers list")
-            
-        # Move to next question
-        session['current_question'] = current + 1
-        print(f"Moving to question {session['current_question'] + 1}")
+            result['complete'] = False
+            result['next'] = upcoming_questions(bank, prefetch)
+        return jsonify(result)
+        
+    except Exception as e:
+        log.exception("Error in answer_and_next")
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/check_answers', methods=['POST'])
+def check_answers():
+    """Grade several buffered answers at once, in question order
+
+    Each item is {"current": <question number>, "answer": "..."}; "current"
+    is optional and, when given, must match the next unanswered question so
+    a re-sent batch is never graded twice. Grading stops at the first item
+    that is out of order.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        items = data.get('answers')
+        if not isinstance(items, list) or not items:
+            return jsonify({'error': 'No answers provided'}), 400
+        
+        total = session.get('total_questions', 0)
+        if not total:
+            return jsonify({'error': 'No questions found'}), 400
+        
+        bank, error = get_attempt_bank()
+        if error:
+            return jsonify({'error': error}), 409
+        
+        results = []
+        for item in items:
+            current = session.get('current_question', 0)
+            if current >= total:
+                break
+            if isinstance(item, str):
+                item = {'answer': item}
+            number = item.get('current')
+            if number is not None and number != current + 1:
+                results.append({'current': number, 'error': f'Expected question {current + 1}'})
+                break
+            answer = (item.get('answer') or '').strip()
+            if not answer:
+                results.append({'current': current + 1, 'error': 'Empty answer'})
+                break
+            result = grade_answer(bank, answer)
+            result['current'] = current + 1
+            del result['score'], result['wrong_count']
+            results.append(result)
+        
+        current = session.get('current_question', 0)
+        if current >= total:
+            response = attempt_summary()
+        else:
+            response = {
+                'complete': False,
+                'score': session.get('score', 0),
+                'total': total,
+                'wrong_count': len(session.get('wrong', []))
+            }
+        response['current'] = current + 1
+        response['results'] = results
+        return jsonify(response)
+        
+    except Exception as e:
+        log.exception("Error in check_answers")
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/submit_offline', methods=['POST'])
+def submit_offline():
+    """Verify and score the answers of a self-contained (offline) attempt"""
+    try:
+        data = request.get_json(silent=True) or {}
+        try:
+            attempt = offline_serializer().loads(
+                data.get('token', ''),
+                max_age=app.config['PERMANENT_SESSION_LIFETIME'].total_seconds())
+        except BadSignature:
+            return jsonify({'error': 'Invalid or expired attempt token'}), 400
+        
+        answers = data.get('answers')
+        if not isinstance(answers, list) or len(answers) != attempt['n']:
+            return jsonify({'error': f"Expected {attempt['n']} answers"}), 400
+        
+        spreadsheet_id, tabs = attempt['b']
+        current = get_bank(spreadsheet_id, tabs)
+        bank = snapshot_bank(spreadsheet_id, tabs, attempt['v'], current)
+        if bank is None and current is None:
+            return jsonify({'error': 'Could not load questions from spreadsheet'}), 400
+        if bank is None:
+            return jsonify({'error': 'The quiz has changed since it was started. Please restart the quiz.'}), 409
+        
+        total = attempt['n']
+        # A token can be submitted more than once; the store records its answers once
+        attempt_id = hashlib.sha256(data['token'].encode('utf-8')).hexdigest()[:16]
+        if attempt_store is not None:
+            attempt_store.record_start(attempt_id, spreadsheet_id, tabs, attempt['v'], total, mode='offline',
+                                       seed=attempt['s'], sections=attempt['sec'], count=total)
+        score = 0
+        for position, answer in enumerate(answers):
+            question, _ = attempt_question(bank, attempt['s'], position, attempt['sec'])
+            answer = answer.strip() if isinstance(answer, str) else ''
+            correct = answer == question.correct_answer
+            score += correct
+            if attempt_store is not None:
+                attempt_store.record_answer(attempt_id, spreadsheet_id, position, question.text,
+                                            question.correct_answer, answer, correct)
+        
+        return jsonify({
+            'complete': True,
+            'verified': True,
+            'score': score,
+            'total': total,
+            'percentage': round(score * 100 / total) if total else 0,
+            'wrong_count': total - score,
+            'client_score_matches': data.get('score') == score
+        })
+        
+    except Exception as e:
+        log.exception("Error in submit_offline")
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/results')
+def results():
+    """Paginated review of the wrong answers in the current attempt"""
+    try:
+        total = session.get('total_questions', 0)
+        if not total:
+            return jsonify({'error': 'No questions found'}), 400
+        
+        page = max(1, request.args.get('page', 1, type=int))
+        per_page = max(1, min(request.args.get('per_page', 20, type=int), 100))
+        wrong = session.get('wrong', [])
+        start = (page - 1) * per_page
         
-        # Make sure session is saved
-        session.modified = True
+        entries = []
+        if wrong[start:start + per_page]:
+            bank, error = get_attempt_bank()
+            if error:
+                return jsonify({'error': error}), 409
+            entries = [wrong_answer_entry(bank, position, answer)
+                       for position, answer in wrong[start:start + per_page]]
         
         return jsonify({
-            'correct': is_correct,
-            'correct_answer': current_q['correct_answer'],
-            'wrong_answers': wrong_answers
+            'complete': session.get('current_question', 0) >= total,
+            'score': session.get('score', 0),
+            'total': total,
+            'wrong_count': len(wrong),
+            'page': page,
+            'per_page': per_page,
+            'pages': (len(wrong) + per_page - 1) // per_page,
+            'wrong_answers': entries
         })
         
     except Exception as e:
-        print(f"Error in check_answer: {str(e)}")
-        import traceback
-        print(f"Traceback: {traceback.format_exc()}")
+        log.exception("Error in results")
         return jsonify({'error': str(e)}), 400
 
 def requires_admin(f):
@@ -380,6 +871,10 @@ def admin_login():
 
 @app.route('/admin/auth/google', methods=['POST'])
 def google_auth():
+    # Imported here so only sign-ins pay for loading google-auth
+    from google.auth.transport import requests as google_requests
+    from google.oauth2 import id_token
+
     try:
         token = request.json.get('credential')
         if not token:
@@ -404,7 +899,7 @@ def google_auth():
         return jsonify({'success': True, 'redirect': url_for('admin')})
         
     except ValueError as e:
-        print(f"Token verification failed: {str(e)}")
+        log.warning("Token verification failed: %s", e)
         return jsonify({'error': 'Invalid token'}), 400
 
 @app.route('/admin/logout')
@@ -417,25 +912,302 @@ def admin_logout():
 def admin():
     return render_template('admin.html')
 
+@app.route('/admin/stats')
+@requires_admin
+def admin_stats():
+    return jsonify({
+        'sheets_client': sheets_client.get_client().stats(),
+        'bank_cache': bank_cache.stats(),
+        'precompiled_banks': precompiled_banks.status(),
+        'attempt_store': attempt_store.stats() if attempt_store is not None else None
+    })
+
+@app.route('/admin/profiling', methods=['GET', 'POST'])
+@requires_admin
+def admin_profiling():
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or {}
+        sample_rate = data.get('sample_rate')
+        keep = data.get('keep')
+        if sample_rate is not None and not (isinstance(sample_rate, (int, float)) and 0 <= sample_rate <= 1):
+            return jsonify({'error': 'sample_rate must be between 0 and 1'}), 400
+        if keep is not None and not (isinstance(keep, int) and 0 <= keep <= 1000):
+            return jsonify({'error': 'keep must be between 0 and 1000'}), 400
+        request_profiler.configure(sample_rate=sample_rate, keep=keep)
+        if data.get('clear'):
+            request_profiler.clear()
+    return jsonify({
+        'settings': request_profiler.stats(),
+        'profiles': [profile.summary() for profile in request_profiler.profiles()]
+    })
+
+@app.route('/admin/profiling/<int:profile_id>')
+@requires_admin
+def admin_profile(profile_id):
+    profile = request_profiler.get(profile_id)
+    if profile is None:
+        return jsonify({'error': 'Profile not found (it may have been displaced by slower requests)'}), 404
+    fmt = request.args.get('format', 'text')
+    if fmt == 'pstats':
+        response = app.response_class(profile.pstats_bytes(), mimetype='application/octet-stream')
+        response.headers['Content-Disposition'] = f'attachment; filename=profile-{profile_id}.prof'
+    elif fmt == 'collapsed':
+        response = app.response_class(profile.collapsed_stacks(), mimetype='text/plain')
+        response.headers['Content-Disposition'] = f'attachment; filename=profile-{profile_id}.folded'
+    elif fmt == 'text':
+        sort = request.args.get('sort', 'cumulative')
+        if sort not in ('cumulative', 'tottime', 'calls'):
+            return jsonify({'error': 'sort must be cumulative, tottime or calls'}), 400
+        response = app.response_class(profile.text_report(sort), mimetype='text/plain')
+    else:
+        return jsonify({'error': 'format must be pstats, collapsed or text'}), 400
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+@app.route('/metrics')
+def metrics_endpoint():
+    token = app.config['METRICS_TOKEN']
+    if token and not secrets.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return jsonify({'error': 'Unauthorized'}), 401
+    response = app.response_class(metrics.REGISTRY.render(), mimetype='text/plain')
+    response.headers['Content-Type'] = 'text/plain; version=0.0.4; charset=utf-8'
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+@app.route('/admin/banks')
+@requires_admin
+def admin_banks():
+    banks = []
+    for (spreadsheet_id, tab_name), bank, age in bank_cache.entries():
+        banks.append({
+            'spreadsheet_id': spreadsheet_id,
+            'tab_name': tab_name,
+            'age_seconds': round(age),
+            'diagnostics': bank.diagnostics,
+            **bank.summary()
+        })
+    return jsonify(banks)
+
+@app.route('/admin/attempt/<attempt_id>')
+@app.route('/admin/attempt/<spreadsheet_id>/<int:seed>')
+@app.route('/admin/attempt/<spreadsheet_id>/<tab_name>/<int:seed>')
+@cache_control('private, no-cache', etag=True)
+@requires_admin
+def admin_attempt(attempt_id=None, spreadsheet_id=None, tab_name=None, seed=None):
+    """Rebuild the full question and answer order of an attempt from its seed
+
+    /admin/attempt/<attempt_id> rebuilds a recorded attempt (the ID and seed
+    are in its "Started attempt" log line) on the bank version it started on.
+    Otherwise pass the seed with the tab, or ?tabs=A,B for a combined quiz,
+    plus the attempt's ?sections=, ?count= and ?version= to rebuild it exactly.
+    Superseded versions can only be rebuilt while they are still retained
+    (BANK_SNAPSHOT_TTL).
+    """
+    if attempt_id is not None:
+        if attempt_store is None:
+            return jsonify({'error': 'The attempt store is turned off (ATTEMPT_STORE_PATH)'}), 404
+        attempt = attempt_store.attempt(attempt_id)
+        if attempt is None:
+            return jsonify({'error': f'No recorded attempt {attempt_id}'}), 404
+        if attempt['seed'] is None:
+            return jsonify({'error': 'The attempt was recorded without its seed'}), 404
+        spreadsheet_id, seed, version = attempt['spreadsheet_id'], attempt['seed'], attempt['bank_version']
+        tabs = attempt['tabs'].split(',')
+        tabs = tabs[0] if len(tabs) == 1 else tabs
+        sections = attempt['sections']
+        count = attempt['total']
+    else:
+        tabs = tab_name
+        if tabs is None:
+            tabs = list(dict.fromkeys(name.strip() for name in request.args.get('tabs', '').split(',') if name.strip()))
+            if not tabs:
+                return jsonify({'error': 'Name the tab in the URL or pass ?tabs=A,B'}), 400
+            tabs = tabs[0] if len(tabs) == 1 else tabs
+        sections = [name.strip() for name in request.args.get('sections', '').split(',') if name.strip()]
+        count = request.args.get('count', type=int)
+        version = request.args.get('version')
+    
+    current = get_bank(spreadsheet_id, tabs)
+    bank = current if version is None else snapshot_bank(spreadsheet_id, tabs, version, current)
+    if bank is None:
+        if current is None:
+            return jsonify({'error': 'Could not load questions from spreadsheet'}), 400
+        return jsonify({'error': f'Bank version {version} is no longer available', 'current_version': current.version}), 409
+    try:
+        pool = bank.pool(sections)
+    except KeyError as e:
+        return jsonify({'error': f'Section {e} not found'}), 400
+    count = min(count, len(pool)) if count else len(pool)
+    # Fixed by the bank version and the request, so a repeat is answered without rebuilding it
+    etag = bank_etag(bank.version, seed, count, sections)
+    if not_modified(etag):
+        response = app.response_class(status=304)
+        response.set_etag(etag)
+        return response
+    order = AttemptOrder(seed, len(pool))
+    questions = []
+    for position in range(count):
+        question = bank.questions[pool[order.question_index(position)]]
+        questions.append({
+            'position': position + 1,
+            'row': question.row,
+            'question': question.text,
+            'answers': order.arrange_answers(position, question.answers),
+            'correct_answer': question.correct_answer
+        })
+    response = jsonify({'spreadsheet_id': spreadsheet_id, 'tabs': tabs, 'seed': seed, 'sections': sections,
+                        'bank_version': bank.version, 'questions': questions})
+    response.set_etag(etag)
+    return response
+
+@app.route('/admin/analytics/<spreadsheet_id>/<tab_name>')
+@app.route('/admin/analytics/<spreadsheet_id>')
+@requires_admin
+def admin_analytics(spreadsheet_id, tab_name=None):
+    """Difficulty and distractor statistics per question, hardest first
+
+    With a tab (or ?tabs=A,B for a combined quiz) every question currently in
+    it is listed, including ones nobody has answered yet; without one, every
+    question of the spreadsheet that has been answered. Served from running
+    totals, so the cost does not grow with the number of answers.
+    """
+    if attempt_store is None:
+        return jsonify({'error': 'The attempt store is turned off (ATTEMPT_STORE_PATH)'}), 404
+    limit = max(1, min(request.args.get('limit', 100, type=int), 1000))
+    min_answers = max(0, request.args.get('min_answers', 0, type=int))
+    tabs = tab_name
+    if tabs is None and request.args.get('tabs'):
+        tabs = [name.strip() for name in request.args['tabs'].split(',') if name.strip()]
+        tabs = tabs[0] if len(tabs) == 1 else tabs
+    
+    if tabs is None:
+        stats = attempt_store.question_stats(spreadsheet_id)
+        questions = [(None, item['question'], item['correct_answer'], [item['correct_answer']], item)
+                     for item in stats.values()]
+    else:
+        bank = get_bank(spreadsheet_id, tabs)
+        if bank is None:
+            return jsonify({'error': 'Could not load questions from spreadsheet'}), 400
+        stats = attempt_store.question_stats(spreadsheet_id, [question.text for question in bank.questions])
+        questions = [(question.row, question.text, question.correct_answer, question.answers,
+                      stats.get(question_key(question.text)))
+                     for question in bank.questions]
+    
+    items = []
+    for row, text, correct_answer, options, item in questions:
+        answered = item['answered'] if item else 0
+        if answered < min_answers:
+            continue
+        correct = item['correct'] if item else 0
+        picks = dict(item['wrong_answers']) if item else {}
+        picks[correct_answer] = correct
+        # Every option on offer, then any other answer students gave (e.g. before the sheet was edited)
+        answers = [{'answer': answer, 'correct': answer == correct_answer, 'picks': picks.pop(answer, 0)}
+                   for answer in dict.fromkeys(options)]
+        answers += [{'answer': answer, 'correct': False, 'picks': count}
+                    for answer, count in sorted(picks.items(), key=lambda pair: -pair[1])]
+        for answer in answers:
+            answer['share'] = round(answer['picks'] / answered, 3) if answered else None
+        items.append({
+            'row': row,
+            'question': text,
+            'answered': answered,
+            'correct': correct,
+            'correct_rate': round(correct / answered, 3) if answered else None,
+            'answers': answers
+        })
+    # Hardest first; questions nobody has answered go last
+    items.sort(key=lambda entry: (entry['correct_rate'] is None, entry['correct_rate'] or 0, -entry['answered']))
+    return jsonify({
+        'spreadsheet_id': spreadsheet_id,
+        'tabs': tabs,
+        'attempts': attempt_store.attempt_summary(spreadsheet_id, tabs),
+        'questions': items[:limit],
+        'total_questions': len(items),
+        'pending_events': attempt_store.stats()['queue_depth']
+    })
+
+@app.route('/admin/cache/invalidate', methods=['POST'])
+@requires_admin
+def invalidate_cache():
+    data = request.get_json(silent=True) or {}
+    spreadsheet_id = data.get('spreadsheet_id')
+    if not spreadsheet_id:
+        return jsonify({'error': 'No spreadsheet_id provided'}), 400
+    removed = bank_cache.invalidate(spreadsheet_id, data.get('tab_name'))
+    return jsonify({'success': True, 'removed': removed})
+
+def read_tab_request(data):
+    """(spreadsheet_id, tabs, error) from an admin JSON body naming a spreadsheet and optionally its tabs
+
+    tabs is [] when the body lists none. error is a message for a 400 when the
+    body is not an object, has no spreadsheet_id string, or has a tabs value
+    that is not a list of tab names.
+    """
+    if not isinstance(data, dict):
+        return None, [], 'Expected a JSON object'
+    spreadsheet_id = data.get('spreadsheet_id')
+    if not isinstance(spreadsheet_id, str) or not spreadsheet_id.strip():
+        return None, [], 'No spreadsheet_id provided'
+    tabs = data.get('tabs')
+    if tabs is None:
+        return spreadsheet_id, [], None
+    if not isinstance(tabs, list) or not all(isinstance(name, str) and name.strip() for name in tabs):
+        return spreadsheet_id, [], 'tabs must be a list of tab names'
+    return spreadsheet_id, tabs, None
+
+@app.route('/admin/cache/warm', methods=['POST'])
+@requires_admin
+def warm_cache():
+    """Load every tab of a spreadsheet (or the listed tabs) into the bank cache in one batch"""
+    spreadsheet_id, tabs, error = read_tab_request(request.get_json(silent=True) or {})
+    if error:
+        return jsonify({'error': error}), 400
+    try:
+        tabs = tabs or question_source(spreadsheet_id).tabs()
+    except SourceError as e:
+        return jsonify({'error': str(e)}), 404
+    except Exception as e:
+        log.exception("Error listing tabs to warm", extra={'spreadsheet_id': spreadsheet_id})
+        return jsonify({'error': str(e)}), 400
+    keys = [(spreadsheet_id, tab_name) for tab_name in tabs]
+    banks = get_banks(spreadsheet_id, tabs)
+    return jsonify({
+        'success': all(banks[key] is not None for key in keys),
+        'tabs': {tab_name: ({'questions': len(banks[key]), 'version': banks[key].version}
+                            if banks[key] is not None else {'error': 'Could not load questions'})
+                 for tab_name, key in zip(tabs, keys)}
+    })
+
+@app.route('/admin/prewarm', methods=['GET', 'POST'])
+@requires_admin
+def admin_prewarm():
+    """POST queues tabs for background loading; GET shows the queue, running jobs and recent timings"""
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or {}
+        spreadsheet_id, tabs, error = read_tab_request(data)
+        if error:
+            return jsonify({'error': error}), 400
+        tab_name = data.get('tab_name')
+        if not tabs and tab_name is not None:
+            if not isinstance(tab_name, str) or not tab_name.strip():
+                return jsonify({'error': 'tab_name must be a tab name'}), 400
+            tabs = [tab_name]
+        if not tabs:
+            return jsonify({'error': 'Provide spreadsheet_id and tab_name or tabs'}), 400
+        priority = data.get('priority', PRIORITY_ADMIN)
+        if not isinstance(priority, int) or isinstance(priority, bool):
+            return jsonify({'error': 'priority must be an integer (lower runs first)'}), 400
+        results = {tab_name: prewarm_pool.submit(spreadsheet_id, tab_name, priority) for tab_name in tabs}
+        return jsonify({'success': 'rejected' not in results.values(), 'tabs': results}), 202
+    return jsonify(prewarm_pool.status())
+
 @app.route('/test_sheet/<spreadsheet_id>/<tab_name>')
 def test_sheet(spreadsheet_id, tab_name):
     try:
         try:
-            creds = None
-            google_creds = os.environ.get('GOOGLE_CREDENTIALS')
-            if google_creds:
-                print("Found GOOGLE_CREDENTIALS in environment, loading...")
-                creds_dict = json.loads(google_creds)
-                creds = service_account.Credentials.from_service_account_info(creds_dict, scopes=['https://www.googleapis.com/auth/spreadsheets.readonly'])
-            else:
-                print("ERROR: No credentials found!")
-                raise ValueError("No credentials found")
-
-            print("Building sheets service...")
-            service = build('sheets', 'v4', credentials=creds)
-            sheet = service.spreadsheets()
+            sheet = sheets_client.get_client().spreadsheets()
             
-            print(f"Attempting to read {tab_name}!A1:F")
             result = sheet.values().get(
                 spreadsheetId=spreadsheet_id,
                 range=f'{tab_name}!A1:F'
@@ -456,10 +1228,7 @@ def test_sheet(spreadsheet_id, tab_name):
             })
         
     except Exception as e:
-        print(f"Error in test_sheet: {str(e)}")
-        print(f"Error type: {type(e)}")
-        import traceback
-        print(f"Traceback: {traceback.format_exc()}")
+        log.exception("Error in test_sheet")
         return jsonify({'error': str(e)}), 400
 
 @app.route('/test-sheets')
@@ -487,67 +1256,41 @@ def test_sheet_read():
     spreadsheet_id = "1O_3JeLPpPWMvakQEP8JVP0UB5FkwTW2k-IPirx2nkcM"
     tab_name = "Sheet1"
     
-    print("\n=== TESTING SHEET READ ===")
-    
-    # 1. Test Google Sheets API
-    try:
-        from googleapiclient.discovery import build
-        from google.oauth2 import service_account
-        print("✓ Successfully imported Google Sheets libraries")
-    except Exception as e:
-        print(f"✗ Error importing libraries: {e}")
-        return jsonify({"error": f"Import error: {str(e)}"})
+    client = sheets_client.get_client()
     
-    # 2. Test credentials
+    # 1. Test credentials
     try:
-        google_creds = os.environ.get('GOOGLE_CREDENTIALS')
-        if not google_creds:
-            print("✗ No credentials found in environment")
-            return jsonify({"error": "No credentials found"})
-        
-        creds_dict = json.loads(google_creds)
-        print(f"✓ Found credentials for project: {creds_dict.get('project_id')}")
-        print(f"✓ Service account email: {creds_dict.get('client_email')}")
+        creds = client.credentials()
+        log.info("Found credentials", extra={'project_id': creds.project_id, 'client_email': creds.service_account_email})
     except Exception as e:
-        print(f"✗ Error parsing credentials: {e}")
+        log.error("Error loading credentials: %s", e)
         return jsonify({"error": f"Credentials error: {str(e)}"})
     
-    # 3. Test service account auth
-    try:
-        SCOPES = ['https://www.googleapis.com/auth/spreadsheets.readonly']
-        creds = service_account.Credentials.from_service_account_info(creds_dict, scopes=SCOPES)
-        print("✓ Successfully created credentials object")
-    except Exception as e:
-        print(f"✗ Error creating service account auth: {e}")
-        return jsonify({"error": f"Auth error: {str(e)}"})
-    
-    # 4. Test building service
+    # 2. Test shared sheets service
     try:
-        service = build('sheets', 'v4', credentials=creds)
-        sheet = service.spreadsheets()
-        print("✓ Successfully built sheets service")
+        sheet = client.spreadsheets()
+        log.info("Sheets service ready")
     except Exception as e:
-        print(f"✗ Error building service: {e}")
+        log.error("Error building service: %s", e)
         return jsonify({"error": f"Service error: {str(e)}"})
     
-    # 5. Test fetching data
+    # 3. Test fetching data
     try:
         range_name = f'{tab_name}!A1:F'
-        print(f"Attempting to fetch range: {range_name}")
         result = sheet.values().get(spreadsheetId=spreadsheet_id, range=range_name).execute()
         values = result.get('values', [])
         if values:
-            print(f"✓ Successfully fetched {len(values)} rows")
+            log.info("Fetched test sheet", extra={'rows': len(values)})
             return jsonify({
                 "status": "success",
                 "row_count": len(values),
                 "first_row": values[0] if values else None
             })
         else:
-            print("✗ No data found in sheet")
+            log.warning("No data found in test sheet")
             return jsonify({"error": "No data found in sheet"})
     except Exception as e:
-        print(f"✗ Error fetching data: {e}")
+        log.error("Error fetching test sheet: %s", e)
         return jsonify({"error": f"Data fetch error: {str(e)}"})
 
 @app.route('/debug-sheet')
@@ -576,17 +1319,6 @@ def debug_sheet():
     except Exception as e:
         return jsonify({"error": f"Error: {str(e)}"})
 
-def shuffle_multiple_times(items, times=5):
-    """Shuffle a list multiple times with random seed"""
-    if not items:
-        return items
-    items = items.copy()  # Create a copy to avoid modifying original
-    # Set random seed based on current time for different shuffling each time
-    random.seed(time.time())
-    for _ in range(times):
-        random.shuffle(items)
-    return items
-
 if __name__ == '__main__':
     port = 5004
     app.run(host='0.0.0.0', port=port, debug=True)
@@ -0,0 +1,418 @@
+let debounceTimer;
+const spreadsheetInput = document.getElementById('spreadsheet-id');
+const tabSelect = document.getElementById('tab-name');
+const loadingTabs = document.getElementById('loading-tabs');
+const createBtn = document.getElementById('create-btn');
+
+spreadsheetInput.addEventListener('input', function() {
+    clearTimeout(debounceTimer);
+    debounceTimer = setTimeout(() => {
+        if (this.value.trim()) {
+            fetchTabs(this.value.trim());
+        } else {
+            resetTabSelect();
+        }
+    }, 500);
+});
+
+function resetTabSelect() {
+    tabSelect.innerHTML = '<option value="">Select a sheet</option>';
+    tabSelect.disabled = true;
+    loadingTabs.style.display = 'none';
+}
+
+async function fetchTabs(spreadsheetId) {
+    resetTabSelect();
+    loadingTabs.style.display = 'block';
+    
+    try {
+        const response = await fetch(`/get_tabs/${spreadsheetId}`);
+        const data = await response.json();
+        
+        if (data.error) {
+            throw new Error(data.error);
+        }
+        
+        if (Array.isArray(data)) {
+            tabSelect.innerHTML = '<option value="">Select a sheet</option>';
+            data.forEach(tab => {
+                const option = document.createElement('option');
+                option.value = tab;
+                option.textContent = tab;
+                tabSelect.appendChild(option);
+            });
+            tabSelect.disabled = false;
+
+            // Load every tab into the server's cache in one batch while a sheet is picked
+            fetch('/admin/cache/warm', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ spreadsheet_id: spreadsheetId, tabs: data })
+            }).catch(() => {});
+        } else {
+            throw new Error('Invalid response from server');
+        }
+    } catch (error) {
+        console.error('Error fetching tabs:', error);
+        tabSelect.innerHTML = '<option value="">Error loading sheets</option>';
+    } finally {
+        loadingTabs.style.display = 'none';
+    }
+}
+
+async function createQuiz() {
+    const spreadsheetId = document.getElementById('spreadsheet-id').value;
+    const tabName = document.getElementById('tab-name').value;
+    
+    if (!spreadsheetId || !tabName) {
+        alert('Please enter both Spreadsheet ID and select a Sheet');
+        return;
+    }
+
+    const quizUrl = `/quiz/${spreadsheetId}/${tabName}`;
+    addQuizLink(spreadsheetId, tabName, quizUrl);
+
+    // Have the server load the sheet in the background before students arrive
+    fetch('/admin/prewarm', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ spreadsheet_id: spreadsheetId, tab_name: tabName })
+    }).catch(() => {});
+    
+    // Clear the form
+    spreadsheetInput.value = '';
+    tabSelect.value = '';
+    resetTabSelect();
+}
+
+let folders = JSON.parse(localStorage.getItem('folders') || '[]');
+
+function createFolder() {
+    const name = prompt('Enter folder name:');
+    if (!name) return;
+    
+    const folder = {
+        id: Date.now().toString(),
+        name: name,
+        quizzes: []
+    };
+    
+    folders.push(folder);
+    saveFolders();
+    renderFolders();
+}
+
+function deleteFolder(folderId) {
+    if (!confirm('Are you sure you want to delete this folder? Quizzes will be moved to unorganized.')) return;
+    
+    const folder = folders.find(f => f.id === folderId);
+    if (folder) {
+        // Move quizzes to unorganized
+        folder.quizzes.forEach(quiz => {
+            const savedQuizzes = JSON.parse(localStorage.getItem('quizzes') || '[]');
+            savedQuizzes.push(quiz);
+            localStorage.setItem('quizzes', JSON.stringify(savedQuizzes));
+        });
+    }
+    
+    folders = folders.filter(f => f.id !== folderId);
+    saveFolders();
+    renderFolders();
+    loadSavedQuizzes();
+}
+
+function renameFolder(folderId) {
+    const folder = folders.find(f => f.id === folderId);
+    if (!folder) return;
+    
+    const newName = prompt('Enter new folder name:', folder.name);
+    if (!newName) return;
+    
+    folder.name = newName;
+    saveFolders();
+    renderFolders();
+}
+
+function toggleFolder(folderId) {
+    const folderDiv = document.querySelector(`.folder[data-id="${folderId}"]`);
+    if (folderDiv) {
+        folderDiv.classList.toggle('open');
+    }
+}
+
+function saveFolders() {
+    localStorage.setItem('folders', JSON.stringify(folders));
+}
+
+function renderFolders() {
+    const container = document.getElementById('folders-container');
+    container.innerHTML = '';
+    
+    folders.forEach(folder => {
+        const folderDiv = document.createElement('div');
+        folderDiv.className = 'folder';
+        folderDiv.dataset.id = folder.id;
+        
+        folderDiv.innerHTML = `
+            <div class="folder-header" onclick="toggleFolder('${folder.id}')">
+                <h3>
+                    <span class="folder-icon">▶</span>
+                    ${folder.name} (${folder.quizzes.length})
+                </h3>
+                <div class="folder-actions">
+                    <button onclick="event.stopPropagation(); renameFolder('${folder.id}')" class="copy-btn">
+                        Rename
+                    </button>
+                    <button onclick="event.stopPropagation(); deleteFolder('${folder.id}')" class="deactivate-btn">
+                        Delete
+                    </button>
+                </div>
+            </div>
+            <div class="folder-content" ondragover="handleDragOver(event)" ondrop="handleDrop(event, '${folder.id}')">
+                ${folder.quizzes.map(quiz => createQuizLinkHTML(quiz, folder.id)).join('')}
+            </div>
+        `;
+        
+        container.appendChild(folderDiv);
+    });
+}
+
+function addQuizLink(spreadsheetId, tabName, quizUrl) {
+    const quizData = { spreadsheetId, tabName, quizUrl };
+    const savedQuizzes = JSON.parse(localStorage.getItem('quizzes') || '[]');
+    
+    // Check for duplicates
+    const isDuplicate = savedQuizzes.some(q => 
+        q.spreadsheetId === spreadsheetId && q.tabName === tabName
+    );
+    
+    if (!isDuplicate) {
+        savedQuizzes.push(quizData);
+        localStorage.setItem('quizzes', JSON.stringify(savedQuizzes));
+        
+        const quizLinksDiv = document.getElementById('quiz-links');
+        quizLinksDiv.insertAdjacentHTML('beforeend', createQuizLinkHTML(quizData));
+    }
+}
+
+function createQuizLinkHTML(quiz, folderId = null) {
+    const fullUrl = window.location.origin + quiz.quizUrl;
+    const checkboxHtml = !folderId ? `
+        <input type="checkbox" class="quiz-checkbox" onchange="updateSelectAllState()">
+    ` : '';
+    
+    return `
+        <div class="quiz-link" draggable="true" 
+            ondragstart="handleDragStart(event, '${quiz.spreadsheetId}', '${quiz.tabName}', '${quiz.quizUrl}')"
+            data-spreadsheet-id="${quiz.spreadsheetId}"
+            data-tab-name="${quiz.tabName}"
+            data-quiz-url="${quiz.quizUrl}">
+            ${checkboxHtml}
+            <div class="quiz-info">
+                <div class="sheet-name">${quiz.tabName}</div>
+                <div class="quiz-url">${fullUrl}</div>
+            </div>
+            <div class="button-group">
+                <button class="copy-btn" onclick="navigator.clipboard.writeText('${fullUrl}')">
+                    Copy Link
+                </button>
+                <button onclick="window.open('${quiz.quizUrl}', '_blank')" class="start-btn">
+                    Start Quiz
+                </button>
+                <button class="deactivate-btn" onclick="removeQuiz(this, '${folderId}')">
+                    Remove
+                </button>
+            </div>
+        </div>
+    `;
+}
+
+function removeQuiz(button, folderId) {
+    const quizDiv = button.closest('.quiz-link');
+    const spreadsheetId = quizDiv.dataset.spreadsheetId;
+    const tabName = quizDiv.dataset.tabName;
+    
+    if (folderId) {
+        // Remove from folder
+        const folder = folders.find(f => f.id === folderId);
+        if (folder) {
+            folder.quizzes = folder.quizzes.filter(q => 
+                !(q.spreadsheetId === spreadsheetId && q.tabName === tabName)
+            );
+            saveFolders();
+        }
+    } else {
+        // Remove from unorganized quizzes
+        const savedQuizzes = JSON.parse(localStorage.getItem('quizzes') || '[]');
+        const updatedQuizzes = savedQuizzes.filter(q => 
+            !(q.spreadsheetId === spreadsheetId && q.tabName === tabName)
+        );
+        localStorage.setItem('quizzes', JSON.stringify(updatedQuizzes));
+    }
+    
+    quizDiv.remove();
+}
+
+function handleDragStart(event, spreadsheetId, tabName, quizUrl) {
+    event.dataTransfer.setData('application/json', JSON.stringify({
+        spreadsheetId, tabName, quizUrl
+    }));
+    event.target.classList.add('dragging');
+}
+
+function handleDragOver(event) {
+    event.preventDefault();
+    event.currentTarget.classList.add('drag-over');
+}
+
+function handleDragLeave(event) {
+    event.currentTarget.classList.remove('drag-over');
+}
+
+function handleDrop(event, folderId) {
+    event.preventDefault();
+    event.currentTarget.classList.remove('drag-over');
+    
+    const quizData = JSON.parse(event.dataTransfer.getData('application/json'));
+    const sourceElement = document.querySelector('.dragging');
+    
+    if (sourceElement) {
+        sourceElement.classList.remove('dragging');
+        
+        // Remove from source
+        if (sourceElement.closest('.folder')) {
+            const sourceFolder = folders.find(f => 
+                f.id === sourceElement.closest('.folder').dataset.id
+            );
+            if (sourceFolder) {
+                sourceFolder.quizzes = sourceFolder.quizzes.filter(q => 
+                    !(q.spreadsheetId === quizData.spreadsheetId && q.tabName === quizData.tabName)
+                );
+            }
+        } else {
+            // Remove from unorganized
+            const savedQuizzes = JSON.parse(localStorage.getItem('quizzes') || '[]');
+            const updatedQuizzes = savedQuizzes.filter(q => 
+                !(q.spreadsheetId === quizData.spreadsheetId && q.tabName === quizData.tabName)
+            );
+            localStorage.setItem('quizzes', JSON.stringify(updatedQuizzes));
+        }
+        
+        // Add to target folder
+        const targetFolder = folders.find(f => f.id === folderId);
+        if (targetFolder) {
+            targetFolder.quizzes.push(quizData);
+            saveFolders();
+            renderFolders();
+            loadSavedQuizzes();
+        }
+    }
+}
+
+function loadSavedQuizzes() {
+    const quizLinksDiv = document.getElementById('quiz-links');
+    quizLinksDiv.innerHTML = '';
+    
+    const savedQuizzes = JSON.parse(localStorage.getItem('quizzes') || '[]');
+    savedQuizzes.forEach(quiz => {
+        quizLinksDiv.insertAdjacentHTML('beforeend', createQuizLinkHTML(quiz));
+    });
+    
+    updateMultiSelectControls();
+}
+
+function updateFolderSelect() {
+    const select = document.querySelector('.folder-select');
+    select.innerHTML = '<option value="">Select Folder...</option>';
+    folders.forEach(folder => {
+        const option = document.createElement('option');
+        option.value = folder.id;
+        option.textContent = folder.name;
+        select.appendChild(option);
+    });
+}
+
+function toggleSelectAll(checkbox) {
+    const quizCheckboxes = document.querySelectorAll('.quiz-checkbox');
+    quizCheckboxes.forEach(box => box.checked = checkbox.checked);
+}
+
+function updateMultiSelectControls() {
+    const controls = document.querySelector('.multi-select-controls');
+    const checkboxes = document.querySelectorAll('.quiz-checkbox');
+    const hasCheckboxes = checkboxes.length > 0;
+    controls.classList.toggle('visible', hasCheckboxes);
+    
+    if (hasCheckboxes) {
+        updateFolderSelect();
+    }
+}
+
+function updateSelectAllState() {
+    const allCheckboxes = document.querySelectorAll('.quiz-checkbox');
+    const checkedCheckboxes = document.querySelectorAll('.quiz-checkbox:checked');
+    const selectAllCheckbox = document.querySelector('.select-all-checkbox');
+    
+    if (allCheckboxes.length > 0) {
+        selectAllCheckbox.checked = allCheckboxes.length === checkedCheckboxes.length;
+        selectAllCheckbox.indeterminate = checkedCheckboxes.length > 0 && 
+            checkedCheckboxes.length < allCheckboxes.length;
+    }
+}
+
+function moveSelectedToFolder() {
+    const selectedFolderId = document.querySelector('.folder-select').value;
+    if (!selectedFolderId) {
+        alert('Please select a folder first');
+        return;
+    }
+
+    const checkedBoxes = document.querySelectorAll('.quiz-checkbox:checked');
+    if (checkedBoxes.length === 0) {
+        alert('Please select at least one quiz');
+        return;
+    }
+
+    const targetFolder = folders.find(f => f.id === selectedFolderId);
+    if (!targetFolder) return;
+
+    checkedBoxes.forEach(box => {
+        const quizDiv = box.closest('.quiz-link');
+        const spreadsheetId = quizDiv.dataset.spreadsheetId;
+        const tabName = quizDiv.dataset.tabName;
+        const quizUrl = quizDiv.dataset.quizUrl;
+
+        // Remove from unorganized
+        const savedQuizzes = JSON.parse(localStorage.getItem('quizzes') || '[]');
+        const updatedQuizzes = savedQuizzes.filter(q => 
+            !(q.spreadsheetId === spreadsheetId && q.tabName === tabName)
+        );
+        localStorage.setItem('quizzes', JSON.stringify(updatedQuizzes));
+
+        // Add to folder
+        const quizData = {
+            spreadsheetId,
+            tabName,
+            quizUrl
+        };
+        
+        // Check if quiz already exists in target folder
+        const isDuplicate = targetFolder.quizzes.some(q => 
+            q.spreadsheetId === spreadsheetId && q.tabName === tabName
+        );
+        
+        if (!isDuplicate) {
+            targetFolder.quizzes.push(quizData);
+        }
+    });
+
+    saveFolders();
+    renderFolders();
+    loadSavedQuizzes();
+}
+
+window.onload = function() {
+    renderFolders();
+    loadSavedQuizzes();
+    updateMultiSelectControls();
+};
@@ -0,0 +1,331 @@
+"""Persistent record of attempts and per-question answer statistics.
+
+Attempts and their answers are kept in a SQLite database (WAL mode, shared
+by every worker on the host) so they outlive the session.  Nothing touches
+the disk on the request path: record_start() and record_answer() append an
+event to an in-memory queue, and a background writer commits the queue in
+batches, one transaction per ``batch_size`` events or ``flush_interval``
+seconds, whichever comes first.  A full queue drops new events (counted in
+stats()) rather than slowing students down.
+
+Each batch also updates running totals per question (answered, correct)
+and per wrong answer given (picks), so analytics are read straight from
+those small tables instead of being computed from the raw answers.  An
+answer is counted once: re-recording the same position of an attempt is
+ignored.  Questions are keyed by spreadsheet and question text, so their
+statistics survive rows being moved or other rows being edited.
+
+Tables:
+    attempts        one row per attempt: source, size, seed, sections and
+                    requested count (to rebuild it), score, start/end
+    answers         one row per answer (attempt, position, question, answer)
+    question_stats  answered/correct totals per question
+    answer_stats    picks per wrong answer per question
+"""
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from collections import deque
+
+log = logging.getLogger('quizmaker.attempts')
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS attempts (id TEXT PRIMARY KEY, spreadsheet_id TEXT NOT NULL, tabs TEXT NOT NULL, '
+    'bank_version TEXT, mode TEXT NOT NULL, total INTEGER NOT NULL, answered INTEGER NOT NULL DEFAULT 0, '
+    'score INTEGER NOT NULL DEFAULT 0, started REAL NOT NULL, updated REAL NOT NULL, completed REAL, '
+    'seed INTEGER, sections TEXT, count INTEGER)',
+    'CREATE INDEX IF NOT EXISTS attempts_quiz ON attempts (spreadsheet_id, tabs)',
+    'CREATE TABLE IF NOT EXISTS answers (attempt_id TEXT NOT NULL, position INTEGER NOT NULL, '
+    'question_key TEXT NOT NULL, answer TEXT NOT NULL, correct INTEGER NOT NULL, answered_at REAL NOT NULL, '
+    'PRIMARY KEY (attempt_id, position))',
+    'CREATE TABLE IF NOT EXISTS question_stats (spreadsheet_id TEXT NOT NULL, question_key TEXT NOT NULL, '
+    'question TEXT NOT NULL, correct_answer TEXT NOT NULL, answered INTEGER NOT NULL, correct INTEGER NOT NULL, '
+    'updated REAL NOT NULL, PRIMARY KEY (spreadsheet_id, question_key))',
+    'CREATE TABLE IF NOT EXISTS answer_stats (spreadsheet_id TEXT NOT NULL, question_key TEXT NOT NULL, '
+    'answer TEXT NOT NULL, picks INTEGER NOT NULL, PRIMARY KEY (spreadsheet_id, question_key, answer))',
+)
+
+# Added to attempts after its first release; databases created before get them on open
+ADDED_COLUMNS = (('seed', 'INTEGER'), ('sections', 'TEXT'), ('count', 'INTEGER'))
+
+_START = 'start'
+_ANSWER = 'answer'
+
+
+def question_key(text):
+    """Stable key for a question's statistics, from its text."""
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=8).hexdigest()
+
+
+def tabs_key(tabs):
+    """Attempts on several tabs are stored under their names joined with commas."""
+    return tabs if isinstance(tabs, str) else ','.join(tabs)
+
+
+class AttemptStore:
+    def __init__(self, path, batch_size=500, flush_interval=1.0, max_queue=10000):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self._queue = deque()
+        self._lock = threading.Lock()
+        self._ready = threading.Condition(self._lock)
+        self._thread = None
+        self._closed = False
+        self._enqueued = 0  # Events accepted so far
+        self._written = 0  # Events taken off the queue and committed (or lost with a failed batch)
+        self._flush_target = 0  # flush() waits for _written to reach this
+        self._local = threading.local()
+        self._stats = {'recorded': 0, 'dropped': 0, 'written': 0, 'ignored': 0, 'batches': 0,
+                       'failed_batches': 0, 'lost': 0, 'flush_seconds': 0.0, 'last_batch_size': 0}
+        conn = self._connect()
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            for statement in SCHEMA:
+                conn.execute(statement)
+            self._add_columns(conn)
+        finally:
+            conn.close()
+
+    def _add_columns(self, conn):
+        existing = {row[1] for row in conn.execute('PRAGMA table_info(attempts)')}
+        for name, kind in ADDED_COLUMNS:
+            if name in existing:
+                continue
+            try:
+                conn.execute(f'ALTER TABLE attempts ADD COLUMN {name} {kind}')
+            except sqlite3.OperationalError as e:
+                if 'duplicate column' not in str(e):  # Another worker added it first
+                    raise
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def _conn(self):
+        # sqlite3 connections must not be shared between threads
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    # Request path: queue only
+
+    def _put(self, event):
+        with self._ready:
+            if self._closed:
+                return False
+            if len(self._queue) >= self.max_queue:
+                self._stats['dropped'] += 1
+                return False
+            self._queue.append(event)
+            self._enqueued += 1
+            self._stats['recorded'] += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='attempt-writer', daemon=True)
+                self._thread.start()
+            if len(self._queue) >= self.batch_size:
+                self._ready.notify_all()
+        return True
+
+    def record_start(self, attempt_id, spreadsheet_id, tabs, bank_version, total, mode='online', seed=None,
+                     sections=None, count=None, when=None):
+        """Queue the start of an attempt; returns False if the event was dropped.
+
+        seed, sections and the requested count are what an audit needs to rebuild the attempt.
+        """
+        return self._put((_START, attempt_id, spreadsheet_id, tabs_key(tabs), bank_version, mode, total, seed,
+                          ','.join(sections) if sections else None, count, when or time.time()))
+
+    def record_answer(self, attempt_id, spreadsheet_id, position, question, correct_answer, answer, correct,
+                      when=None):
+        """Queue one graded answer; returns False if the event was dropped."""
+        return self._put((_ANSWER, attempt_id, spreadsheet_id, position, question, correct_answer, answer,
+                          bool(correct), when or time.time()))
+
+    # Background writer
+
+    def _run(self):
+        while True:
+            with self._ready:
+                while not self._queue and not self._closed:
+                    self._ready.wait()
+                # Let a batch build up, unless it is already full or someone is waiting for it
+                deadline = time.monotonic() + self.flush_interval
+                while (len(self._queue) < self.batch_size and not self._closed
+                       and self._flush_target <= self._written):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._ready.wait(remaining)
+                batch = [self._queue.popleft() for _ in range(min(len(self._queue), self.batch_size))]
+                if not batch and self._closed:
+                    return
+            try:
+                self._write(batch)
+            except Exception:
+                # Never let the writer die: the queue would then grow until every event is dropped
+                log.exception("Attempt writer failed", extra={'events': len(batch)})
+                with self._lock:
+                    self._stats['failed_batches'] += 1
+                    self._stats['lost'] += len(batch)
+            with self._ready:
+                self._written += len(batch)
+                self._ready.notify_all()
+
+    def _write(self, batch):
+        started = time.perf_counter()
+        conn = self._conn()
+        attempts = {}  # attempt_id -> [answered, score, last answered_at]
+        questions = {}  # (spreadsheet_id, key) -> [question, correct_answer, answered, correct, updated]
+        picks = {}  # (spreadsheet_id, key, answer) -> picks
+        ignored = 0
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            for event in batch:
+                if event[0] == _START:
+                    _, attempt_id, spreadsheet_id, tabs, version, mode, total, seed, sections, count, when = event
+                    conn.execute('INSERT OR IGNORE INTO attempts (id, spreadsheet_id, tabs, bank_version, mode, '
+                                 'total, seed, sections, count, started, updated) '
+                                 'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                                 (attempt_id, spreadsheet_id, tabs, version, mode, total, seed, sections, count,
+                                  when, when))
+                    continue
+                _, attempt_id, spreadsheet_id, position, question, correct_answer, answer, correct, when = event
+                key = question_key(question)
+                inserted = conn.execute('INSERT OR IGNORE INTO answers (attempt_id, position, question_key, answer, '
+                                        'correct, answered_at) VALUES (?, ?, ?, ?, ?, ?)',
+                                        (attempt_id, position, key, answer, int(correct), when)).rowcount
+                if not inserted:  # Already recorded; totals must not count it twice
+                    ignored += 1
+                    continue
+                totals = attempts.setdefault(attempt_id, [0, 0, when])
+                totals[0] += 1
+                totals[1] += correct
+                totals[2] = max(totals[2], when)
+                item = questions.setdefault((spreadsheet_id, key), [question, correct_answer, 0, 0, when])
+                item[1] = correct_answer
+                item[2] += 1
+                item[3] += correct
+                item[4] = max(item[4], when)
+                if not correct:
+                    picks[(spreadsheet_id, key, answer)] = picks.get((spreadsheet_id, key, answer), 0) + 1
+            # Totals are aggregated per batch, so each row is updated once however many answers it got
+            conn.executemany(
+                'UPDATE attempts SET answered = answered + ?, score = score + ?, updated = ?, '
+                'completed = CASE WHEN completed IS NULL AND answered + ? >= total THEN ? ELSE completed END '
+                'WHERE id = ?',
+                [(answered, score, when, answered, when, attempt_id)
+                 for attempt_id, (answered, score, when) in attempts.items()])
+            conn.executemany(
+                'INSERT INTO question_stats (spreadsheet_id, question_key, question, correct_answer, answered, '
+                'correct, updated) VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT (spreadsheet_id, question_key) DO UPDATE '
+                'SET answered = answered + excluded.answered, correct = correct + excluded.correct, '
+                'correct_answer = excluded.correct_answer, updated = excluded.updated',
+                [(spreadsheet_id, key, *item) for (spreadsheet_id, key), item in questions.items()])
+            conn.executemany(
+                'INSERT INTO answer_stats (spreadsheet_id, question_key, answer, picks) VALUES (?, ?, ?, ?) '
+                'ON CONFLICT (spreadsheet_id, question_key, answer) DO UPDATE SET picks = picks + excluded.picks',
+                [(*key, count) for key, count in picks.items()])
+            conn.execute('COMMIT')
+        except Exception as e:
+            # Not only sqlite3.Error: a malformed event must cost its batch, not the writer thread
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            log.error("Failed to write attempt events: %s", e, extra={'events': len(batch)},
+                      exc_info=not isinstance(e, sqlite3.Error))
+            with self._lock:
+                self._stats['failed_batches'] += 1
+                self._stats['lost'] += len(batch)
+            return
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self._stats['batches'] += 1
+            self._stats['written'] += len(batch) - ignored
+            self._stats['ignored'] += ignored
+            self._stats['flush_seconds'] += elapsed
+            self._stats['last_batch_size'] = len(batch)
+
+    def flush(self, timeout=10.0):
+        """Wait until every event queued so far is written; returns False on timeout."""
+        deadline = time.monotonic() + timeout
+        with self._ready:
+            target = self._flush_target = max(self._flush_target, self._enqueued)
+            self._ready.notify_all()
+            while self._written < target:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self._thread is None:
+                    return False
+                self._ready.wait(remaining)
+        return True
+
+    def close(self, timeout=10.0):
+        """Write what is queued and stop the writer; later events are ignored."""
+        with self._ready:
+            self._closed = True
+            self._ready.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    # Reads
+
+    def question_stats(self, spreadsheet_id, questions=None):
+        """{question key: stats} for a spreadsheet, limited to the given question texts if any.
+
+        Stats are {'question', 'correct_answer', 'answered', 'correct', 'wrong_answers': {answer: picks}}.
+        """
+        conn = self._conn()
+        keys = None if questions is None else sorted({question_key(text) for text in questions})
+        found = {}
+        for chunk in ([None] if keys is None else [keys[i:i + 500] for i in range(0, len(keys), 500)]):
+            where = 'spreadsheet_id = ?'
+            params = [spreadsheet_id]
+            if chunk is not None:
+                where += f" AND question_key IN ({','.join('?' * len(chunk))})"
+                params += chunk
+            for key, question, correct_answer, answered, correct in conn.execute(
+                    f'SELECT question_key, question, correct_answer, answered, correct FROM question_stats '
+                    f'WHERE {where}', params):
+                found[key] = {'question': question, 'correct_answer': correct_answer, 'answered': answered,
+                              'correct': correct, 'wrong_answers': {}}
+            for key, answer, count in conn.execute(
+                    f'SELECT question_key, answer, picks FROM answer_stats WHERE {where}', params):
+                if key in found:
+                    found[key]['wrong_answers'][answer] = count
+        return found
+
+    def attempt(self, attempt_id):
+        """One attempt as a dict of its columns (sections as a list), or None if it is not recorded."""
+        conn = self._conn()
+        cursor = conn.execute('SELECT * FROM attempts WHERE id = ?', (attempt_id,))
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        attempt = dict(zip((column[0] for column in cursor.description), row))
+        attempt['sections'] = attempt['sections'].split(',') if attempt['sections'] else []
+        return attempt
+
+    def attempt_summary(self, spreadsheet_id, tabs=None):
+        """Counts and mean score of the attempts on a spreadsheet, or on one quiz of it."""
+        where = 'spreadsheet_id = ?'
+        params = [spreadsheet_id]
+        if tabs is not None:
+            where += ' AND tabs = ?'
+            params.append(tabs_key(tabs))
+        started, completed, mean = self._conn().execute(
+            f'SELECT COUNT(*), COUNT(completed), AVG(CASE WHEN completed IS NOT NULL AND total > 0 '
+            f'THEN score * 1.0 / total END) FROM attempts WHERE {where}', params).fetchone()
+        return {'started': started, 'completed': completed,
+                'mean_percentage': round(mean * 100, 1) if mean is not None else None}
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['queue_depth'] = len(self._queue)
+        stats['flush_seconds'] = round(stats['flush_seconds'], 3)
+        return stats
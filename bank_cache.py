@@ -0,0 +1,282 @@
+"""In-process cache of parsed question banks.
+
+Entries are keyed by ``(spreadsheet_id, tab_name)``, bounded in number and
+evicted least-recently-used first.  An entry is fresh for ``ttl`` seconds;
+after that it is still served for up to ``stale_ttl`` seconds while a single
+background thread reloads it (stale-while-revalidate).
+
+Loads are coalesced: concurrent misses for one key share a single loader
+call, and get_many() fills several cold keys with one batch load.  A failed load is remembered for ``failure_ttl`` seconds so a burst of
+requests against a broken sheet does not turn into a burst of retries.
+While loads keep failing, a key that has ever loaded keeps serving its last
+good value, however old (stale-if-error), until it is evicted.
+
+SnapshotRegistry keeps superseded bank versions alive for the attempts that
+started on them.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from singleflight import SingleFlight
+
+log = logging.getLogger('quizmaker.bank_cache')
+
+
+class _Entry:
+    __slots__ = ('value', 'loaded_at')
+
+    def __init__(self, value, loaded_at):
+        self.value = value
+        self.loaded_at = loaded_at
+
+
+class BankCache:
+    def __init__(self, max_entries=128, ttl=300, stale_ttl=3600, failure_ttl=5):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stale_ttl = max(stale_ttl, ttl)
+        self.failure_ttl = failure_ttl
+        self._entries = OrderedDict()
+        self._failures = {}
+        self._refreshing = set()
+        self._flight = SingleFlight()
+        self._lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'stale_hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'refreshes': 0,
+            'refresh_failures': 0,
+            'invalidations': 0,
+            'failed_loads': 0,
+            'suppressed_retries': 0,
+            'stale_if_error': 0,
+            'batch_loads': 0,
+            'batch_failures': 0,
+        }
+
+    def get(self, key, loader):
+        """Return the cached value for key, calling loader() to fill it.
+
+        loader returning None means "could not load"; that result (or the
+        exception loader raised) is passed through to every waiting caller
+        but never cached as a value.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                age = now - entry.loaded_at
+                if age < self.ttl:
+                    self._entries.move_to_end(key)
+                    self._stats['hits'] += 1
+                    return entry.value
+                if age < self.stale_ttl:
+                    self._entries.move_to_end(key)
+                    self._stats['stale_hits'] += 1
+                    if key not in self._refreshing:
+                        self._refreshing.add(key)
+                        threading.Thread(target=self._refresh, args=(key, loader), daemon=True).start()
+                    return entry.value
+            failure = self._failures.get(key)
+            if failure is not None and now - failure[0] < self.failure_ttl:
+                self._stats['suppressed_retries'] += 1
+                if entry is not None:
+                    self._stats['stale_if_error'] += 1
+                    return entry.value
+                if failure[1] is not None:
+                    raise failure[1]
+                return None
+            self._stats['misses'] += 1
+
+        return self._flight.do(key, lambda: self._load(key, loader))
+
+    def get_many(self, keys, loader, batch_loader):
+        """get() for several keys, filling every uncached key with one batch load.
+
+        batch_loader(missing_keys) returns {key: value}; a key it leaves out
+        or maps to None falls back to loader(key), which also refreshes
+        stale entries one key at a time.  Returns {key: value or None}.
+        """
+        now = time.monotonic()
+        with self._lock:
+            # Keys whose last load failed recently are left to get(), which reports the failure
+            missing = [key for key in keys if key not in self._entries
+                       and not (key in self._failures and now - self._failures[key][0] < self.failure_ttl)]
+        if missing:
+            batch_key = ('batch',) + tuple(missing)
+            try:
+                self._flight.do(batch_key, lambda: self._load_batch(missing, batch_loader))
+            except Exception as e:
+                log.warning("Batch load failed: %s", e, extra={'keys': [list(key) for key in missing]})
+                with self._lock:
+                    self._stats['batch_failures'] += 1
+        return {key: self.get(key, lambda key=key: loader(key)) for key in keys}
+
+    def _load_batch(self, keys, batch_loader):
+        values = batch_loader(keys)
+        with self._lock:
+            self._stats['batch_loads'] += 1
+        for key in keys:
+            value = values.get(key)
+            if value is not None:
+                with self._lock:
+                    self._failures.pop(key, None)
+                self.put(key, value)
+
+    def reload(self, key, loader):
+        """Load key now, replacing any cached value; coalesced with other loads of key."""
+        return self._flight.do(key, lambda: self._load(key, loader, force=True))
+
+    def _load(self, key, loader, force=False):
+        # Another flight may have filled the entry between our miss and now
+        with self._lock:
+            entry = self._entries.get(key)
+            if not force and entry is not None and time.monotonic() - entry.loaded_at < self.ttl:
+                return entry.value
+        try:
+            value = loader()
+        except Exception as e:
+            self._record_failure(key, e)
+            if entry is None or force:
+                raise
+            return self._stale_if_error(key, entry)
+        if value is None:
+            self._record_failure(key, None)
+            # A forced reload reports its failure; the old entry stays cached either way
+            return self._stale_if_error(key, entry) if entry is not None and not force else None
+        with self._lock:
+            self._failures.pop(key, None)
+        self.put(key, value)
+        return value
+
+    def _stale_if_error(self, key, entry):
+        log.warning("Serving last good value after a failed load", extra={
+            'key': list(key), 'age_s': round(time.monotonic() - entry.loaded_at, 1)})
+        with self._lock:
+            self._stats['stale_if_error'] += 1
+        return entry.value
+
+    def _record_failure(self, key, error):
+        with self._lock:
+            self._failures[key] = (time.monotonic(), error)
+            self._stats['failed_loads'] += 1
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = _Entry(value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def peek(self, key):
+        """Return the cached value for key regardless of age, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry.value if entry is not None else None
+
+    def entries(self):
+        """Snapshot of (key, value, age_seconds), most recently used last."""
+        now = time.monotonic()
+        with self._lock:
+            return [(key, entry.value, now - entry.loaded_at) for key, entry in self._entries.items()]
+
+    def _refresh(self, key, loader):
+        # Failures here keep the stale entry; they are not recorded as
+        # negative results because the key still has a value to serve.
+        try:
+            value = self._flight.do(key, loader)
+        except Exception as e:
+            log.warning("Background refresh failed: %s", e, extra={'key': list(key)})
+            value = None
+        with self._lock:
+            self._refreshing.discard(key)
+            if value is None:
+                self._stats['refresh_failures'] += 1
+                return
+            self._stats['refreshes'] += 1
+        self.put(key, value)
+
+    def invalidate(self, spreadsheet_id, tab_name=None):
+        """Drop one tab, or every tab of a spreadsheet. Returns the number removed."""
+        with self._lock:
+            keys = [key for key in self._entries
+                    if key[0] == spreadsheet_id and (tab_name is None or key[1] == tab_name)]
+            for key in keys:
+                del self._entries[key]
+            for key in [key for key in self._failures
+                        if key[0] == spreadsheet_id and (tab_name is None or key[1] == tab_name)]:
+                del self._failures[key]
+            self._stats['invalidations'] += len(keys)
+            return len(keys)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = len(self._entries)
+            stats['max_entries'] = self.max_entries
+        stats.update(self._flight.stats())
+        lookups = stats['hits'] + stats['stale_hits'] + stats['misses']
+        stats['hit_rate'] = round((stats['hits'] + stats['stale_hits']) / lookups, 4) if lookups else None
+        return stats
+
+
+class SnapshotRegistry:
+    """Bank versions that attempts in progress were started on.
+
+    An attempt asks for its bank by ``(bank_id, version)``.  While the cache
+    still holds that version it is simply recorded here; once a refresh has
+    replaced it, attempts that started on it keep getting the old bank from
+    here, so they finish on a consistent snapshot while new attempts see the
+    update.  A version is dropped once no attempt has asked for it in
+    ``idle_ttl`` seconds, or when more than ``max_entries`` are held.
+    """
+
+    def __init__(self, idle_ttl=3600, max_entries=256):
+        self.idle_ttl = idle_ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # (bank_id, version) -> [bank, last_used]
+        self._lock = threading.Lock()
+        self._stats = {'superseded_hits': 0, 'misses': 0, 'expired': 0}
+
+    def use(self, bank_id, version, current):
+        """The bank for an attempt on `version`: `current` if it is that version, else a retained one, else None."""
+        now = time.monotonic()
+        key = (bank_id, version)
+        with self._lock:
+            if current is not None and current.version == version:
+                entry = self._entries.get(key)
+                if entry is None or entry[0] is not current:
+                    self._entries[key] = [current, now]
+                else:
+                    entry[1] = now
+                self._entries.move_to_end(key)
+                self._trim(now)
+                return current
+            entry = self._entries.get(key)
+            if entry is None or now - entry[1] >= self.idle_ttl:
+                self._stats['misses'] += 1
+                return None
+            entry[1] = now
+            self._entries.move_to_end(key)
+            self._stats['superseded_hits'] += 1
+            return entry[0]
+
+    def _trim(self, now):
+        # Called with the lock held; least recently used entries are at the front
+        while self._entries:
+            key, (_, last_used) = next(iter(self._entries.items()))
+            if len(self._entries) <= self.max_entries and now - last_used < self.idle_ttl:
+                break
+            del self._entries[key]
+            self._stats['expired'] += 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['versions'] = len(self._entries)
+        return stats
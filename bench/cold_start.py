@@ -0,0 +1,85 @@
+"""Measure cold starts with and without a precompiled bank file.
+
+Each run starts a fresh Python process, the way a serverless platform does,
+imports the app and serves the first quiz page through Flask's test client.
+Sheets calls go to bench/fake_sheets.py with the given latency.  Reports the
+median import time, first-request time and total over several runs:
+
+    python bench/cold_start.py --runs 5 --questions 2000 --latency-ms 300
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from fake_sheets import FakeSheets, fake_credentials, serve
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+from precompiled import write_banks  # noqa: E402
+from question_bank import compile_bank  # noqa: E402
+
+SPREADSHEET_ID = 'bench-spreadsheet'
+
+# Runs in the child process; prints its timings as JSON
+CHILD = '''
+import json, sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+response = app.app.test_client().get(sys.argv[1])
+finished = time.perf_counter()
+assert response.status_code == 200 and b'Could not load' not in response.data, response.data[:200]
+print(json.dumps({'import_ms': (imported - started) * 1000, 'first_request_ms': (finished - imported) * 1000,
+                  'total_ms': (finished - started) * 1000}))
+'''
+
+
+def cold_start(env, path):
+    output = subprocess.run([sys.executable, '-c', CHILD, path], cwd=REPO, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--questions', type=int, default=2000, help='questions in the tab')
+    parser.add_argument('--latency-ms', type=float, default=300.0, help='latency of each fake Sheets call')
+    args = parser.parse_args()
+
+    sheets = FakeSheets(args.questions, ['Sheet1'], args.latency_ms)
+    server = serve(sheets)
+    sheets_url = f'http://127.0.0.1:{server.server_address[1]}/'
+    workdir = tempfile.mkdtemp(prefix='quizmaker-cold-')
+    precompiled = os.path.join(workdir, 'banks.qmb')
+    bank = compile_bank(sheets.rows('Sheet1'))
+    size = write_banks(precompiled, {(SPREADSHEET_ID, 'Sheet1'): bank})
+
+    base = dict(os.environ,
+                GOOGLE_CREDENTIALS=fake_credentials(sheets_url + 'token'),
+                SHEETS_API_ENDPOINT=sheets_url,
+                FLASK_SECRET_KEY='bench-secret',
+                SESSION_BACKEND='memory',
+                LOG_LEVEL='WARNING',
+                PREWARM_TABS='')
+    variants = {
+        'sheets': dict(base, PRECOMPILED_BANKS=os.path.join(workdir, 'missing.qmb')),
+        'precompiled': dict(base, PRECOMPILED_BANKS=precompiled),
+    }
+    path = f'/quiz/{SPREADSHEET_ID}/Sheet1?count=20'
+    print(f"{args.questions} questions, {args.latency_ms:g} ms Sheets latency, "
+          f"precompiled file {size / 1024:.1f} KiB; median of {args.runs} runs")
+    print(f"{'variant':<14}{'import ms':>12}{'first req ms':>14}{'total ms':>12}")
+    for name, env in variants.items():
+        runs = [cold_start(env, path) for _ in range(args.runs)]
+        medians = {key: statistics.median(run[key] for run in runs)
+                   for key in ('import_ms', 'first_request_ms', 'total_ms')}
+        print(f"{name:<14}{medians['import_ms']:>12.1f}{medians['first_request_ms']:>14.1f}{medians['total_ms']:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,208 @@
+"""Local stand-in for a Redis server, for benchmarks and tests.
+
+Speaks enough of the Redis protocol (RESP) for the ``redis`` session
+backend: PING, AUTH, SELECT, GET, SET with EX/PX/NX/XX, DEL, EXISTS,
+DBSIZE and FLUSHDB.  Keys expire the way Redis expires them, lazily on
+access.  drop_connections() closes every open client connection, as a
+server restart or an idle timeout would, so a client's pooled connections
+go stale.
+
+    python bench/fake_redis.py --port 6380
+    SESSION_BACKEND=redis SESSION_REDIS_URL=redis://127.0.0.1:6380/0 python app.py
+"""
+import argparse
+import socket
+import socketserver
+import threading
+import time
+
+
+class CommandError(Exception):
+    pass
+
+
+class FakeRedis:
+    def __init__(self, password=None):
+        self.password = password
+        self._databases = {}  # db -> {key: (value, expires at or None)}
+        self._lock = threading.Lock()
+        self.commands = {}  # Command name -> times run
+
+    def _db(self, number):
+        return self._databases.setdefault(number, {})
+
+    def _live(self, db, key, now):
+        item = db.get(key)
+        if item is not None and item[1] is not None and item[1] <= now:
+            del db[key]
+            return None
+        return item
+
+    def execute(self, client, args):
+        """Run one command for a client ({'db', 'authenticated'}); returns the reply."""
+        name = args[0].decode('ascii', 'replace').upper()
+        args = args[1:]
+        with self._lock:
+            self.commands[name] = self.commands.get(name, 0) + 1
+            if name == 'AUTH':
+                if args[-1].decode('utf-8') != self.password:
+                    raise CommandError('WRONGPASS invalid username-password pair')
+                client['authenticated'] = True
+                return 'OK'
+            if self.password and not client['authenticated']:
+                raise CommandError('NOAUTH Authentication required.')
+            if name == 'PING':
+                return 'PONG'
+            if name == 'SELECT':
+                client['db'] = int(args[0])
+                return 'OK'
+            db = self._db(client['db'])
+            now = time.monotonic()
+            if name == 'GET':
+                item = self._live(db, args[0], now)
+                return item[0] if item else None
+            if name == 'SET':
+                return self._set(db, args, now)
+            if name == 'DEL':
+                live = [key for key in args if self._live(db, key, now) is not None]
+                for key in live:
+                    del db[key]
+                return len(live)
+            if name == 'EXISTS':
+                return sum(self._live(db, key, now) is not None for key in args)
+            if name == 'DBSIZE':
+                return sum(self._live(db, key, now) is not None for key in list(db))
+            if name == 'FLUSHDB':
+                db.clear()
+                return 'OK'
+        raise CommandError(f"ERR unknown command '{name}'")
+
+    def _set(self, db, args, now):
+        key, value = args[0], args[1]
+        options = [arg.decode('ascii').upper() for arg in args[2:]]
+        expires = None
+        index = 0
+        while index < len(options):
+            option = options[index]
+            if option in ('EX', 'PX'):
+                amount = int(options[index + 1])
+                if amount <= 0:
+                    raise CommandError('ERR invalid expire time in set')
+                expires = now + (amount if option == 'EX' else amount / 1000)
+                index += 2
+                continue
+            if option not in ('NX', 'XX'):
+                raise CommandError('ERR syntax error')
+            index += 1
+        exists = self._live(db, key, now) is not None
+        if ('NX' in options and exists) or ('XX' in options and not exists):
+            return None
+        db[key] = (value, expires)
+        return 'OK'
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    redis = None  # Set on the subclass created by serve()
+
+    def setup(self):
+        super().setup()
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        with self.server.connections_lock:
+            self.server.connections.add(self.connection)
+
+    def finish(self):
+        with self.server.connections_lock:
+            self.server.connections.discard(self.connection)
+        try:
+            super().finish()
+        except OSError:
+            pass
+
+    def _read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        if not line.startswith(b'*'):  # Inline command, e.g. from telnet
+            return line.split()
+        args = []
+        for _ in range(int(line[1:])):
+            length = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    def _reply(self, value):
+        if value is None:
+            return b'$-1\r\n'
+        if isinstance(value, str):
+            return b'+' + value.encode('utf-8') + b'\r\n'
+        if isinstance(value, int):
+            return b':%d\r\n' % value
+        return b'$%d\r\n%s\r\n' % (len(value), value)
+
+    def handle(self):
+        client = {'db': 0, 'authenticated': False}
+        while True:
+            try:
+                args = self._read_command()
+            except (OSError, ValueError):
+                return
+            if not args:
+                return
+            try:
+                reply = self._reply(self.redis.execute(client, args))
+            except CommandError as e:
+                reply = b'-' + str(e).encode('utf-8') + b'\r\n'
+            except (ValueError, IndexError):
+                reply = b'-ERR syntax error\r\n'
+            try:
+                self.wfile.write(reply)
+            except OSError:
+                return
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, handler):
+        self.connections = set()
+        self.connections_lock = threading.Lock()
+        super().__init__(address, handler)
+
+    def drop_connections(self):
+        """Close every client connection; returns how many were open."""
+        with self.connections_lock:
+            connections = list(self.connections)
+        for connection in connections:
+            try:
+                connection.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        return len(connections)
+
+
+def serve(redis, host='127.0.0.1', port=0):
+    """Start the stand-in on a daemon thread; returns the server (see server_address)."""
+    handler = type('Handler', (_Handler,), {'redis': redis})
+    server = _Server((host, port), handler)
+    threading.Thread(target=server.serve_forever, name='fake-redis', daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--port', type=int, default=6380)
+    parser.add_argument('--password', default=None)
+    args = parser.parse_args()
+
+    server = serve(FakeRedis(args.password), port=args.port)
+    print(f"Fake Redis on redis://127.0.0.1:{server.server_address[1]}/0 (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
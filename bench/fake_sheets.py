@@ -0,0 +1,249 @@
+"""Local stand-in for the Google Sheets API, for benchmarks.
+
+Serves the calls the app makes, ``spreadsheets.values.get``,
+``spreadsheets.values.batchGet`` and ``spreadsheets.get``, plus the OAuth
+token endpoint, from generated banks of a configurable size.  Every response
+can be delayed to mimic the real API's latency, and API calls can be made to
+fail: a random fraction with a server error, everything beyond a per-minute
+quota with 429 and Retry-After, every call during an outage, or a scripted
+sequence queued with fail_next().
+
+Point the app at it with::
+
+    SHEETS_API_ENDPOINT=http://127.0.0.1:8765/
+    GOOGLE_CREDENTIALS=$(python bench/fake_sheets.py --print-credentials --port 8765)
+
+and run ``python bench/fake_sheets.py --port 8765 --questions 500``.
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+VALUES_PATH = re.compile(r'^/v4/spreadsheets/([^/]+)/values/([^/?]+)$')
+BATCH_PATH = re.compile(r'^/v4/spreadsheets/([^/]+)/values:batchGet$')
+SPREADSHEET_PATH = re.compile(r'^/v4/spreadsheets/([^/]+)$')
+
+
+def bank_rows(tab_name, questions, sections=4):
+    """Sheet rows for a tab: two header rows, then `questions` question rows.
+
+    Question i's correct answer is ``Answer i``, so load generators can
+    answer correctly without knowing the shuffle.
+    """
+    rows = [['Section', 'Question', 'Correct', 'Wrong 1', 'Wrong 2', 'Wrong 3'],
+            ['', f'{tab_name} question bank', '', '', '', '']]
+    for i in range(questions):
+        rows.append([f'Section {i % sections + 1}', f'{tab_name} question {i}: what is item {i}?',
+                     f'Answer {i}', f'Wrong {i}a', f'Wrong {i}b', 'None of the above'])
+    return rows
+
+
+def fake_credentials(token_uri):
+    """Service account JSON whose tokens come from this stand-in."""
+    import rsa  # Installed with google-auth
+    _, private_key = rsa.newkeys(1024)
+    return json.dumps({
+        'type': 'service_account',
+        'project_id': 'quizmaker-bench',
+        'private_key_id': 'bench',
+        'private_key': private_key.save_pkcs1().decode('ascii'),
+        'client_email': 'bench@quizmaker-bench.iam.gserviceaccount.com',
+        'client_id': '1',
+        'token_uri': token_uri,
+    })
+
+
+class FakeSheets:
+    def __init__(self, questions=500, tabs=('Sheet1',), latency_ms=0.0, jitter_ms=0.0,
+                 error_rate=0.0, error_status=503, quota_per_minute=0):
+        self.questions = questions
+        self.tabs = list(tabs)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.quota_per_minute = quota_per_minute
+        self.outage = False  # Set to fail every API call with error_status
+        self._scripted = deque()
+        self._recent = deque()  # Times of accepted calls in the last minute, for the quota
+        self._rows = {}
+        self._lock = threading.Lock()
+        self.calls = {'values.get': 0, 'values.batchGet': 0, 'spreadsheets.get': 0, 'token': 0}
+        self.faults = {}  # HTTP status -> responses failed on purpose
+
+    def rows(self, tab_name):
+        with self._lock:
+            rows = self._rows.get(tab_name)
+            if rows is None:
+                rows = self._rows[tab_name] = bank_rows(tab_name, self.questions)
+        return rows
+
+    def count(self, call):
+        with self._lock:
+            self.calls[call] += 1
+
+    def fail_next(self, count=1, status=503, retry_after=None):
+        """Fail the next `count` API calls with `status`, optionally sending Retry-After."""
+        with self._lock:
+            self._scripted.extend([(status, retry_after)] * count)
+
+    def fault(self):
+        """(status, retry_after) if this API call should fail, else None."""
+        with self._lock:
+            fault = None
+            if self._scripted:
+                fault = self._scripted.popleft()
+            elif self.outage or (self.error_rate and random.random() < self.error_rate):
+                fault = (self.error_status, None)
+            elif self.quota_per_minute:
+                now = time.monotonic()
+                while self._recent and now - self._recent[0] >= 60:
+                    self._recent.popleft()
+                if len(self._recent) >= self.quota_per_minute:
+                    fault = (429, max(1, int(60 - (now - self._recent[0])) + 1))
+                else:
+                    self._recent.append(now)
+            if fault is not None:
+                self.faults[fault[0]] = self.faults.get(fault[0], 0) + 1
+            return fault
+
+    def delay(self):
+        if self.latency_ms or self.jitter_ms:
+            time.sleep(max(0.0, random.gauss(self.latency_ms, self.jitter_ms)) / 1000)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out in separate writes; with Nagle's algorithm the body
+    # then waits for the client's delayed ACK, adding ~40 ms to every call
+    disable_nagle_algorithm = True
+    sheets = None  # Set on the subclass created by serve()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, body, headers=None):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=UTF-8')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _injected_fault(self):
+        """Send an injected error and return True if this call should fail."""
+        fault = self.sheets.fault()
+        if fault is None:
+            return False
+        status, retry_after = fault
+        reason = 'RESOURCE_EXHAUSTED' if status == 429 else 'UNAVAILABLE'
+        headers = {'Retry-After': str(retry_after)} if retry_after is not None else None
+        self._send_json(status, {'error': {'code': status, 'message': 'Injected fault', 'status': reason}}, headers)
+        return True
+
+    def _value_range(self, range_name):
+        tab_name = range_name.split('!', 1)[0].strip("'")
+        if tab_name not in self.sheets.tabs:
+            return None
+        return {'range': range_name, 'majorDimension': 'ROWS', 'values': self.sheets.rows(tab_name)}
+
+    def _bad_range(self, range_name):
+        self._send_json(400, {'error': {'code': 400, 'message': f'Unable to parse range: {range_name}',
+                                        'status': 'INVALID_ARGUMENT'}})
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        path = url.path
+        match = VALUES_PATH.match(path)
+        if match:
+            self.sheets.count('values.get')
+            self.sheets.delay()
+            if self._injected_fault():
+                return
+            range_name = unquote(match.group(2))
+            value_range = self._value_range(range_name)
+            if value_range is None:
+                return self._bad_range(range_name)
+            return self._send_json(200, value_range)
+        match = BATCH_PATH.match(path)
+        if match:
+            self.sheets.count('values.batchGet')
+            self.sheets.delay()
+            if self._injected_fault():
+                return
+            value_ranges = []
+            for range_name in parse_qs(url.query).get('ranges', []):
+                value_range = self._value_range(range_name)
+                if value_range is None:
+                    return self._bad_range(range_name)
+                value_ranges.append(value_range)
+            return self._send_json(200, {'spreadsheetId': match.group(1), 'valueRanges': value_ranges})
+        match = SPREADSHEET_PATH.match(path)
+        if match:
+            self.sheets.count('spreadsheets.get')
+            self.sheets.delay()
+            if self._injected_fault():
+                return
+            return self._send_json(200, {
+                'spreadsheetId': match.group(1),
+                'sheets': [{'properties': {'sheetId': i, 'title': title, 'index': i}}
+                           for i, title in enumerate(self.sheets.tabs)],
+            })
+        self._send_json(404, {'error': {'code': 404, 'message': 'Not found', 'status': 'NOT_FOUND'}})
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        if urlparse(self.path).path != '/token':
+            return self._send_json(404, {'error': 'not_found'})
+        self.sheets.count('token')
+        self._send_json(200, {'access_token': 'bench-token', 'expires_in': 3600, 'token_type': 'Bearer'})
+
+
+def serve(sheets, host='127.0.0.1', port=0):
+    """Start the stand-in on a daemon thread; returns the server (see server_address)."""
+    handler = type('Handler', (_Handler,), {'sheets': sheets})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='fake-sheets', daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--questions', type=int, default=500, help='questions per tab')
+    parser.add_argument('--tabs', default='Sheet1', help='comma-separated tab names')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='mean injected latency per call')
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help='standard deviation of the latency')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of API calls failed on purpose')
+    parser.add_argument('--error-status', type=int, default=503, help='HTTP status of those failures')
+    parser.add_argument('--quota-per-minute', type=int, default=0,
+                        help='API calls allowed per rolling minute before answering 429 (0: unlimited)')
+    parser.add_argument('--print-credentials', action='store_true',
+                        help='print a GOOGLE_CREDENTIALS value for this stand-in and exit')
+    args = parser.parse_args()
+
+    if args.print_credentials:
+        print(fake_credentials(f'http://127.0.0.1:{args.port}/token'))
+        return
+    sheets = FakeSheets(args.questions, args.tabs.split(','), args.latency_ms, args.jitter_ms,
+                        args.error_rate, args.error_status, args.quota_per_minute)
+    server = serve(sheets, port=args.port)
+    print(f"Fake Sheets API on http://127.0.0.1:{server.server_address[1]}/ (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
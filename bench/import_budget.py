@@ -0,0 +1,78 @@
+"""Check the app's import time against a budget with ``python -X importtime``.
+
+Imports the app in a fresh interpreter a few times and takes the fastest
+run.  Fails (exit status 1) when
+
+- ``import app`` takes longer than --budget-ms in total,
+- the repo's own modules take longer than --own-budget-ms between them, or
+- any of the heavy libraries that are only needed on first use (the Google
+  client and auth libraries, httplib2, requests) is imported at startup.
+
+    python bench/import_budget.py --budget-ms 500 --own-budget-ms 80 --top 15
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Top-level packages that must only be imported when first used
+LAZY_PACKAGES = ('googleapiclient', 'google_auth_httplib2', 'httplib2', 'google.auth', 'google.oauth2', 'requests')
+LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+
+def own_modules():
+    return {name[:-3] for name in os.listdir(REPO) if name.endswith('.py')}
+
+
+def measure():
+    """[(module, self_us, cumulative_us, depth)] for one cold import of the app."""
+    env = dict(os.environ, SESSION_BACKEND=os.environ.get('SESSION_BACKEND', 'memory'), PREWARM_TABS='')
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'], cwd=REPO, env=env,
+                            capture_output=True, text=True, check=True)
+    modules = []
+    for line in result.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            modules.append((match.group(4), int(match.group(1)), int(match.group(2)), len(match.group(3))))
+    return modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--budget-ms', type=float, default=500, help='total for import app')
+    parser.add_argument('--own-budget-ms', type=float, default=80, help="self time of the repo's own modules")
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--top', type=int, default=10, help='slowest imports to list')
+    args = parser.parse_args()
+
+    runs = [measure() for _ in range(args.runs)]
+    total_us = {id(run): next(cumulative for name, _, cumulative, _ in run if name == 'app') for run in runs}
+    modules = min(runs, key=lambda run: total_us[id(run)])
+    total_ms = total_us[id(modules)] / 1000
+    own = own_modules()
+    own_ms = sum(self_us for name, self_us, _, _ in modules if name in own) / 1000
+
+    print(f"import app: {total_ms:.1f} ms (budget {args.budget_ms:g}), "
+          f"repo modules: {own_ms:.1f} ms (budget {args.own_budget_ms:g}); fastest of {args.runs} runs")
+    print(f"\n{'cumulative ms':>14}{'self ms':>10}  module")
+    for name, self_us, cumulative_us, depth in sorted(modules, key=lambda item: -item[2])[:args.top]:
+        print(f"{cumulative_us / 1000:>14.1f}{self_us / 1000:>10.1f}  {name}")
+
+    failures = []
+    if total_ms > args.budget_ms:
+        failures.append(f"import app took {total_ms:.1f} ms, over the {args.budget_ms:g} ms budget")
+    if own_ms > args.own_budget_ms:
+        failures.append(f"repo modules took {own_ms:.1f} ms, over the {args.own_budget_ms:g} ms budget")
+    eager = [package for package in LAZY_PACKAGES
+             if any(name == package or name.startswith(package + '.') for name, _, _, _ in modules)]
+    if eager:
+        failures.append(f"imported at startup but should load on first use: {', '.join(eager)}")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
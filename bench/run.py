@@ -0,0 +1,377 @@
+"""Load test the app under gunicorn against the fake Sheets API.
+
+Starts bench/fake_sheets.py in-process and the app under gunicorn, then runs
+concurrent simulated students: each starts a quiz and alternates
+/get_question and /check_answer until the attempt is complete.  A small
+share of attempts first list the tabs the way the admin page does.  Reports
+p50/p95/p99 latency and requests per second per endpoint, plus the session
+store size on disk, and writes everything to a JSON file.  With
+--session-backend redis and no SESSION_REDIS_URL, sessions go to the
+bench/fake_redis.py stand-in.
+
+    python bench/run.py --users 20 --duration 30 --questions 2000 --latency-ms 150
+    python bench/run.py --compare bench/results/<earlier run>.json
+"""
+import argparse
+import csv
+import json
+import os
+import platform
+import random
+import re
+import shutil
+import signal
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+import requests
+
+import fake_redis
+from fake_sheets import FakeSheets, bank_rows, fake_credentials, serve
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from question_sources import import_rows  # noqa: E402
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(REPO, 'bench', 'results')
+SPREADSHEET_ID = 'bench-spreadsheet'
+LOCAL_BANK = 'bench'
+CORRECT_ANSWER = re.compile(r'^Answer \d+$')
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def dir_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = {}
+        self.errors = {}
+
+    def record(self, endpoint, seconds, ok):
+        with self._lock:
+            self.latencies.setdefault(endpoint, []).append(seconds)
+            if not ok:
+                self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+    def summary(self, elapsed):
+        endpoints = {}
+        for endpoint, values in sorted(self.latencies.items()):
+            values = sorted(values)
+            endpoints[endpoint] = {
+                'requests': len(values),
+                'errors': self.errors.get(endpoint, 0),
+                'rps': round(len(values) / elapsed, 2),
+                'mean_ms': round(sum(values) / len(values) * 1000, 3),
+                'p50_ms': round(percentile(values, 0.50) * 1000, 3),
+                'p95_ms': round(percentile(values, 0.95) * 1000, 3),
+                'p99_ms': round(percentile(values, 0.99) * 1000, 3),
+                'max_ms': round(values[-1] * 1000, 3),
+            }
+        total = sum(len(values) for values in self.latencies.values())
+        return endpoints, {'requests': total, 'errors': sum(self.errors.values()),
+                           'rps': round(total / elapsed, 2)}
+
+
+def student(base_url, args, recorder, deadline, attempts):
+    """One simulated student taking quizzes back to back until the deadline."""
+    http = requests.Session()
+    rng = random.Random()
+
+    def call(endpoint, method, path, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = http.request(method, base_url + path, timeout=60, **kwargs)
+            ok = response.status_code < 400
+        except requests.RequestException:
+            response, ok = None, False
+        recorder.record(endpoint, time.perf_counter() - start, ok)
+        return response if ok else None
+
+    while time.monotonic() < deadline:
+        if rng.random() < args.get_tabs_rate:
+            call('get_tabs', 'GET', f'/get_tabs/{args.source_id}')
+        tab = rng.choice(args.tabs)
+        path = f'/quiz/{args.source_id}/{tab}'
+        if args.count:
+            path += f'?count={args.count}'
+        if call('quiz', 'GET', path) is None:
+            continue
+        while time.monotonic() < deadline:
+            response = call('get_question', 'POST', '/get_question')
+            if response is None:
+                break
+            question = response.json()
+            if question.get('complete'):
+                with attempts[1]:
+                    attempts[0] += 1
+                break
+            answers = question['answers']
+            correct = [answer for answer in answers if CORRECT_ANSWER.match(answer)]
+            answer = correct[0] if correct and rng.random() < args.accuracy else rng.choice(answers)
+            if call('check_answer', 'POST', '/check_answer', json={'answer': answer}) is None:
+                break
+        if args.think_ms:
+            time.sleep(args.think_ms / 1000)
+
+
+def wait_for(url, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'gunicorn exited with status {process.returncode}')
+        try:
+            requests.get(url, timeout=1)
+            return
+        except requests.RequestException:
+            time.sleep(0.2)
+    raise RuntimeError(f'{url} did not come up within {timeout}s')
+
+
+def prime_workers(base_url, args):
+    """Load every tab in every worker before measuring.
+
+    Bursts of concurrent requests on fresh connections spread over all
+    workers, so no worker's cold bank load lands in the measured window.
+    """
+    def start_quiz(tab):
+        try:
+            requests.get(f'{base_url}/quiz/{args.source_id}/{tab}?count=1', timeout=60)
+        except requests.RequestException:
+            pass
+
+    for tab in args.tabs:
+        burst = [threading.Thread(target=start_quiz, args=(tab,)) for _ in range(args.workers * args.threads * 2)]
+        for thread in burst:
+            thread.start()
+        for thread in burst:
+            thread.join()
+
+
+def write_local_banks(args, bank_dir):
+    """Write the fake bank as local files; returns the quiz URL source ID."""
+    folder = os.path.join(bank_dir, LOCAL_BANK)
+    os.makedirs(folder)
+    for tab in args.tabs:
+        rows = bank_rows(tab, args.questions)
+        if args.source == 'csv':
+            with open(os.path.join(folder, tab + '.csv'), 'w', newline='', encoding='utf-8') as f:
+                csv.writer(f).writerows(rows)
+        elif args.source == 'jsonl':
+            with open(os.path.join(folder, tab + '.jsonl'), 'w', encoding='utf-8') as f:
+                for row in rows[2:]:
+                    f.write(json.dumps(row) + '\n')
+        else:
+            import_rows(rows, os.path.join(bank_dir, LOCAL_BANK + '.db'), tab, header_rows=2)
+    return f'{args.source}:{LOCAL_BANK}'
+
+
+def run(args):
+    sheets = FakeSheets(args.questions, args.tabs, args.latency_ms, args.jitter_ms,
+                        args.error_rate, quota_per_minute=args.quota_per_minute)
+    server = serve(sheets)
+    sheets_url = f'http://127.0.0.1:{server.server_address[1]}/'
+
+    workdir = tempfile.mkdtemp(prefix='quizmaker-bench-')
+    session_dir = os.path.join(workdir, 'sessions')
+    os.makedirs(session_dir)
+    args.source_id = SPREADSHEET_ID
+    bank_dir = os.path.join(workdir, 'banks')
+    if args.source != 'sheets':
+        args.source_id = write_local_banks(args, bank_dir)
+    port = free_port()
+    env = dict(os.environ,
+               QUESTION_BANK_DIR=bank_dir,
+               GOOGLE_CREDENTIALS=fake_credentials(sheets_url + 'token'),
+               SHEETS_API_ENDPOINT=sheets_url,
+               FLASK_SECRET_KEY='bench-secret',  # Shared by all workers
+               SESSION_BACKEND=args.session_backend,
+               SESSION_SQLITE_PATH=os.path.join(session_dir, 'sessions.db'),
+               ATTEMPT_STORE_PATH=os.path.join(workdir, 'attempts.db'),
+               LOG_LEVEL=args.log_level,
+               TMPDIR=session_dir)  # The filesystem backend writes to the temp directory
+    redis_server = None
+    if args.session_backend == 'redis' and 'SESSION_REDIS_URL' not in os.environ:
+        redis_server = fake_redis.serve(fake_redis.FakeRedis())
+        env['SESSION_REDIS_URL'] = f'redis://127.0.0.1:{redis_server.server_address[1]}/0'
+    command = [sys.executable, '-m', 'gunicorn', 'app:app', '--bind', f'127.0.0.1:{port}',
+               '--workers', str(args.workers), '--threads', str(args.threads), '--log-level', 'warning']
+    process = subprocess.Popen(command, cwd=REPO, env=env)
+    base_url = f'http://127.0.0.1:{port}'
+    try:
+        wait_for(base_url + '/', process)
+        recorder = Recorder()
+        attempts = [0, threading.Lock()]
+        prime_workers(base_url, args)
+        if args.warmup:
+            warmup_deadline = time.monotonic() + args.warmup
+            warmup = [threading.Thread(target=student, args=(base_url, args, Recorder(), warmup_deadline, [0, threading.Lock()]))
+                      for _ in range(args.users)]
+            for thread in warmup:
+                thread.start()
+            for thread in warmup:
+                thread.join()
+
+        started = time.monotonic()
+        deadline = started + args.duration
+        threads = [threading.Thread(target=student, args=(base_url, args, recorder, deadline, attempts))
+                   for _ in range(args.users)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - started
+    finally:
+        process.send_signal(signal.SIGTERM)
+        try:
+            process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        server.shutdown()
+        if redis_server is not None:
+            redis_server.shutdown()
+
+    endpoints, overall = recorder.summary(elapsed)
+    overall['completed_attempts'] = attempts[0]
+    session_bytes = dir_size(session_dir) if args.session_backend in ('sqlite', 'filesystem') else None
+    # Written by the workers' background writers, drained when they shut down
+    conn = sqlite3.connect(os.path.join(workdir, 'attempts.db'))
+    try:
+        stored_answers = conn.execute('SELECT COUNT(*) FROM answers').fetchone()[0]
+    except sqlite3.Error:
+        stored_answers = None
+    finally:
+        conn.close()
+    shutil.rmtree(workdir, ignore_errors=True)
+    return {
+        'revision': git_revision(),
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'config': {
+            'users': args.users, 'duration': args.duration, 'warmup': args.warmup,
+            'source': args.source, 'workers': args.workers, 'threads': args.threads, 'session_backend': args.session_backend,
+            'questions': args.questions, 'tabs': args.tabs, 'count': args.count, 'accuracy': args.accuracy,
+            'get_tabs_rate': args.get_tabs_rate,
+            'latency_ms': args.latency_ms, 'jitter_ms': args.jitter_ms, 'think_ms': args.think_ms,
+            'error_rate': args.error_rate, 'quota_per_minute': args.quota_per_minute,
+        },
+        'elapsed_seconds': round(elapsed, 3),
+        'overall': overall,
+        'endpoints': endpoints,
+        'sheets_calls': dict(sheets.calls),
+        'sheets_faults': dict(sheets.faults),
+        'session_store_bytes': session_bytes,
+        'stored_answers': stored_answers,
+    }
+
+
+def print_report(result, baseline=None):
+    print(f"\nRevision {result['revision']}: {result['overall']['requests']} requests in "
+          f"{result['elapsed_seconds']}s ({result['overall']['rps']} req/s, "
+          f"{result['overall']['errors']} errors, {result['overall']['completed_attempts']} attempts completed)")
+    header = f"{'endpoint':<14}{'requests':>10}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}"
+    if baseline:
+        header += f"{'p95 vs base':>14}{'rps vs base':>14}"
+    print(header)
+    for endpoint, stats in result['endpoints'].items():
+        line = (f"{endpoint:<14}{stats['requests']:>10}{stats['rps']:>10}{stats['p50_ms']:>10}"
+                f"{stats['p95_ms']:>10}{stats['p99_ms']:>10}{stats['errors']:>8}")
+        base = (baseline or {}).get('endpoints', {}).get(endpoint)
+        if base:
+            line += f"{_change(stats['p95_ms'], base['p95_ms']):>14}{_change(stats['rps'], base['rps']):>14}"
+        print(line)
+    print(f"Sheets API calls: {result['sheets_calls']}")
+    if result.get('sheets_faults'):
+        print(f"Injected Sheets faults by status: {result['sheets_faults']}")
+    if result['session_store_bytes'] is not None:
+        print(f"Session store on disk: {result['session_store_bytes'] / 1024:.1f} KiB")
+    if result.get('stored_answers') is not None:
+        print(f"Answers in the attempt store: {result['stored_answers']}")
+
+
+def _change(value, base):
+    return f'{(value - base) / base * 100:+.1f}%' if base else 'n/a'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--users', type=int, default=10, help='concurrent simulated students')
+    parser.add_argument('--duration', type=float, default=20, help='seconds of measured load')
+    parser.add_argument('--warmup', type=float, default=3, help='seconds of unmeasured load first')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn worker processes')
+    parser.add_argument('--threads', type=int, default=4, help='gunicorn threads per worker')
+    parser.add_argument('--session-backend', default='sqlite', choices=('sqlite', 'memory', 'filesystem', 'redis'))
+    parser.add_argument('--source', default='sheets', choices=('sheets', 'csv', 'jsonl', 'sqlite'),
+                        help='serve the bank from the fake Sheets API or from local files')
+    parser.add_argument('--questions', type=int, default=500, help='questions per tab in the fake bank')
+    parser.add_argument('--tabs', default='Sheet1', help='comma-separated tabs students pick from')
+    parser.add_argument('--count', type=int, default=20, help='questions per attempt (0 for the whole bank)')
+    parser.add_argument('--get-tabs-rate', type=float, default=0.05,
+                        help='fraction of attempts preceded by an admin-style /get_tabs call')
+    parser.add_argument('--accuracy', type=float, default=0.7, help='fraction of questions answered correctly')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='mean latency injected into Sheets calls')
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help='standard deviation of the injected latency')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of Sheets calls failed with 503')
+    parser.add_argument('--quota-per-minute', type=int, default=0,
+                        help='Sheets calls allowed per minute before the stand-in answers 429 (0: unlimited)')
+    parser.add_argument('--think-ms', type=float, default=0.0, help='pause between attempts')
+    parser.add_argument('--log-level', default='WARNING', help='app LOG_LEVEL during the run')
+    parser.add_argument('--output', help='result file (default: bench/results/<time>-<revision>.json)')
+    parser.add_argument('--compare', help='earlier result file to compare against')
+    args = parser.parse_args()
+    args.tabs = args.tabs.split(',')
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    result = run(args)
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+        output = os.path.join(RESULTS_DIR, f"{stamp}-{result['revision'] or 'unknown'}.json")
+    with open(output, 'w') as f:
+        json.dump(result, f, indent=2)
+    print_report(result, baseline)
+    print(f"Saved {output}")
+
+
+if __name__ == '__main__':
+    main()
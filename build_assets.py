@@ -0,0 +1,259 @@
+"""Minify and fingerprint the CSS and JavaScript in assets/ into static/.
+
+    python build_assets.py            (rebuild; commit static/ with the change)
+    python build_assets.py --check    (exit 1 if static/ is out of date)
+
+Each source file becomes static/<name>.<hash>.<ext>, named after a hash of
+its minified content, so the platform can serve it as ``immutable`` for a
+year and a changed file always gets a new URL.  static/manifest.json maps
+source names to the built files; static_assets.py uses it so that
+``url_for('static', filename='quiz.js')`` links the current build.  Files
+from the previous build are removed.
+
+The minifiers are deliberately conservative: they drop comments and
+redundant whitespace but never rename or reorder anything, and JavaScript
+keeps its line breaks so automatic semicolon insertion behaves as before.
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SOURCE_DIR = os.path.join(HERE, 'assets')
+OUTPUT_DIR = os.path.join(HERE, 'static')
+MANIFEST = 'manifest.json'
+HASH_LENGTH = 10
+
+# Characters a space next to can go without joining two tokens into one
+_JS_PUNCTUATION = set('{}()[];,:=<>!?&|+-*%^~')
+_CSS_STRING_OR_COMMENT = re.compile(r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|/\*.*?\*/', re.S)
+# Keywords after which a slash starts a regular expression rather than a division
+_JS_REGEX_KEYWORDS = {'return', 'typeof', 'instanceof', 'in', 'of', 'new', 'delete', 'void', 'throw', 'case',
+                      'do', 'else', 'yield', 'await'}
+
+
+def minify_css(source):
+    # Drop comments first so the whitespace on both sides of one is squeezed together
+    source = _CSS_STRING_OR_COMMENT.sub(lambda match: '' if match.group().startswith('/*') else match.group(), source)
+    parts = []
+    position = 0
+    for match in _CSS_STRING_OR_COMMENT.finditer(source):
+        parts.append(_squeeze_css(source[position:match.start()]))
+        parts.append(match.group())
+        position = match.end()
+    parts.append(_squeeze_css(source[position:]))
+    return ''.join(parts).strip() + '\n'
+
+
+def _squeeze_css(text):
+    text = re.sub(r'\s+', ' ', text)
+    # Not around ':' in general, where a space separates a descendant pseudo-class (`a :hover`)
+    text = re.sub(r' ?([{};,>]) ?', r'\1', text)
+    text = re.sub(r': ', ':', text)
+    return text.replace(';}', '}')
+
+
+def _js_tokens(source):
+    """Split source into (kind, text) with kind 'code', 'string', 'comment' or 'newline'."""
+    tokens = []
+    i = 0
+    n = len(source)
+    code_start = 0
+    # Template literals can nest code (`${...}`) that contains further literals
+    braces = []
+
+    def flush(end):
+        if end > code_start:
+            tokens.append(('code', source[code_start:end]))
+
+    def previous_significant():
+        for kind, text in reversed(tokens):
+            if kind == 'code' and text.strip():
+                return text.rstrip()
+            if kind in ('string', 'regex'):
+                return text
+        return ''
+
+    while i < n:
+        char = source[i]
+        if char == '\n':
+            flush(i)
+            tokens.append(('newline', '\n'))
+            i += 1
+            code_start = i
+        elif source.startswith('//', i) or source.startswith('/*', i):
+            flush(i)
+            if source[i + 1] == '/':
+                end = source.find('\n', i)
+            else:
+                end = source.find('*/', i + 2)
+                end = end + 2 if end != -1 else -1
+            if end == -1:
+                end = n
+            tokens.append(('comment', source[i:end]))
+            i = end
+            code_start = i
+        elif char in '\'"':
+            flush(i)
+            end = i + 1
+            while end < n and source[end] != char:
+                end += 2 if source[end] == '\\' else 1
+            tokens.append(('string', source[i:end + 1]))
+            i = end + 1
+            code_start = i
+        elif char == '`' or (char == '}' and braces and braces[-1] == 0):
+            # Start of a template literal, or the end of a `${...}` inside one
+            flush(i)
+            if char == '}':
+                braces.pop()
+            end = i + 1
+            while end < n and source[end] != '`' and not source.startswith('${', end):
+                end += 2 if source[end] == '\\' else 1
+            if source.startswith('${', end):
+                braces.append(0)
+                end += 1
+            tokens.append(('string', source[i:end + 1]))
+            i = end + 1
+            code_start = i
+        elif char == '/' and _regex_allowed(source[code_start:i].rstrip() or previous_significant()):
+            flush(i)
+            end = i + 1
+            in_class = False
+            while end < n and (source[end] != '/' or in_class):
+                if source[end] == '\\':
+                    end += 1
+                elif source[end] == '[':
+                    in_class = True
+                elif source[end] == ']':
+                    in_class = False
+                end += 1
+            end += 1
+            while end < n and source[end].isalpha():  # Flags
+                end += 1
+            tokens.append(('regex', source[i:end]))
+            i = end
+            code_start = i
+        else:
+            if braces and char in '{}':
+                braces[-1] += 1 if char == '{' else -1
+            i += 1
+    flush(n)
+    return tokens
+
+
+def _regex_allowed(before):
+    if not before:
+        return True
+    if before[-1] in '(,=:[!&|?{};+-*%<>~^':
+        return True
+    word = re.search(r'[A-Za-z_$][\w$]*$', before)
+    return bool(word) and word.group() in _JS_REGEX_KEYWORDS
+
+
+def _squeeze_js(code):
+    code = re.sub(r'[ \t]+', ' ', code)
+    out = []
+    for index, char in enumerate(code):
+        if char == ' ':
+            left = out[-1] if out else ''
+            right = code[index + 1] if index + 1 < len(code) else ''
+            if not left or not right:
+                continue
+            if (left in _JS_PUNCTUATION or right in _JS_PUNCTUATION) and not (left == right and left in '+-'):
+                continue
+        out.append(char)
+    return ''.join(out)
+
+
+def minify_js(source):
+    lines = [[]]
+    for kind, text in _js_tokens(source):
+        if kind == 'newline':
+            lines.append([])
+        elif kind == 'comment':
+            # A block comment still separates tokens, and its line breaks still end statements
+            if text.startswith('/*'):
+                lines[-1].append(('code', ' '))
+                lines.extend([] for _ in range(text.count('\n')))
+        elif kind == 'code' and lines[-1] and lines[-1][-1][0] == 'code':
+            lines[-1][-1] = ('code', lines[-1][-1][1] + text)
+        else:
+            lines[-1].append((kind, text))
+    result = []
+    for line in lines:
+        text = ''.join(_squeeze_js(part) if kind == 'code' else part for kind, part in line).strip()
+        if text:
+            result.append(text)
+    return '\n'.join(result) + '\n'
+
+
+MINIFIERS = {'.css': minify_css, '.js': minify_js}
+
+
+def build(source_dir=SOURCE_DIR, output_dir=OUTPUT_DIR):
+    """{source name: (built name, minified bytes)} for every asset in source_dir."""
+    built = {}
+    for name in sorted(os.listdir(source_dir)):
+        stem, ext = os.path.splitext(name)
+        minify = MINIFIERS.get(ext)
+        if minify is None:
+            continue
+        with open(os.path.join(source_dir, name), encoding='utf-8') as f:
+            data = minify(f.read()).encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+        built[name] = (f'{stem}.{digest}{ext}', data)
+    return built
+
+
+def read_manifest(output_dir=OUTPUT_DIR):
+    try:
+        with open(os.path.join(output_dir, MANIFEST), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--check', action='store_true', help='exit 1 if static/ does not match assets/')
+    parser.add_argument('--source-dir', default=SOURCE_DIR)
+    parser.add_argument('--output-dir', default=OUTPUT_DIR)
+    args = parser.parse_args()
+
+    built = build(args.source_dir, args.output_dir)
+    manifest = {name: output for name, (output, _) in built.items()}
+    previous = read_manifest(args.output_dir)
+    if args.check:
+        missing = [output for output in manifest.values()
+                   if not os.path.isfile(os.path.join(args.output_dir, output))]
+        if manifest != previous or missing:
+            print("static/ is out of date; run python build_assets.py and commit the result")
+            sys.exit(1)
+        print(f"static/ is up to date ({len(manifest)} assets)")
+        return
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    print(f"{'asset':<14}{'built as':<24}{'source':>10}{'minified':>10}{'gzipped':>10}")
+    for name, (output, data) in built.items():
+        with open(os.path.join(args.output_dir, output), 'wb') as f:
+            f.write(data)
+        source_size = os.path.getsize(os.path.join(args.source_dir, name))
+        print(f"{name:<14}{output:<24}{source_size:>10}{len(data):>10}{len(gzip.compress(data, mtime=0)):>10}")
+    partial = os.path.join(args.output_dir, MANIFEST + '.tmp')
+    with open(partial, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+        f.write('\n')
+    os.replace(partial, os.path.join(args.output_dir, MANIFEST))
+    for output in set(previous.values()) - set(manifest.values()):
+        try:
+            os.remove(os.path.join(args.output_dir, output))
+        except FileNotFoundError:
+            pass
+
+
+if __name__ == '__main__':
+    main()
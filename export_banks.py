@@ -0,0 +1,65 @@
+"""Compile question banks into a file to bundle with a deployment.
+
+    python export_banks.py SPREADSHEET_ID/Tab1 SPREADSHEET_ID/Tab2 --max-age 86400
+    python export_banks.py SPREADSHEET_ID          (every tab of the spreadsheet)
+
+Reads GOOGLE_CREDENTIALS (or .env) like the app and writes
+precompiled/banks.qmb, which the app serves from until it expires; see
+precompiled.py.  Local banks (csv:<name> etc.) can be exported as well.
+"""
+import argparse
+import os
+import time
+
+from dotenv import load_dotenv
+
+from precompiled import write_banks
+from question_bank import compile_bank
+from question_sources import open_source
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compile question banks into a file to bundle with a deployment.')
+    parser.add_argument('tabs', nargs='+', metavar='SPREADSHEET_ID[/TAB]',
+                        help='a tab to export, or a spreadsheet ID alone for all of its tabs')
+    parser.add_argument('-o', '--output', default=os.path.join(HERE, 'precompiled', 'banks.qmb'))
+    parser.add_argument('--max-age', type=float, default=None,
+                        help='seconds until the app stops trusting the file and reads the sheets again (default: never)')
+    parser.add_argument('--bank-dir', default=os.environ.get('QUESTION_BANK_DIR', os.path.join(HERE, 'banks')),
+                        help='directory of local csv:/jsonl:/sqlite: banks')
+    args = parser.parse_args()
+    load_dotenv()
+
+    # Group the requested tabs by spreadsheet so each is fetched in one batch
+    wanted = {}
+    for item in args.tabs:
+        spreadsheet_id, _, tab_name = item.partition('/')
+        wanted.setdefault(spreadsheet_id, [])
+        if tab_name:
+            wanted[spreadsheet_id].append(tab_name)
+
+    banks = {}
+    started = time.perf_counter()
+    for spreadsheet_id, tab_names in wanted.items():
+        source = open_source(spreadsheet_id, args.bank_dir)
+        tab_names = tab_names or source.tabs()
+        for tab_name, rows in source.batch_rows(tab_names).items():
+            bank = compile_bank(rows, source.header_rows)
+            if not bank.questions:
+                print(f"{spreadsheet_id}/{tab_name}: no valid questions, skipped")
+                continue
+            banks[(spreadsheet_id, tab_name)] = bank
+            print(f"{spreadsheet_id}/{tab_name}: {len(bank)} questions, version {bank.version}"
+                  + (f", {bank.diagnostics['skipped']} rows skipped" if bank.diagnostics['skipped'] else ''))
+
+    size = write_banks(args.output, banks, args.max_age)
+    expiry = f"expires in {args.max_age:g}s" if args.max_age else "never expires"
+    print(f"\nWrote {len(banks)} tabs to {args.output} ({size / 1024:.1f} KiB, {expiry}) "
+          f"in {time.perf_counter() - started:.1f}s")
+    print("Deploy it with the app, or point PRECOMPILED_BANKS at it.")
+
+
+if __name__ == '__main__':
+    main()
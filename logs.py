@@ -0,0 +1,59 @@
+"""Structured logging for the app.
+
+Every record goes to stdout as one JSON object (or a plain text line with
+LOG_FORMAT=text), with any ``extra={...}`` fields kept as top-level keys.
+Per-request lines go to the ``quizmaker.request`` logger, which only passes
+a sampled fraction of records below WARNING so busy routes do not flood the
+logs; warnings and errors are never dropped.
+"""
+import json
+import logging
+import random
+import sys
+
+# Attributes every LogRecord has; anything else came from extra={...}
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'ts': round(record.created, 3),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class SampleFilter(logging.Filter):
+    """Let through `rate` of the records below WARNING, and all others."""
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno >= logging.WARNING or random.random() < self.rate
+
+
+def configure_logging(level='INFO', fmt='json', sample_rate=0.1):
+    handler = logging.StreamHandler(sys.stdout)
+    if fmt == 'json':
+        handler.setFormatter(JSONFormatter())
+    else:
+        handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+
+    logger = logging.getLogger('quizmaker')
+    logger.handlers[:] = [handler]
+    logger.setLevel(level)
+    logger.propagate = False
+
+    request_logger = logging.getLogger('quizmaker.request')
+    request_logger.filters[:] = [SampleFilter(sample_rate)]
+    return logger
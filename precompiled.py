@@ -0,0 +1,177 @@
+"""Precompiled question bank files, bundled with a deployment.
+
+``export_banks.py`` compiles selected tabs and writes them to one file, so a
+fresh process (a serverless cold start in particular) can serve those
+quizzes without fetching the sheet.  Layout::
+
+    MAGIC | header length (4 bytes, big-endian) | msgpack header | tab blobs
+
+The header lists every tab with its bank version and the offset and length
+of its blob; each blob is one msgpack-encoded compiled bank.  The file is
+memory-mapped and only the header is decoded when it is first used; a tab's
+blob is decoded the first time that tab is asked for.
+
+A file carries an expiry time.  Until then its tabs are served as they were
+exported; afterwards the app loads them from their source as usual and only
+falls back to the expired copy if that load fails.
+"""
+import logging
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from array import array
+
+import msgspec
+
+from question_bank import Question, QuestionBank
+
+log = logging.getLogger('quizmaker.precompiled')
+
+MAGIC = b'QMBANKS\x00'
+FORMAT = 1  # Bump when the blob layout changes; older files are then ignored
+_LENGTH = struct.Struct('>I')
+
+
+class _TabEntry(msgspec.Struct, array_like=True):
+    spreadsheet_id: str
+    tab_name: str
+    version: str
+    offset: int
+    length: int
+
+
+class _Header(msgspec.Struct):
+    format: int
+    created: float
+    expires: float | None
+    tabs: list[_TabEntry]
+
+
+class _Bank(msgspec.Struct, array_like=True):
+    row_count: int
+    diagnostics: dict
+    row_digests: bytes
+    # (text, answers, section, row) per question
+    questions: list[tuple[str, list[str], str, int]]
+
+
+def _encode_bank(bank):
+    return msgspec.msgpack.encode(_Bank(
+        bank.row_count, bank.diagnostics, bank.row_digests,
+        [(question.text, list(question.answers), question.section, question.row) for question in bank.questions]))
+
+
+def _decode_bank(data, version):
+    item = msgspec.msgpack.decode(data, type=_Bank)
+    intern = sys.intern
+    questions = []
+    sections = {}
+    for text, answers, section, row in item.questions:
+        section = intern(section)
+        if section:
+            sections.setdefault(section, array('I')).append(len(questions))
+        questions.append(Question(intern(text), tuple(intern(answer) for answer in answers), section, row))
+    return QuestionBank(tuple(questions), item.row_count, version, item.diagnostics, sections, item.row_digests)
+
+
+def write_banks(path, banks, max_age=None):
+    """Write {(spreadsheet_id, tab_name): QuestionBank} to path; expires max_age seconds from now (None: never)."""
+    created = time.time()
+    blobs = []
+    entries = []
+    offset = 0
+    for (spreadsheet_id, tab_name), bank in banks.items():
+        blob = _encode_bank(bank)
+        entries.append(_TabEntry(spreadsheet_id, tab_name, bank.version, offset, len(blob)))
+        blobs.append(blob)
+        offset += len(blob)
+    header = msgspec.msgpack.encode(_Header(FORMAT, created, created + max_age if max_age else None, entries))
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    partial = path + '.tmp'
+    with open(partial, 'wb') as f:
+        f.write(MAGIC)
+        f.write(_LENGTH.pack(len(header)))
+        f.write(header)
+        for blob in blobs:
+            f.write(blob)
+    os.replace(partial, path)  # Readers never see a half-written file
+    return os.path.getsize(path)
+
+
+class PrecompiledBanks:
+    """Lazily opened precompiled bank file; a missing or unreadable file simply holds no tabs."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._opened = False
+        self._map = None
+        self._header = None
+        self._index = {}
+        self._banks = {}  # Decoded banks, so every lookup of a tab returns the same object
+        self._stats = {'served': 0, 'served_expired': 0, 'decoded': 0}
+
+    def _open(self):
+        # Called with the lock held
+        self._opened = True
+        if not self.path or not os.path.isfile(self.path):
+            return
+        started = time.perf_counter()
+        try:
+            with open(self.path, 'rb') as f:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            if data[:len(MAGIC)] != MAGIC:
+                raise ValueError('not a precompiled bank file')
+            (length,) = _LENGTH.unpack_from(data, len(MAGIC))
+            start = len(MAGIC) + _LENGTH.size
+            header = msgspec.msgpack.decode(data[start:start + length], type=_Header)
+            if header.format != FORMAT:
+                raise ValueError(f'format {header.format}, expected {FORMAT}')
+        except (OSError, ValueError, msgspec.DecodeError) as e:
+            log.warning("Ignoring precompiled banks: %s", e, extra={'path': self.path})
+            return
+        self._map = data
+        self._header = header
+        self._index = {(entry.spreadsheet_id, entry.tab_name): (start + length + entry.offset, entry)
+                       for entry in header.tabs}
+        log.info("Opened precompiled banks", extra={
+            'path': self.path, 'tabs': len(self._index), 'expired': self.expired(),
+            'duration_ms': round((time.perf_counter() - started) * 1000, 2)})
+
+    def expired(self):
+        expires = self._header.expires if self._header else None
+        return expires is not None and time.time() >= expires
+
+    def get(self, spreadsheet_id, tab_name, allow_expired=False):
+        """The precompiled bank for a tab, or None if it is not in the file (or expired)."""
+        key = (spreadsheet_id, tab_name)
+        with self._lock:
+            if not self._opened:
+                self._open()
+            found = self._index.get(key)
+            if found is None or (self.expired() and not allow_expired):
+                return None
+            bank = self._banks.get(key)
+            if bank is None:
+                start, entry = found
+                bank = self._banks[key] = _decode_bank(self._map[start:start + entry.length], entry.version)
+                self._stats['decoded'] += 1
+            self._stats['served_expired' if self.expired() else 'served'] += 1
+            return bank
+
+    def status(self):
+        with self._lock:
+            header = self._header
+            return {
+                'path': self.path,
+                'loaded': header is not None,
+                'created': header.created if header else None,
+                'expires': header.expires if header else None,
+                'expired': self.expired(),
+                'tabs': [list(key) for key in self._index],
+                **self._stats,
+            }
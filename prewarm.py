@@ -0,0 +1,172 @@
+"""Background prewarming of question banks.
+
+Jobs load a tab into the bank cache before any student asks for it.  They
+run on a small, fixed pool of worker threads fed by a bounded priority
+queue, so admin-triggered warms (saving a quiz) jump ahead of scheduled
+ones and a burst of requests can never start more loads than there are
+workers.  A tab already waiting in the queue is not queued twice; a more
+urgent request for it only raises its priority.
+
+A scheduler thread can also re-queue a configured list of tabs every
+`interval` seconds, keeping them fresh in the cache.  Everything is per
+process: each gunicorn worker warms its own cache.
+"""
+import heapq
+import itertools
+import logging
+import threading
+import time
+from collections import deque
+
+log = logging.getLogger('quizmaker.prewarm')
+
+PRIORITY_ADMIN = 0
+PRIORITY_SCHEDULED = 10
+
+
+def parse_tab_list(value):
+    """Parse "spreadsheet_id/tab, spreadsheet_id/tab" into [(spreadsheet_id, tab), ...]."""
+    pairs = []
+    for item in value.split(','):
+        spreadsheet_id, sep, tab_name = item.strip().partition('/')
+        if sep and spreadsheet_id and tab_name:
+            pairs.append((spreadsheet_id, tab_name.strip()))
+        elif item.strip():
+            log.warning("Ignoring prewarm entry without a tab: %s", item.strip())
+    return pairs
+
+
+class _Job:
+    __slots__ = ('key', 'priority', 'origin', 'queued_at', 'started_at')
+
+    def __init__(self, key, priority, origin):
+        self.key = key
+        self.priority = priority
+        self.origin = origin
+        self.queued_at = time.time()
+        self.started_at = None
+
+
+class PrewarmPool:
+    def __init__(self, warm, workers=2, max_queue=256, history=50):
+        """warm(spreadsheet_id, tab_name) loads one tab and returns something truthy on success."""
+        self._warm = warm
+        self.workers = workers
+        self.max_queue = max_queue
+        self._heap = []  # (priority, sequence, job); stale entries are skipped when popped
+        self._pending = {}  # key -> job waiting in the heap
+        self._running = {}  # key -> job being warmed
+        self._sequence = itertools.count()
+        self._history = deque(maxlen=history)
+        self._lock = threading.Lock()
+        self._ready = threading.Condition(self._lock)
+        self._threads = []
+        self._schedule = []
+        self._interval = None
+        self._stats = {'queued': 0, 'deduplicated': 0, 'rejected': 0, 'completed': 0, 'failed': 0}
+
+    def _start(self):
+        # Called with the lock held
+        if self._threads:
+            return
+        for number in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f'prewarm-{number}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, spreadsheet_id, tab_name, priority=PRIORITY_ADMIN, origin='admin'):
+        """Queue a tab; returns 'queued', 'duplicate' or 'rejected' (queue full)."""
+        key = (spreadsheet_id, tab_name)
+        with self._lock:
+            self._start()
+            job = self._pending.get(key)
+            if job is not None:
+                self._stats['deduplicated'] += 1
+                if priority < job.priority:
+                    job.priority = priority
+                    heapq.heappush(self._heap, (priority, next(self._sequence), job))
+                return 'duplicate'
+            if len(self._pending) >= self.max_queue:
+                self._stats['rejected'] += 1
+                return 'rejected'
+            job = _Job(key, priority, origin)
+            self._pending[key] = job
+            heapq.heappush(self._heap, (priority, next(self._sequence), job))
+            self._stats['queued'] += 1
+            self._ready.notify()
+        return 'queued'
+
+    def _next_job(self):
+        with self._lock:
+            while True:
+                while self._heap:
+                    priority, _, job = heapq.heappop(self._heap)
+                    # Skip entries superseded by a priority bump or already taken
+                    if self._pending.get(job.key) is job and priority == job.priority:
+                        del self._pending[job.key]
+                        job.started_at = time.time()
+                        self._running[job.key] = job
+                        return job
+                self._ready.wait()
+
+    def _work(self):
+        while True:
+            job = self._next_job()
+            error = None
+            try:
+                ok = bool(self._warm(*job.key))
+                if not ok:
+                    error = 'Could not load questions'
+            except Exception as e:
+                ok, error = False, str(e)
+            finished = time.time()
+            with self._lock:
+                self._running.pop(job.key, None)
+                self._stats['completed' if ok else 'failed'] += 1
+                self._history.append({
+                    'spreadsheet_id': job.key[0],
+                    'tab_name': job.key[1],
+                    'origin': job.origin,
+                    'priority': job.priority,
+                    'ok': ok,
+                    'error': error,
+                    'finished': round(finished, 3),
+                    'wait_ms': round((job.started_at - job.queued_at) * 1000, 1),
+                    'run_ms': round((finished - job.started_at) * 1000, 1),
+                })
+            if not ok:
+                log.warning("Prewarm failed", extra={'spreadsheet_id': job.key[0], 'tab_name': job.key[1],
+                                                     'error': error})
+
+    def schedule(self, pairs, interval):
+        """Queue `pairs` every `interval` seconds, starting now, at scheduled priority."""
+        if not pairs or interval <= 0:
+            return
+        self._schedule = list(pairs)
+        self._interval = interval
+        threading.Thread(target=self._schedule_forever, name='prewarm-scheduler', daemon=True).start()
+
+    def _schedule_forever(self):
+        while True:
+            for spreadsheet_id, tab_name in self._schedule:
+                self.submit(spreadsheet_id, tab_name, PRIORITY_SCHEDULED, origin='schedule')
+            time.sleep(self._interval)
+
+    def status(self):
+        now = time.time()
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'max_queue': self.max_queue,
+                'queue_depth': len(self._pending),
+                'waiting': sorted(({'spreadsheet_id': job.key[0], 'tab_name': job.key[1], 'origin': job.origin,
+                                   'priority': job.priority, 'waiting_ms': round((now - job.queued_at) * 1000, 1)}
+                                  for job in self._pending.values()), key=lambda item: item['priority']),
+                'running': [{'spreadsheet_id': job.key[0], 'tab_name': job.key[1], 'origin': job.origin,
+                             'running_ms': round((now - job.started_at) * 1000, 1)}
+                            for job in self._running.values()],
+                'recent': list(reversed(self._history)),
+                'schedule': {'interval': self._interval,
+                             'tabs': [list(pair) for pair in self._schedule]},
+                **self._stats,
+            }
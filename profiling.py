@@ -0,0 +1,210 @@
+"""Sampled request profiling.
+
+A WSGI middleware runs a sampled fraction of requests under cProfile, so a
+profile covers everything the request does: session load and save, sheet
+fetches, bank compilation, shuffling and template rendering.  Only the
+`keep` slowest profiles are retained (a bounded min-heap keyed by duration),
+each stored as the raw pstats table.  Profiles can be exported as a pstats
+file, a text report or flamegraph-ready collapsed stacks.  State is per
+process.
+"""
+import cProfile
+import heapq
+import io
+import itertools
+import marshal
+import pstats
+import random
+import threading
+import time
+
+# Never profile the profiler's own endpoints, metrics scrapes or static files
+SKIP_PREFIXES = ('/admin/profiling', '/metrics', '/static/')
+MAX_STACK_DEPTH = 64
+
+
+class Profile:
+    __slots__ = ('id', 'method', 'path', 'status', 'duration', 'started', 'stats')
+
+    def __init__(self, profile_id, method, path, status, duration, started, stats):
+        self.id = profile_id
+        self.method = method
+        self.path = path
+        self.status = status
+        self.duration = duration
+        self.started = started
+        self.stats = stats
+
+    def summary(self):
+        return {
+            'id': self.id,
+            'method': self.method,
+            'path': self.path,
+            'status': self.status,
+            'duration_ms': round(self.duration * 1000, 2),
+            'started': round(self.started, 3),
+            'functions': len(self.stats),
+        }
+
+    def pstats_bytes(self):
+        """The profile in the format written by pstats.Stats.dump_stats."""
+        return marshal.dumps(self.stats)
+
+    def text_report(self, sort='cumulative', limit=40):
+        stats = pstats.Stats(_StatsHolder(self.stats), stream=io.StringIO())
+        stats.sort_stats(sort).print_stats(limit)
+        return stats.stream.getvalue()
+
+    def collapsed_stacks(self):
+        """Collapsed stacks ("a;b;c microseconds" lines) for flamegraph.pl / speedscope.
+
+        cProfile records caller/callee pairs rather than full stacks, so each
+        function's own time is spread over its call paths in proportion to the
+        time spent under each caller.
+        """
+        weights = {}
+        for func, (_, _, tottime, _, _) in self.stats.items():
+            if tottime > 0:
+                _attribute(self.stats, func, tottime, (), weights)
+        lines = [f'{";".join(stack)} {round(weight * 1e6)}'
+                 for stack, weight in weights.items() if round(weight * 1e6) > 0]
+        return '\n'.join(sorted(lines)) + '\n'
+
+
+class _StatsHolder:
+    # pstats.Stats accepts any object with create_stats() and a stats dict
+    def __init__(self, stats):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+def _label(func):
+    filename, line, name = func
+    if filename == '~':  # Built-in
+        return name.strip('<>').replace(';', ',').replace(' ', '_')
+    module = filename.rsplit('/', 1)[-1]
+    return f'{name}({module}:{line})'.replace(';', ',').replace(' ', '_')
+
+
+def _attribute(stats, func, weight, path, weights):
+    path = (_label(func),) + path
+    callers = stats[func][4] if func in stats else {}
+    callers = {caller: value for caller, value in callers.items() if _label(caller) not in path}
+    if not callers or len(path) >= MAX_STACK_DEPTH:
+        weights[path] = weights.get(path, 0) + weight
+        return
+    # callers[caller] is (calls, primitive calls, tottime, cumtime) under that caller
+    total = sum(value[3] for value in callers.values())
+    for caller, value in callers.items():
+        share = value[3] / total if total else 1 / len(callers)
+        if share * weight > 0:
+            _attribute(stats, caller, weight * share, path, weights)
+
+
+class RequestProfiler:
+    def __init__(self, sample_rate=0.0, keep=20):
+        self.sample_rate = sample_rate
+        self.keep = keep
+        self._heap = []  # (duration, id, Profile); the fastest kept profile is first
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._stats = {'profiled': 0, 'retained': 0, 'busy': 0}
+
+    def configure(self, sample_rate=None, keep=None):
+        with self._lock:
+            if sample_rate is not None:
+                self.sample_rate = sample_rate
+            if keep is not None:
+                self.keep = keep
+                self._trim()
+
+    def should_profile(self, path):
+        return self.sample_rate > 0 and random.random() < self.sample_rate and not path.startswith(SKIP_PREFIXES)
+
+    def record_busy(self):
+        with self._lock:
+            self._stats['busy'] += 1
+
+    def record(self, method, path, status, duration, started, profiler):
+        profiler.create_stats()
+        with self._lock:
+            self._stats['profiled'] += 1
+            if self.keep <= 0 or (len(self._heap) >= self.keep and duration <= self._heap[0][0]):
+                return
+            profile = Profile(next(self._ids), method, path, status, duration, started, profiler.stats)
+            heapq.heappush(self._heap, (duration, profile.id, profile))
+            self._stats['retained'] += 1
+            self._trim()
+
+    def _trim(self):
+        while len(self._heap) > max(self.keep, 0):
+            heapq.heappop(self._heap)
+
+    def profiles(self):
+        """Retained profiles, slowest first."""
+        with self._lock:
+            return [profile for _, _, profile in sorted(self._heap, reverse=True)]
+
+    def get(self, profile_id):
+        with self._lock:
+            for _, _, profile in self._heap:
+                if profile.id == profile_id:
+                    return profile
+        return None
+
+    def clear(self):
+        with self._lock:
+            self._heap.clear()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update(sample_rate=self.sample_rate, keep=self.keep, held=len(self._heap))
+        return stats
+
+
+class ProfilingMiddleware:
+    """WSGI middleware that hands sampled requests to a RequestProfiler."""
+
+    def __init__(self, wsgi_app, profiler):
+        self.wsgi_app = wsgi_app
+        self.profiler = profiler
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        if not self.profiler.should_profile(path):
+            return self.wsgi_app(environ, start_response)
+
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler is active in this interpreter (Python 3.12+)
+            self.profiler.record_busy()
+            return self.wsgi_app(environ, start_response)
+
+        status = []
+
+        def capture_status(status_line, headers, exc_info=None):
+            status.append(int(status_line.split(' ', 1)[0]))
+            return start_response(status_line, headers, exc_info)
+
+        started = time.time()
+        start = time.perf_counter()
+        try:
+            # Flask bodies are built before the call returns; join them so
+            # streamed responses are profiled too
+            app_iter = self.wsgi_app(environ, capture_status)
+            try:
+                body = b''.join(app_iter)
+            finally:
+                if hasattr(app_iter, 'close'):
+                    app_iter.close()
+        finally:
+            profile.disable()
+            duration = time.perf_counter() - start
+            self.profiler.record(environ.get('REQUEST_METHOD', 'GET'), path,
+                                 status[-1] if status else 500, duration, started, profile)
+        return [body]
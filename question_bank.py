@@ -0,0 +1,239 @@
+"""Compiled, immutable question banks.
+
+Sheet rows are compiled once per sheet version into a ``QuestionBank``: a
+tuple of ``Question`` records whose strings are interned, so answers repeated
+across a bank ("True", "False", "All of the above") are stored once.  Banks
+are shared between requests and threads and must never be mutated.
+
+Row layout: column A is an optional section label, B the question, C the
+correct answer and D-F the wrong answers.  In a sheet the first two rows are
+headers.
+
+Every row is fingerprinted with a short digest of its cells.  Recompiling a
+tab against the previous bank reuses the Question of every row whose digest
+is unchanged, so a refresh after a one-row edit compiles one row; when
+nothing changed at all the previous bank itself is returned.  The bank
+version is a hash of the question rows' digests, in order.
+"""
+import bisect
+import hashlib
+import sys
+from array import array
+from collections import namedtuple
+
+HEADER_ROWS = 2
+MAX_WRONG_ANSWERS = 3
+MAX_LISTED_ROWS = 50  # Per diagnostic reason; the count is always complete
+DIGEST_SIZE = 12  # Bytes per row fingerprint
+
+
+class Question(namedtuple('Question', ('text', 'answers', 'section', 'row'))):
+    """One question; answers[0] is the correct answer. row is the 1-based sheet row."""
+    __slots__ = ()
+
+    @property
+    def correct_answer(self):
+        return self.answers[0]
+
+
+class SectionPool:
+    """Read-only view of several sections' index arrays as one sequence."""
+    __slots__ = ('_arrays', '_offsets')
+
+    def __init__(self, arrays):
+        self._arrays = arrays
+        self._offsets = []
+        total = 0
+        for indexes in arrays:
+            self._offsets.append(total)
+            total += len(indexes)
+        self._offsets.append(total)
+
+    def __len__(self):
+        return self._offsets[-1]
+
+    def __getitem__(self, position):
+        if not 0 <= position < len(self):
+            raise IndexError('pool index out of range')
+        which = bisect.bisect_right(self._offsets, position) - 1
+        return self._arrays[which][position - self._offsets[which]]
+
+
+class QuestionBank:
+    __slots__ = ('questions', 'row_count', 'version', 'diagnostics', 'sections', 'row_digests')
+
+    def __init__(self, questions, row_count, version, diagnostics, sections, row_digests=b''):
+        self.questions = questions
+        self.row_count = row_count
+        self.version = version
+        self.diagnostics = diagnostics
+        self.sections = sections
+        self.row_digests = row_digests  # DIGEST_SIZE bytes per question, in question order
+
+    def __len__(self):
+        return len(self.questions)
+
+    def digest_index(self):
+        """{row digest: question indexes in order} for recompiling against this bank.
+
+        A digest maps to several indexes when a tab repeats a row.
+        """
+        digests = self.row_digests
+        index = {}
+        for position, start in enumerate(range(0, len(digests), DIGEST_SIZE)):
+            index.setdefault(digests[start:start + DIGEST_SIZE], []).append(position)
+        return index
+
+    def pool(self, sections=None):
+        """Bank indexes of the questions in the given sections (all when empty).
+
+        Raises KeyError naming the first unknown section.
+        """
+        if not sections:
+            return range(len(self.questions))
+        return SectionPool([self.sections[name] for name in sections])
+
+    def memory_usage(self):
+        """Approximate bytes held by the bank, counting shared strings once."""
+        seen = set()
+        total = 0
+        pending = [self.questions, self.sections]
+        while pending:
+            obj = pending.pop()
+            if id(obj) in seen:
+                continue
+            seen.add(id(obj))
+            total += sys.getsizeof(obj)
+            if isinstance(obj, tuple):
+                pending.extend(obj)
+            elif isinstance(obj, dict):
+                pending.extend(obj.keys())
+                pending.extend(obj.values())
+        count = len(self.questions)
+        return {
+            'bytes': total,
+            'bytes_per_1k_questions': round(total * 1000 / count) if count else 0,
+        }
+
+    def summary(self):
+        return {
+            'version': self.version,
+            'questions': len(self.questions),
+            'rows': self.row_count,
+            'skipped': self.diagnostics['skipped'],
+            'sections': {name: len(indexes) for name, indexes in self.sections.items()},
+            **self.memory_usage(),
+        }
+
+
+def combine_banks(banks):
+    """One bank holding the questions of several, in order (for multi-tab quizzes).
+
+    Sections with the same label are merged.  The version changes whenever
+    any component's version does.
+    """
+    questions = []
+    sections = {}
+    reasons = {}
+    digest = hashlib.sha1()
+    for bank in banks:
+        offset = len(questions)
+        questions.extend(bank.questions)
+        for name, indexes in bank.sections.items():
+            sections.setdefault(name, array('I')).extend(offset + index for index in indexes)
+        for reason, detail in bank.diagnostics['reasons'].items():
+            reasons.setdefault(reason, {'count': 0, 'rows': []})['count'] += detail['count']
+        digest.update(bank.version.encode('ascii'))
+    diagnostics = {
+        'skipped': sum(bank.diagnostics['skipped'] for bank in banks),
+        # Row numbers are per tab, so only the counts are meaningful here
+        'reasons': reasons,
+    }
+    return QuestionBank(tuple(questions), sum(bank.row_count for bank in banks),
+                        digest.hexdigest()[:16], diagnostics, sections,
+                        b''.join(bank.row_digests for bank in banks))
+
+
+def _cell(row, index):
+    return row[index].strip() if index < len(row) else ''
+
+
+def _row_digest(row):
+    # Trailing empty cells are dropped so a row reads the same from every source
+    # (the Sheets API omits them, CSV and SQLite keep them)
+    end = len(row)
+    while end and not row[end - 1]:
+        end -= 1
+    return hashlib.blake2b('\x1f'.join(row[:end]).encode('utf-8'), digest_size=DIGEST_SIZE).digest()
+
+
+def compile_bank(rows, header_rows=HEADER_ROWS, previous=None):
+    """Compile sheet-layout rows (lists of cell strings) into a QuestionBank.
+
+    rows may be any iterable, so sources can stream large banks; the first
+    `header_rows` are skipped and row_count counts the rest.  With `previous`
+    (the tab's last bank), unchanged rows reuse its Questions, and previous
+    itself is returned if the tab is exactly as it was.
+    """
+    rows = iter(rows)
+    for _ in range(header_rows):
+        next(rows, None)
+    reusable = previous.digest_index() if previous is not None else {}
+    reused = {}  # Digest -> how many of its previous Questions are taken, so duplicates pair up in order
+    row_count = 0
+    questions = []
+    digests = []
+    sections = {}
+    problems = {}
+    compiled = 0
+    moved = False
+    intern = sys.intern
+
+    for row_number, row in enumerate(rows, start=header_rows + 1):
+        row_count += 1
+        row_digest = _row_digest(row)
+        indexes = reusable.get(row_digest, ())
+        taken = reused.get(row_digest, 0)
+        if taken < len(indexes):
+            reused[row_digest] = taken + 1
+            question = previous.questions[indexes[taken]]
+            if question.row != row_number:
+                # Rows inserted or deleted above; the content is unchanged
+                question = question._replace(row=row_number)
+                moved = True
+            if question.section:
+                sections.setdefault(question.section, array('I')).append(len(questions))
+            questions.append(question)
+            digests.append(row_digest)
+            continue
+
+        compiled += 1
+        text = _cell(row, 1)
+        correct = _cell(row, 2)
+        if not text or not correct:
+            problems.setdefault('missing_question_or_answer', []).append(row_number)
+            continue
+        wrong = [cell for cell in (_cell(row, i) for i in range(3, 3 + MAX_WRONG_ANSWERS)) if cell]
+        if not wrong:
+            problems.setdefault('no_wrong_answers', []).append(row_number)
+            continue
+
+        section = intern(_cell(row, 0))
+        if section:
+            sections.setdefault(section, array('I')).append(len(questions))
+        answers = tuple(intern(answer) for answer in [correct] + wrong)
+        questions.append(Question(intern(text), answers, section, row_number))
+        digests.append(row_digest)
+
+    diagnostics = {
+        'skipped': sum(len(numbers) for numbers in problems.values()),
+        'reasons': {reason: {'count': len(numbers), 'rows': numbers[:MAX_LISTED_ROWS]}
+                    for reason, numbers in problems.items()},
+    }
+    row_digests = b''.join(digests)
+    version = hashlib.sha1(row_digests).hexdigest()[:16]
+    if (previous is not None and version == previous.version and not moved
+            and row_count == previous.row_count and diagnostics['reasons'] == previous.diagnostics['reasons']):
+        return previous
+    diagnostics['recompiled_rows'] = compiled
+    return QuestionBank(tuple(questions), row_count, version, diagnostics, sections, row_digests)
@@ -0,0 +1,263 @@
+"""Where question banks come from.
+
+The first segment of a quiz URL names the source.  A plain spreadsheet ID
+is a Google Sheet; ``csv:<name>``, ``jsonl:<name>`` and ``sqlite:<name>``
+name local banks under QUESTION_BANK_DIR, which cost no network round trip
+and no API quota:
+
+- ``csv:<name>``: directory ``<name>/`` holding one ``<tab>.csv`` per tab,
+  in the sheet's layout including its two header rows (File > Download >
+  CSV from Google Sheets produces exactly this).
+- ``jsonl:<name>``: directory ``<name>/`` holding one ``<tab>.jsonl`` per tab,
+  one question per line, either as a sheet row (a list of cells) or as
+  ``{"section": ..., "question": ..., "correct": ..., "wrong": [...]}``.
+- ``sqlite:<name>``: database ``<name>.db`` with one table per tab, created by
+  ``python question_sources.py import``.
+
+Every source lists its tabs and yields a tab's rows in the sheet layout
+(section, question, correct answer, wrong answers).  Local files are streamed
+row by row into the compiler, so a large bank is never held in memory as
+raw text as well as compiled questions.
+
+    python question_sources.py import biology.csv banks/science.db Biology
+"""
+import argparse
+import csv
+import json
+import logging
+import os
+import re
+import sqlite3
+import sys
+
+import sheets_client
+from question_bank import HEADER_ROWS, MAX_WRONG_ANSWERS
+
+log = logging.getLogger('quizmaker.sources')
+
+LOCAL_SCHEMES = ('csv', 'jsonl', 'sqlite')
+# Bank, directory and tab names that map safely onto file and table names
+SAFE_NAME = re.compile(r'^[\w][\w .-]*$')
+SQLITE_COLUMNS = ('section', 'question', 'correct') + tuple(f'wrong{i}' for i in range(1, MAX_WRONG_ANSWERS + 1))
+
+
+class SourceError(Exception):
+    """The source or tab does not exist or cannot be read."""
+
+
+def _check_name(name, kind):
+    if not SAFE_NAME.match(name) or '..' in name:
+        raise SourceError(f'Invalid {kind} name: {name!r}')
+    return name
+
+
+class QuestionSource:
+    """Interface: tabs() lists tab names; rows(tab_name) yields sheet-layout rows."""
+    header_rows = 0
+
+    def tabs(self):
+        raise NotImplementedError
+
+    def rows(self, tab_name):
+        raise NotImplementedError
+
+    def batch_rows(self, tab_names):
+        """{tab_name: rows} for several tabs; sources with a bulk read override this."""
+        return {tab_name: self.rows(tab_name) for tab_name in tab_names}
+
+
+class SheetsSource(QuestionSource):
+    header_rows = HEADER_ROWS
+    RANGE = 'A:F'
+
+    def __init__(self, spreadsheet_id, latency=None):
+        self.spreadsheet_id = spreadsheet_id
+        self._latency = latency  # Optional metrics.Histogram labelled by call
+
+    def _execute(self, call, build_request):
+        # Timed end to end, including rate-limit waits and retries
+        client = sheets_client.get_client()
+        if self._latency is None:
+            return client.execute(build_request)
+        with self._latency.time(call=call):
+            return client.execute(build_request)
+
+    def tabs(self):
+        metadata = self._execute('spreadsheets.get', lambda sheets: sheets.get(
+            spreadsheetId=self.spreadsheet_id))
+        return [sheet['properties']['title'] for sheet in metadata.get('sheets', [])]
+
+    def rows(self, tab_name):
+        range_name = f'{tab_name}!{self.RANGE}'
+        result = self._execute('values.get', lambda sheets: sheets.values().get(
+            spreadsheetId=self.spreadsheet_id, range=range_name))
+        values = result.get('values', [])
+        log.info("Fetched sheet data", extra={'spreadsheet_id': self.spreadsheet_id, 'range': range_name,
+                                              'rows': len(values)})
+        return values
+
+    def batch_rows(self, tab_names):
+        """All tabs in one values.batchGet round trip."""
+        ranges = [f'{tab_name}!{self.RANGE}' for tab_name in tab_names]
+        result = self._execute('values.batchGet', lambda sheets: sheets.values().batchGet(
+            spreadsheetId=self.spreadsheet_id, ranges=ranges))
+        # valueRanges come back in request order, with ranges normalized (quoted, bounded)
+        value_ranges = result.get('valueRanges', [])
+        log.info("Fetched sheet data", extra={'spreadsheet_id': self.spreadsheet_id, 'ranges': len(ranges),
+                                              'rows': sum(len(item.get('values', [])) for item in value_ranges)})
+        return {tab_name: item.get('values', []) for tab_name, item in zip(tab_names, value_ranges)}
+
+
+class _DirectorySource(QuestionSource):
+    extension = None
+
+    def __init__(self, path):
+        self.path = path
+
+    def tabs(self):
+        if not os.path.isdir(self.path):
+            raise SourceError(f'No question bank directory {os.path.basename(self.path)!r}')
+        return sorted(name[:-len(self.extension)] for name in os.listdir(self.path)
+                      if name.endswith(self.extension) and SAFE_NAME.match(name))
+
+    def _open(self, tab_name):
+        path = os.path.join(self.path, _check_name(tab_name, 'tab') + self.extension)
+        try:
+            # utf-8-sig drops the byte order mark some spreadsheet exports add
+            return open(path, encoding='utf-8-sig', newline='')
+        except FileNotFoundError:
+            raise SourceError(f'No tab {tab_name!r} in {os.path.basename(self.path)!r}') from None
+
+
+class CSVSource(_DirectorySource):
+    header_rows = HEADER_ROWS
+    extension = '.csv'
+
+    def rows(self, tab_name):
+        with self._open(tab_name) as f:
+            yield from csv.reader(f)
+
+
+def _jsonl_row(line):
+    line = line.strip()
+    if not line:
+        return []
+    try:
+        item = json.loads(line)
+    except ValueError:
+        return []  # Reported by the compiler as a row without a question
+    if isinstance(item, list):
+        return [str(cell) for cell in item]
+    if isinstance(item, dict):
+        wrong = item.get('wrong') or []
+        if isinstance(wrong, str):
+            wrong = [wrong]
+        return [str(item.get('section') or ''), str(item.get('question') or ''),
+                str(item.get('correct') or '')] + [str(answer) for answer in wrong]
+    return []
+
+
+class JSONLSource(_DirectorySource):
+    extension = '.jsonl'
+
+    def rows(self, tab_name):
+        with self._open(tab_name) as f:
+            for line in f:
+                yield _jsonl_row(line)
+
+
+class SQLiteSource(QuestionSource):
+    def __init__(self, path):
+        self.path = path
+
+    def _connect(self):
+        if not os.path.isfile(self.path):
+            raise SourceError(f'No question bank database {os.path.basename(self.path)!r}')
+        # Read-only, so a bank being served can never be modified by the app
+        return sqlite3.connect(f'file:{self.path}?mode=ro', uri=True)
+
+    def tabs(self):
+        conn = self._connect()
+        try:
+            tables = [row[0] for row in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name")]
+            return [table for table in tables
+                    if set(SQLITE_COLUMNS) <= {row[1] for row in conn.execute(f'PRAGMA table_info("{table}")')}]
+        finally:
+            conn.close()
+
+    def rows(self, tab_name):
+        _check_name(tab_name, 'tab')
+        conn = self._connect()
+        try:
+            # Walks the integer primary key, so rows come back in insertion order without a sort.
+            # A missing table (or one without the bank columns) fails here, with no catalog lookup first.
+            try:
+                cursor = conn.execute(f'SELECT {", ".join(SQLITE_COLUMNS)} FROM "{tab_name}" ORDER BY id')
+            except sqlite3.OperationalError:
+                raise SourceError(f'No tab {tab_name!r} in {os.path.basename(self.path)!r}') from None
+            for row in cursor:
+                yield [cell or '' for cell in row]
+        finally:
+            conn.close()
+
+
+def open_source(source_id, bank_dir, sheets_latency=None):
+    """The QuestionSource named by the first segment of a quiz URL."""
+    scheme, sep, name = source_id.partition(':')
+    if not sep or scheme not in LOCAL_SCHEMES:
+        return SheetsSource(source_id, latency=sheets_latency)
+    name = _check_name(name, 'bank')
+    if scheme == 'csv':
+        return CSVSource(os.path.join(bank_dir, name))
+    if scheme == 'jsonl':
+        return JSONLSource(os.path.join(bank_dir, name))
+    return SQLiteSource(os.path.join(bank_dir, name + '.db'))
+
+
+def import_rows(rows, db_path, table, header_rows=0):
+    """Replace `table` in db_path with sheet-layout rows; returns the number of rows written."""
+    _check_name(table, 'tab')
+    conn = sqlite3.connect(db_path)
+    try:
+        with conn:
+            conn.execute(f'DROP TABLE IF EXISTS "{table}"')
+            conn.execute(f'CREATE TABLE "{table}" (id INTEGER PRIMARY KEY, '
+                         + ', '.join(f'{column} TEXT' for column in SQLITE_COLUMNS) + ')')
+            rows = iter(rows)
+            for _ in range(header_rows):
+                next(rows, None)
+            width = len(SQLITE_COLUMNS)
+            placeholders = ', '.join('?' * width)
+            cursor = conn.executemany(
+                f'INSERT INTO "{table}" ({", ".join(SQLITE_COLUMNS)}) VALUES ({placeholders})',
+                ((list(row) + [''] * width)[:width] for row in rows))
+            count = cursor.rowcount
+    finally:
+        conn.close()
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Manage local question banks.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    importer = commands.add_parser('import', help='load a CSV or JSONL tab into a SQLite bank')
+    importer.add_argument('file', help='.csv (sheet layout with two header rows) or .jsonl file')
+    importer.add_argument('database', help='SQLite bank, e.g. banks/science.db')
+    importer.add_argument('table', help='tab name to create or replace')
+    args = parser.parse_args()
+
+    directory, filename = os.path.split(os.path.abspath(args.file))
+    tab_name, extension = os.path.splitext(filename)
+    if extension == '.csv':
+        source = CSVSource(directory)
+    elif extension == '.jsonl':
+        source = JSONLSource(directory)
+    else:
+        sys.exit('Only .csv and .jsonl files can be imported')
+    count = import_rows(source.rows(tab_name), args.database, args.table, source.header_rows)
+    print(f"Imported {count} rows into {args.database} table {args.table}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,252 @@
+"""Rate limiting, retries and circuit breaking for calls to an upstream API.
+
+UpstreamGuard wraps each call in three layers:
+
+- a token bucket caps the request rate, so a burst of quiz starts queues for
+  a moment instead of spending the API quota and getting throttled;
+- transient failures (the caller's classify() decides which) are retried with
+  exponential backoff and full jitter, waiting at least as long as the
+  server's Retry-After asks;
+- after ``failure_threshold`` calls in a row fail, a circuit breaker opens and
+  further calls fail immediately for ``reset_timeout`` seconds, after which a
+  single trial call decides whether to close it again.
+
+Calls refused by the bucket or the breaker raise UpstreamUnavailable, so
+callers can fall back to data they already hold.
+"""
+import logging
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+log = logging.getLogger('quizmaker.resilience')
+
+
+class UpstreamUnavailable(Exception):
+    """The call was not attempted; retry_after is a hint in seconds."""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class RateLimitExceeded(UpstreamUnavailable):
+    """The token bucket could not grant a request within max_wait."""
+
+
+class CircuitOpenError(UpstreamUnavailable):
+    """The circuit breaker is open after repeated upstream failures."""
+
+
+def parse_retry_after(value):
+    """Seconds from a Retry-After header (delta-seconds or HTTP date), or None."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class TokenBucket:
+    """`rate` requests per second with bursts of up to `burst`; rate <= 0 disables it."""
+
+    def __init__(self, rate, burst=None, max_wait=10.0):
+        self.rate = rate
+        self.burst = max(1.0, burst if burst is not None else rate)
+        self.max_wait = max_wait
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take one token, sleeping until it is available; returns the seconds waited."""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # A negative balance is a queue of reservations; each caller waits its turn
+            wait = (1 - self._tokens) / self.rate if self._tokens < 1 else 0.0
+            if wait > self.max_wait:
+                raise RateLimitExceeded(f'Rate limit queue is {wait:.1f}s long', retry_after=wait)
+            self._tokens -= 1
+        if wait:
+            time.sleep(wait)
+        return wait
+
+
+class CircuitBreaker:
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._open_until = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+        self.opened = 0  # Times the breaker has opened
+
+    def allow(self):
+        """Raise CircuitOpenError unless a call may go ahead."""
+        if self.failure_threshold <= 0:
+            return
+        with self._lock:
+            if self._state == self.CLOSED:
+                return
+            now = time.monotonic()
+            if self._state == self.OPEN and now >= self._open_until:
+                self._state = self.HALF_OPEN
+                self._trial_running = False
+            if self._state == self.HALF_OPEN and not self._trial_running:
+                # Exactly one caller probes the upstream; the rest keep failing fast
+                self._trial_running = True
+                return
+            raise CircuitOpenError('Upstream circuit is open', retry_after=max(0.0, self._open_until - now))
+
+    def is_open(self):
+        with self._lock:
+            return self._state == self.OPEN and time.monotonic() < self._open_until
+
+    def record_success(self):
+        with self._lock:
+            if self._state != self.CLOSED:
+                log.info("Circuit closed")
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_running = False
+
+    def release_trial(self):
+        """A trial call ended without an upstream outcome; the next caller probes instead."""
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._trial_running = False
+
+    def record_failure(self, open_for=None):
+        """Count a failed call; `open_for` (e.g. a long Retry-After) opens the breaker at once."""
+        if self.failure_threshold <= 0:
+            return
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold or open_for:
+                duration = max(self.reset_timeout, open_for or 0.0)
+                if self._state != self.OPEN:
+                    self.opened += 1
+                    log.warning("Circuit opened", extra={'failures': self._failures, 'open_seconds': duration})
+                self._state = self.OPEN
+                self._open_until = time.monotonic() + duration
+                self._trial_running = False
+
+    def state(self):
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() >= self._open_until:
+                return self.HALF_OPEN
+            return self._state
+
+
+class UpstreamGuard:
+    def __init__(self, classify, bucket=None, breaker=None, max_retries=3, base_delay=0.5, max_delay=8.0):
+        """classify(exception) returns (retryable, retry_after_seconds or None)."""
+        self._classify = classify
+        self.bucket = bucket or TokenBucket(0)
+        self.breaker = breaker or CircuitBreaker(0)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._lock = threading.Lock()
+        self._stats = {
+            'calls': 0,
+            'retries': 0,
+            'failures': 0,
+            'throttled': 0,
+            'throttle_wait_seconds': 0.0,
+            'rate_limit_rejections': 0,
+            'short_circuited': 0,
+        }
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._stats[name] += amount
+
+    def backoff(self, attempt, retry_after=None):
+        """Seconds to sleep before retry number `attempt` (0-based): full jitter, at least retry_after."""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        return max(delay, retry_after or 0.0)
+
+    def call(self, fn):
+        try:
+            self.breaker.allow()
+        except CircuitOpenError:
+            self._count('short_circuited')
+            raise
+        self._count('calls')
+        attempt = 0
+        settled = False  # Whether the breaker has been told how the upstream did
+        try:
+            while True:
+                try:
+                    waited = self.bucket.acquire()
+                except RateLimitExceeded:
+                    self._count('rate_limit_rejections')
+                    raise
+                if waited:
+                    self._count('throttled')
+                    self._count('throttle_wait_seconds', waited)
+                try:
+                    result = fn()
+                except Exception as e:
+                    retryable, retry_after = self._classify(e)
+                    if not retryable:
+                        # The upstream answered; the request itself was bad
+                        settled = True
+                        self.breaker.record_success()
+                        raise
+                    if retry_after is not None and retry_after > self.max_delay:
+                        # Asked to stay away longer than a request should wait
+                        self._count('failures')
+                        settled = True
+                        self.breaker.record_failure(open_for=retry_after)
+                        raise
+                    if attempt >= self.max_retries or self.breaker.is_open():
+                        self._count('failures')
+                        settled = True
+                        self.breaker.record_failure()
+                        raise
+                    delay = self.backoff(attempt, retry_after)
+                    log.info("Retrying upstream call", extra={'attempt': attempt + 1, 'delay_s': round(delay, 3),
+                                                              'error': str(e)})
+                    self._count('retries')
+                    attempt += 1
+                    time.sleep(delay)
+                    continue
+                settled = True
+                self.breaker.record_success()
+                return result
+        finally:
+            if not settled:
+                # Refused by the rate limit or interrupted: if this was the half-open trial, the
+                # breaker would otherwise wait for its outcome forever
+                self.breaker.release_trial()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats['throttle_wait_seconds'] = round(stats['throttle_wait_seconds'], 3)
+        stats['circuit_state'] = self.breaker.state()
+        stats['circuit_opened'] = self.breaker.opened
+        return stats
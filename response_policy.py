@@ -0,0 +1,139 @@
+"""Cache directives, ETags and compression for every response.
+
+Each view declares how its successful responses may be cached with the
+cache_control() decorator; views that don't, and error responses from any
+view, get ``default`` (no-store, since most responses here belong to one
+student's attempt).  With ``etag=True`` a successful GET gets a strong
+ETag, from the view if it set one (see bank_etag()) or else from a hash of
+the body, and a request whose If-None-Match matches it gets an empty 304
+instead.
+
+Text responses (HTML, JSON, CSS, JS, plain text) of at least ``min_size``
+bytes are compressed with brotli when the client accepts it and the
+``brotli`` package is installed, else with gzip.  Compression is
+deterministic, and the ETag of a compressed representation carries the
+encoding as a suffix, so tags stay strong per representation.
+"""
+import gzip
+import hashlib
+import threading
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # Optional; gzip is always available
+    brotli = None
+
+COMPRESSIBLE_TYPES = frozenset({'text/html', 'text/plain', 'text/css', 'text/javascript',
+                                'application/json', 'application/javascript', 'image/svg+xml'})
+ENCODING_SUFFIXES = {'br': '-br', 'gzip': '-gz'}
+
+
+def cache_control(directive, etag=False):
+    """Declare a view's Cache-Control directive and whether it gets an ETag."""
+    def decorator(view):
+        view.cache_control = directive
+        view.etag = etag
+        return view
+    return decorator
+
+
+def bank_etag(version, *parts):
+    """ETag for content fully determined by a bank version and the given request parts."""
+    digest = hashlib.sha1(repr((version,) + parts).encode('utf-8')).hexdigest()[:20]
+    return f'{version}-{digest}'
+
+
+def not_modified(etag):
+    """True if the request's If-None-Match matches etag in any encoding."""
+    if_none_match = request.if_none_match
+    if not if_none_match:
+        return False
+    return any(if_none_match.contains_weak(etag + suffix) for suffix in ('',) + tuple(ENCODING_SUFFIXES.values()))
+
+
+class ResponsePolicy:
+    def __init__(self, app, default='no-store', min_size=1024, gzip_level=6, brotli_quality=5):
+        self.app = app
+        self.default = default
+        self.min_size = min_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self._lock = threading.Lock()
+        self._stats = {'not_modified': 0, 'compressed': 0, 'bytes_before': 0, 'bytes_after': 0}
+        app.after_request(self.apply)
+
+    def _view(self):
+        return self.app.view_functions.get(request.endpoint) if request.endpoint else None
+
+    def apply(self, response):
+        view = self._view()
+        if 'Cache-Control' not in response.headers:
+            # Errors (a missing sheet, a 503 asking for a retry) must never be cached
+            cacheable = 200 <= response.status_code < 300 or response.status_code == 304
+            response.headers['Cache-Control'] = (cacheable and getattr(view, 'cache_control', None)) or self.default
+        if (getattr(view, 'etag', False) and request.method in ('GET', 'HEAD') and response.status_code == 200
+                and not response.is_streamed and not response.direct_passthrough):
+            etag, _ = response.get_etag()
+            if etag is None:
+                etag = hashlib.sha1(response.get_data()).hexdigest()[:20]
+                response.set_etag(etag)
+            if not_modified(etag):
+                return self._not_modified(response)
+        return self._compress(response)
+
+    def _not_modified(self, response):
+        # The 304 carries the tag of the representation a 200 would have sent
+        encoding = self._encoding(response)
+        if encoding is not None:
+            etag, weak = response.get_etag()
+            response.set_etag(etag + ENCODING_SUFFIXES[encoding], weak)
+        response.status_code = 304
+        response.set_data(b'')
+        for header in ('Content-Type', 'Content-Length'):
+            response.headers.pop(header, None)
+        self._count('not_modified')
+        return response
+
+    def _compressible(self, response):
+        return (response.mimetype in COMPRESSIBLE_TYPES and not response.is_streamed
+                and not response.direct_passthrough and 'Content-Encoding' not in response.headers
+                and 200 <= response.status_code < 300 and response.status_code != 204)
+
+    def _encoding(self, response):
+        """The encoding to send response in, or None to send it as is."""
+        if not self._compressible(response) or response.calculate_content_length() < self.min_size:
+            return None
+        offered = ['br', 'gzip'] if brotli is not None else ['gzip']
+        return request.accept_encodings.best_match(offered)
+
+    def _compress(self, response):
+        if not self._compressible(response):
+            return response
+        response.vary.add('Accept-Encoding')
+        encoding = self._encoding(response)
+        if encoding is None:
+            return response
+        data = response.get_data()
+        if encoding == 'br':
+            compressed = brotli.compress(data, quality=self.brotli_quality)
+        else:
+            compressed = gzip.compress(data, compresslevel=self.gzip_level, mtime=0)
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+        etag, weak = response.get_etag()
+        if etag is not None:
+            response.set_etag(etag + ENCODING_SUFFIXES[encoding], weak)
+        self._count('compressed')
+        self._count('bytes_before', len(data))
+        self._count('bytes_after', len(compressed))
+        return response
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._stats[name] += amount
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
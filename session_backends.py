@@ -0,0 +1,354 @@
+"""Session storage backends.
+
+Each backend is a cachelib cache, so Flask-Session can use it through its
+``cachelib`` session type.  Values are pickled, as cachelib's own backends do.
+
+- ``memory``: per-process LRU dictionary; fastest, but sessions are neither
+  shared between workers nor kept across restarts.
+- ``sqlite``: one WAL-mode database file shared by every worker on the host.
+- ``redis``: any server speaking the Redis protocol, for workers spread over
+  several hosts or serverless instances.  It only needs the standard library.
+
+The memory and SQLite backends have no native expiry, so a daemon thread
+sweeps expired sessions out of them periodically.
+"""
+import logging
+import pickle
+import socket
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import unquote, urlparse
+
+from cachelib.base import BaseCache
+
+SESSION_BACKENDS = ('memory', 'sqlite', 'redis', 'filesystem')
+
+log = logging.getLogger('quizmaker.sessions')
+
+
+def _expires_at(timeout):
+    # cachelib convention: a timeout of 0 means the entry never expires
+    return time.time() + timeout if timeout > 0 else 0
+
+
+def _expired(expires, now=None):
+    return expires and expires <= (now or time.time())
+
+
+class MemoryLRUCache(BaseCache):
+    def __init__(self, max_entries=10000, default_timeout=300):
+        super().__init__(default_timeout)
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if _expired(expires):
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+        return pickle.loads(value)
+
+    def set(self, key, value, timeout=None):
+        item = (_expires_at(self._normalize_timeout(timeout)), pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+        with self._lock:
+            self._data[key] = item
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+        return True
+
+    def add(self, key, value, timeout=None):
+        if self.has(key):
+            return False
+        return self.set(key, value, timeout)
+
+    def delete(self, key):
+        with self._lock:
+            return self._data.pop(key, None) is not None
+
+    def has(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            return item is not None and not _expired(item[0])
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+        return True
+
+    def sweep(self):
+        """Remove expired entries; returns how many were removed."""
+        now = time.time()
+        with self._lock:
+            expired = [key for key, (expires, _) in self._data.items() if _expired(expires, now)]
+            for key in expired:
+                del self._data[key]
+        return len(expired)
+
+
+class SQLiteCache(BaseCache):
+    def __init__(self, path, default_timeout=300):
+        super().__init__(default_timeout)
+        self.path = path
+        self._local = threading.local()
+        conn = sqlite3.connect(path, timeout=10, isolation_level=None)
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('CREATE TABLE IF NOT EXISTS sessions '
+                         '(key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL NOT NULL)')
+            conn.execute('CREATE INDEX IF NOT EXISTS sessions_expires ON sessions (expires)')
+        finally:
+            conn.close()
+
+    def _conn(self):
+        # sqlite3 connections must not be shared between threads
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        row = self._conn().execute('SELECT value, expires FROM sessions WHERE key = ?', (key,)).fetchone()
+        if row is None or _expired(row[1]):
+            return None
+        return pickle.loads(row[0])
+
+    def set(self, key, value, timeout=None):
+        self._conn().execute(
+            'INSERT OR REPLACE INTO sessions (key, value, expires) VALUES (?, ?, ?)',
+            (key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), _expires_at(self._normalize_timeout(timeout))))
+        return True
+
+    def add(self, key, value, timeout=None):
+        if self.has(key):
+            return False
+        return self.set(key, value, timeout)
+
+    def delete(self, key):
+        return self._conn().execute('DELETE FROM sessions WHERE key = ?', (key,)).rowcount > 0
+
+    def has(self, key):
+        row = self._conn().execute('SELECT expires FROM sessions WHERE key = ?', (key,)).fetchone()
+        return row is not None and not _expired(row[0])
+
+    def clear(self):
+        self._conn().execute('DELETE FROM sessions')
+        return True
+
+    def sweep(self):
+        """Remove expired entries; returns how many were removed."""
+        return self._conn().execute(
+            'DELETE FROM sessions WHERE expires > 0 AND expires <= ?', (time.time(),)).rowcount
+
+
+class RedisError(Exception):
+    """The server answered a command with an error reply."""
+
+
+class RedisProtocolError(RedisError):
+    """The server sent something that is not a valid reply; the connection is out of step."""
+
+
+class _RedisConnection:
+    def __init__(self, host, port, timeout):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.reader = self.sock.makefile('rb')
+
+    def command(self, *args):
+        parts = [b'*%d\r\n' % len(args)]
+        for arg in args:
+            if isinstance(arg, str):
+                arg = arg.encode('utf-8')
+            elif isinstance(arg, int):
+                arg = str(arg).encode('ascii')
+            parts.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+        self.sock.sendall(b''.join(parts))
+        return self._read_reply()
+
+    def _read_reply(self, nested=False):
+        line = self.reader.readline()
+        if not line.endswith(b'\r\n'):
+            raise ConnectionError('Connection closed by server')
+        kind, payload = line[:1], line[1:-2]
+        try:
+            if kind == b'+':
+                return payload
+            if kind == b'-':
+                error = RedisError(payload.decode('utf-8', 'replace'))
+                if nested:  # Raising now would leave the rest of the array unread
+                    return error
+                raise error
+            if kind == b':':
+                return int(payload)
+            if kind == b'$':
+                length = int(payload)
+                if length < 0:
+                    return None
+                data = self.reader.read(length + 2)
+                if len(data) < length + 2:
+                    raise ConnectionError('Connection closed by server')
+                return data[:-2]
+            if kind == b'*':
+                length = int(payload)
+                if length < 0:
+                    return None
+                return [self._read_reply(nested=True) for _ in range(length)]
+        except ValueError:
+            pass
+        raise RedisProtocolError(f'Unexpected reply {line!r}')
+
+    def close(self):
+        try:
+            self.reader.close()
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class RedisProtocolCache(BaseCache):
+    """Minimal Redis-protocol client with a small connection pool."""
+
+    def __init__(self, url='redis://localhost:6379/0', default_timeout=300, pool_size=8, socket_timeout=5):
+        super().__init__(default_timeout)
+        parsed = urlparse(url)
+        self.host = parsed.hostname or 'localhost'
+        self.port = parsed.port or 6379
+        self.password = unquote(parsed.password) if parsed.password else None
+        self.db = int(parsed.path.lstrip('/') or 0)
+        self.pool_size = pool_size
+        self.socket_timeout = socket_timeout
+        self._pool = []
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        conn = _RedisConnection(self.host, self.port, self.socket_timeout)
+        try:
+            if self.password:
+                conn.command('AUTH', self.password)
+            if self.db:
+                conn.command('SELECT', self.db)
+        except BaseException:
+            conn.close()
+            raise
+        return conn
+
+    def _release(self, conn):
+        with self._lock:
+            if len(self._pool) < self.pool_size:
+                self._pool.append(conn)
+                return
+        conn.close()
+
+    def _run(self, conn, args):
+        """Run one command on conn, then return conn to the pool or close it."""
+        try:
+            reply = conn.command(*args)
+        except RedisProtocolError:
+            conn.close()
+            raise
+        except RedisError:
+            # An error reply is read in full, so the connection can still be used
+            self._release(conn)
+            raise
+        except BaseException:
+            conn.close()
+            raise
+        self._release(conn)
+        return reply
+
+    def _execute(self, *args):
+        with self._lock:
+            conn = self._pool.pop() if self._pool else None
+        if conn is not None:
+            try:
+                return self._run(conn, args)
+            except (OSError, ConnectionError):
+                # The server may have closed an idle pooled connection (restart, timeout);
+                # retry once on a fresh one before giving up
+                pass
+        return self._run(self._connect(), args)
+
+    def get(self, key):
+        value = self._execute('GET', key)
+        return pickle.loads(value) if value is not None else None
+
+    def _set(self, key, value, timeout, *flags):
+        timeout = self._normalize_timeout(timeout)
+        args = ['SET', key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL)]
+        if timeout > 0:
+            args += ['EX', timeout]
+        return self._execute(*args, *flags) is not None
+
+    def set(self, key, value, timeout=None):
+        return self._set(key, value, timeout)
+
+    def add(self, key, value, timeout=None):
+        return self._set(key, value, timeout, 'NX')
+
+    def delete(self, key):
+        return self._execute('DEL', key) > 0
+
+    def has(self, key):
+        return self._execute('EXISTS', key) > 0
+
+    def ping(self):
+        return self._execute('PING') == b'PONG'
+
+
+def _sweep_forever(cache, interval):
+    while True:
+        time.sleep(interval)
+        try:
+            removed = cache.sweep()
+            if removed:
+                log.info("Swept expired sessions", extra={'removed': removed})
+        except Exception:
+            log.exception("Session sweep failed")
+
+
+def create_session_cache(config):
+    """Build the cachelib backend named by SESSION_BACKEND and start its sweeper."""
+    backend = config['SESSION_BACKEND']
+    timeout = int(config['PERMANENT_SESSION_LIFETIME'].total_seconds())
+    if backend == 'memory':
+        cache = MemoryLRUCache(max_entries=config['SESSION_MEMORY_MAX_ENTRIES'], default_timeout=timeout)
+    elif backend == 'sqlite':
+        cache = SQLiteCache(config['SESSION_SQLITE_PATH'], default_timeout=timeout)
+    elif backend == 'redis':
+        return RedisProtocolCache(config['SESSION_REDIS_URL'], default_timeout=timeout)
+    else:
+        raise ValueError(f"Unknown SESSION_BACKEND: {backend} (expected one of {', '.join(SESSION_BACKENDS)})")
+
+    threading.Thread(target=_sweep_forever, args=(cache, config['SESSION_SWEEP_INTERVAL']),
+                     name='session-sweeper', daemon=True).start()
+    return cache
+
+
+class TimedSessionInterface:
+    """Wrap a Flask session interface to time session loads and saves."""
+
+    def __init__(self, inner, histogram):
+        self._inner = inner
+        self._histogram = histogram
+
+    def open_session(self, app, request):
+        with self._histogram.time(operation='load'):
+            return self._inner.open_session(app, request)
+
+    def save_session(self, app, session, response):
+        with self._histogram.time(operation='save'):
+            return self._inner.save_session(app, session, response)
+
+    def __getattr__(self, name):
+        return getattr(self._inner, name)
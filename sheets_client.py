@@ -0,0 +1,208 @@
+"""Process-wide Google Sheets client.
+
+The service account credentials are parsed once per process and their access
+token is refreshed a few minutes before it expires, so no request ever pays for
+a token fetch.  httplib2 connections are not thread-safe, so every worker
+thread keeps its own service object on top of its own persistent connection.
+Services are built from a static discovery document, never fetched: the one
+bundled with googleapiclient, or the file named by SHEETS_DISCOVERY_DOCUMENT.
+
+The Google client libraries take a few hundred milliseconds to import, so
+they are imported on first use rather than with this module; requests that
+never touch Sheets never load them.
+
+Every API call goes through execute(), which applies the request rate limit,
+retries and circuit breaker from resilience.UpstreamGuard.  Throttling (429)
+and server errors are retried; the SHEETS_* environment variables below
+tune the limits.
+"""
+import json
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+
+from resilience import CircuitBreaker, TokenBucket, UpstreamGuard, parse_retry_after
+
+SCOPES = ['https://www.googleapis.com/auth/spreadsheets.readonly']
+RETRYABLE_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+def _env_float(name, default):
+    return float(os.environ.get(name, default))
+
+
+def classify_error(error):
+    """(retryable, retry_after) for an exception raised by a Sheets API call."""
+    import httplib2
+    from google.auth import exceptions as google_auth_exceptions
+    from googleapiclient.errors import HttpError
+
+    if isinstance(error, HttpError):
+        status = getattr(error.resp, 'status', None)
+        return status in RETRYABLE_STATUSES, parse_retry_after(error.resp.get('retry-after'))
+    # Connection resets, timeouts and failed token fetches
+    if isinstance(error, (OSError, httplib2.HttpLib2Error, google_auth_exceptions.TransportError)):
+        return True, None
+    return False, None
+
+
+def guard_from_env():
+    """UpstreamGuard configured from the SHEETS_* environment variables.
+
+    The limits are per process: keep workers x SHEETS_RATE_LIMIT under the
+    project's read quota.
+    """
+    return UpstreamGuard(
+        classify_error,
+        bucket=TokenBucket(_env_float('SHEETS_RATE_LIMIT', 1.0),
+                           burst=_env_float('SHEETS_RATE_BURST', 20),
+                           max_wait=_env_float('SHEETS_RATE_MAX_WAIT', 10.0)),
+        breaker=CircuitBreaker(int(os.environ.get('SHEETS_BREAKER_THRESHOLD', 5)),
+                               reset_timeout=_env_float('SHEETS_BREAKER_RESET', 30.0)),
+        max_retries=int(os.environ.get('SHEETS_MAX_RETRIES', 3)),
+        base_delay=_env_float('SHEETS_RETRY_BASE_DELAY', 0.5),
+        max_delay=_env_float('SHEETS_RETRY_MAX_DELAY', 8.0),
+    )
+
+
+def _utcnow():
+    # google-auth keeps credential expiry as a naive UTC datetime
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class SheetsClient:
+    """Thread-safe access to a shared, pre-authorized Sheets service."""
+
+    def __init__(self, credentials_json=None, scopes=None, refresh_margin=300, timeout=30, api_endpoint=None,
+                 guard=None, discovery_document=None):
+        self._credentials_json = credentials_json
+        self.guard = guard or guard_from_env()
+        # Alternative API root, e.g. a local stand-in for benchmarks
+        self._api_endpoint = api_endpoint or os.environ.get('SHEETS_API_ENDPOINT')
+        self._discovery_path = discovery_document or os.environ.get('SHEETS_DISCOVERY_DOCUMENT')
+        self._discovery_document = None
+        self._scopes = scopes or SCOPES
+        self._refresh_margin = timedelta(seconds=refresh_margin)
+        self._timeout = timeout
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._credentials = None
+        self._generation = 0
+        self._token_request = None
+        self._stats = {
+            'credential_builds': 0,
+            'token_refreshes': 0,
+            'service_builds': 0,
+            'service_reuses': 0,
+        }
+
+    def _load_credentials(self):
+        from google.oauth2 import service_account
+
+        google_creds = self._credentials_json or os.environ.get('GOOGLE_CREDENTIALS')
+        if not google_creds:
+            raise ValueError("No credentials found")
+        creds_dict = json.loads(google_creds)
+        return service_account.Credentials.from_service_account_info(creds_dict, scopes=self._scopes)
+
+    def _token_expiring(self, creds):
+        if not creds.token or creds.expiry is None:
+            return True
+        return creds.expiry - _utcnow() < self._refresh_margin
+
+    def credentials(self):
+        """Return the shared credentials, refreshing the token ahead of expiry."""
+        with self._lock:
+            if self._credentials is None:
+                self._credentials = self._load_credentials()
+                self._generation += 1
+                self._stats['credential_builds'] += 1
+            creds = self._credentials
+            if self._token_expiring(creds):
+                if self._token_request is None:
+                    import requests
+                    from google.auth.transport import requests as google_requests
+                    self._token_request = google_requests.Request(session=requests.Session())
+                creds.refresh(self._token_request)
+                self._stats['token_refreshes'] += 1
+            return creds
+
+    def service(self):
+        """Return this thread's Sheets service, building it on first use."""
+        creds = self.credentials()
+        local = self._local
+        if getattr(local, 'generation', None) == self._generation:
+            with self._lock:
+                self._stats['service_reuses'] += 1
+            return local.service
+
+        import google_auth_httplib2
+        import httplib2
+        from googleapiclient.discovery import build, build_from_document
+
+        http = google_auth_httplib2.AuthorizedHttp(creds, http=httplib2.Http(timeout=self._timeout))
+        client_options = {'api_endpoint': self._api_endpoint} if self._api_endpoint else None
+        if self._discovery_path:
+            local.service = build_from_document(self._discovery(), http=http, client_options=client_options)
+        else:
+            local.service = build('sheets', 'v4', http=http, cache_discovery=False, static_discovery=True,
+                                  client_options=client_options)
+        # Every spreadsheets() call generates the resource's methods and their docstrings
+        # from the discovery schema (tens of milliseconds), so each thread does it once
+        local.spreadsheets = local.service.spreadsheets()
+        local.generation = self._generation
+        with self._lock:
+            self._stats['service_builds'] += 1
+        return local.service
+
+    def _discovery(self):
+        # Read once; build_from_document accepts the parsed document
+        if self._discovery_document is None:
+            with open(self._discovery_path, encoding='utf-8') as f:
+                self._discovery_document = json.load(f)
+        return self._discovery_document
+
+    def spreadsheets(self):
+        """Return this thread's spreadsheets() resource."""
+        self.service()
+        return self._local.spreadsheets
+
+    def execute(self, build_request):
+        """Run build_request(spreadsheets()).execute() under the rate limit, retries and breaker.
+
+        The request is rebuilt for every attempt so a retry after a token
+        refresh or credential reset uses the current service.
+        """
+        return self.guard.call(lambda: build_request(self.spreadsheets()).execute())
+
+    def reset(self):
+        """Drop the cached credentials; every thread rebuilds its service on next use."""
+        with self._lock:
+            self._credentials = None
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            creds = self._credentials
+        stats['token_expiry'] = creds.expiry.isoformat() + 'Z' if creds and creds.expiry else None
+        stats.update(self.guard.stats())
+        return stats
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Return the process-wide SheetsClient."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = SheetsClient()
+    return _client
+
+
+def peek_client():
+    """Return the process-wide SheetsClient if one has been created, else None."""
+    return _client
@@ -0,0 +1,69 @@
+"""Deterministic, per-attempt shuffling.
+
+An attempt is identified by a seed.  Question order is a Fisher-Yates
+shuffle of the bank's indexes driven by ``random.Random(seed)``, so every
+ordering is equally likely and the first N positions are a uniform sample
+of N questions.  Shuffled orders are cached per (seed, bank size), so the
+requests of an attempt look up a position in O(1).  Answer order for a
+position comes from its own ``random.Random`` seeded with the attempt seed
+and that position.  Nothing touches the global ``random`` state, so
+attempts are thread-safe and can be rebuilt exactly from ``(seed, bank)``
+for resume and audit.
+"""
+import functools
+import random
+import secrets
+from array import array
+
+PERMUTATION_CACHE_SIZE = 512  # Orders of concurrent attempts; 4 bytes per question each
+
+
+def new_seed():
+    return secrets.randbits(63)
+
+
+@functools.lru_cache(maxsize=PERMUTATION_CACHE_SIZE)
+def _shuffled(n, seed):
+    order = list(range(n))
+    random.Random(seed).shuffle(order)
+    return array('I', order)
+
+
+class Permutation:
+    """Seeded uniform permutation of range(n)."""
+
+    def __init__(self, n, seed):
+        self.n = n
+        self._order = _shuffled(n, seed)
+
+    def __len__(self):
+        return self.n
+
+    def __getitem__(self, index):
+        if not 0 <= index < self.n:
+            raise IndexError('permutation index out of range')
+        return self._order[index]
+
+    def __iter__(self):
+        return iter(self._order)
+
+
+class AttemptOrder:
+    """Question and answer order of one attempt over a bank of `count` questions."""
+
+    def __init__(self, seed, count):
+        self.seed = seed
+        self.count = count
+        self._questions = Permutation(count, seed)
+
+    def question_index(self, position):
+        """Bank index of the question shown at position (0-based)."""
+        return self._questions[position]
+
+    def answer_order(self, position, answer_count):
+        order = list(range(answer_count))
+        random.Random(f'{self.seed}:{position}').shuffle(order)
+        return order
+
+    def arrange_answers(self, position, answers):
+        return [answers[i] for i in self.answer_order(position, len(answers))]
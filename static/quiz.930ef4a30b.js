@@ -0,0 +1,270 @@
+let wrongAnswers=[];
+let currentScore=0;
+let isProcessingAnswer=false;
+const PREFETCH_COUNT=1;
+let questionQueue=[];
+let finalResult=null;
+const offlineAttempt={quiz:null,position:0,answers:[],results:[]};
+const offlineReady=OFFLINE?decodeOfflinePayload():Promise.resolve();
+async function decodeOfflinePayload(){
+const encoded=document.getElementById('offline-payload').textContent.trim();
+const bytes=Uint8Array.from(atob(encoded),c=>c.charCodeAt(0));
+const stream=new Blob([bytes]).stream().pipeThrough(new DecompressionStream('gzip'));
+offlineAttempt.quiz=JSON.parse(await new Response(stream).text());
+}
+async function answerHash(position,answer){
+const text=`${offlineAttempt.quiz.salt}:${position}:${answer}`;
+const digest=await crypto.subtle.digest('SHA-256',new TextEncoder().encode(text));
+return Array.from(new Uint8Array(digest),b=>b.toString(16).padStart(2,'0')).join('');
+}
+async function gradeOffline(answer){
+await offlineReady;
+const position=offlineAttempt.position;
+const item=offlineAttempt.quiz.questions[position];
+let correctAnswer=null;
+for(const option of item.a){
+if(await answerHash(position,option)===item.h){
+correctAnswer=option;
+break;
+}
+}
+const correct=correctAnswer!==null&&answer.trim()===correctAnswer;
+offlineAttempt.answers[position]=answer;
+offlineAttempt.results[position]=correct;
+const score=offlineAttempt.results.filter(Boolean).length;
+const data={correct:correct,correct_answer:correctAnswer,score:score};
+if(!correct){
+data.wrong_answer={question:item.q,yourAnswer:answer,correctAnswer:correctAnswer};
+}
+const next=offlineAttempt.quiz.questions[position+1];
+if(next){
+offlineAttempt.position++;
+data.complete=false;
+data.next=[{
+question:next.q,
+answers:next.a,
+current:position+2,
+total:offlineAttempt.quiz.questions.length
+}];
+return data;
+}
+let response;
+try{
+response=await fetch('/submit_offline',{
+method:'POST',
+headers:{
+'Content-Type':'application/json',
+},
+body:JSON.stringify({
+token:ATTEMPT_TOKEN,
+answers:offlineAttempt.answers,
+score:score
+})
+});
+}catch(error){
+throw new Error('Could not submit your answers. Check your connection and answer the last question again.');
+}
+const result=await response.json();
+if(result.error){
+throw new Error(result.error);
+}
+offlineAttempt.position++;
+return Object.assign(data,result);
+}
+function gradeOnline(answer){
+return fetch('/answer_and_next',{
+method:'POST',
+headers:{
+'Content-Type':'application/json',
+},
+body:JSON.stringify({answer:answer,prefetch:PREFETCH_COUNT})
+})
+.then(response=>response.json());
+}
+function escapeHtml(text){
+const div=document.createElement('div');
+div.textContent=text;
+return div.innerHTML;
+}
+function submitAnswer(answer){
+if(isProcessingAnswer)return;
+isProcessingAnswer=true;
+const buttons=document.querySelectorAll('.answers button');
+buttons.forEach(btn=>btn.disabled=true);
+(OFFLINE?gradeOffline(answer):gradeOnline(answer))
+.then(data=>{
+if(data.error){
+throw new Error(data.error);
+}
+questionQueue=data.next||[];
+finalResult=data.complete?data:null;
+const feedbackBox=document.getElementById('feedback-box');
+const feedbackMessage=document.getElementById('feedback-message');
+feedbackBox.classList.remove('correct','incorrect');
+if(data.correct){
+feedbackBox.classList.add('correct');
+feedbackMessage.innerHTML='Correct!';
+}else{
+feedbackBox.classList.add('incorrect');
+feedbackMessage.innerHTML=`
+                Incorrect.<br>
+                <span class="correct-answer-text">The correct answer was: ${escapeHtml(data.correct_answer)}</span>
+            `;
+}
+feedbackBox.style.display='block';
+if(data.wrong_answer){
+wrongAnswers.push(data.wrong_answer);
+}
+updateWrongAnswersSection();
+const buttons=document.querySelectorAll('.answers button');
+buttons.forEach(button=>{
+button.disabled=true;
+if(button.textContent.trim()===answer.trim()){
+button.classList.add(data.correct?'correct':'incorrect');
+}
+if(!data.correct&&button.textContent.trim()===data.correct_answer.trim()){
+button.classList.add('correct');
+}
+});
+currentScore=data.score;
+document.querySelector('#current-score span').textContent=currentScore;
+const progress=(document.querySelector('.question-number').textContent.split(' ')[1]/ totalQuestions)*100;
+document.querySelector('.progress-bar').style.width=`${progress}%`;
+})
+.catch(error=>{
+console.error('Error:',error);
+showError(error.message||'Failed to submit answer');
+buttons.forEach(btn=>btn.disabled=false);
+})
+.finally(()=>{
+isProcessingAnswer=false;
+});
+}
+function loadNextQuestion(){
+document.getElementById('feedback-box').style.display='none';
+document.querySelector('.error')?.remove();
+if(finalResult){
+showFinalScore(finalResult);
+return;
+}
+if(questionQueue.length>0){
+displayQuestion(questionQueue.shift());
+return;
+}
+fetch('/get_question',{
+method:'POST',
+headers:{
+'Content-Type':'application/json',
+}
+})
+.then(response=>{
+if(!response.ok){
+throw new Error('Failed to load next question');
+}
+return response.json();
+})
+.then(data=>{
+if(data.error){
+throw new Error(data.error);
+}
+if(data.complete){
+showFinalScore(data);
+}else{
+displayQuestion(data);
+}
+})
+.catch(error=>{
+console.error('Error:',error);
+showError(error.message||'Failed to load next question');
+});
+}
+function displayQuestion(data){
+document.querySelector('.question-number').textContent=
+`Question ${data.current} of ${data.total}`;
+document.getElementById('question-text').textContent=data.question;
+const answersDiv=document.querySelector('.answers');
+answersDiv.innerHTML='';
+data.answers.forEach(answer=>{
+const button=document.createElement('button');
+button.textContent=answer;
+button.onclick=()=>submitAnswer(answer);
+answersDiv.appendChild(button);
+});
+const progress=(data.current / data.total)*100;
+document.querySelector('.progress-bar').style.width=`${progress}%`;
+}
+async function loadAllWrongAnswers(count){
+const review=[];
+for(let page=1;review.length<count;page++){
+const response=await fetch(`/results?page=${page}&per_page=100`);
+const data=await response.json();
+if(data.error||data.wrong_answers.length===0)break;
+review.push(...data.wrong_answers);
+}
+return review;
+}
+async function showFinalScore(data){
+const container=document.querySelector('.question-section');
+container.innerHTML=`
+        <div id="score-container">
+            <h2>Quiz Complete!</h2>
+            <div id="final-score">${data.percentage}%</div>
+            <p>You got ${data.score} out of ${data.total} questions correct.</p>
+            ${data.wrong_count>0?`
+                <button id="wrong-answers-btn" onclick="toggleWrongAnswers()">
+                    Show Wrong Answers (${data.wrong_count})
+                </button>
+            `:''}
+        </div>
+    `;
+document.querySelector('.progress-bar').style.width='100%';
+if(wrongAnswers.length<data.wrong_count){
+try{
+wrongAnswers=await loadAllWrongAnswers(data.wrong_count);
+}catch(error){
+console.error('Error loading results:',error);
+}
+}
+updateWrongAnswersSection();
+}
+function updateWrongAnswersSection(){
+const btn=document.getElementById('wrong-answers-btn');
+if(wrongAnswers&&wrongAnswers.length>0){
+btn.style.display='block';
+btn.textContent=document.getElementById('wrong-answers').style.display==='none'?
+`Show Past Wrong Answers (${wrongAnswers.length})`:'Hide Past Wrong Answers';
+}else{
+btn.style.display='none';
+}
+}
+function toggleWrongAnswers(){
+const container=document.getElementById('wrong-answers');
+const btn=document.getElementById('wrong-answers-btn');
+if(container.style.display==='none'){
+if(wrongAnswers.length===0){
+container.innerHTML='<p>No wrong answers yet!</p>';
+}else{
+container.innerHTML=wrongAnswers.map((item,index)=>`
+                <div class="wrong-answer-item">
+                    <div class="question">${index+1}. ${item.question}</div>
+                    <div class="your-answer">Your answer: ${item.yourAnswer}</div>
+                    <div class="correct-answer">Correct answer: ${item.correctAnswer}</div>
+                </div>
+            `).join('');
+}
+container.style.display='block';
+btn.textContent='Hide Past Wrong Answers';
+}else{
+container.style.display='none';
+btn.textContent=`Show Past Wrong Answers (${wrongAnswers.length})`;
+}
+}
+function showError(message){
+const container=document.querySelector('.container');
+const errorDiv=document.createElement('div');
+errorDiv.className='error';
+errorDiv.textContent=message;
+container.insertBefore(errorDiv,container.firstChild);
+errorDiv.scrollIntoView({behavior:'smooth',block:'start'});
+}
+updateWrongAnswersSection();
@@ -0,0 +1,68 @@
+"""Link the fingerprinted files that build_assets.py writes to static/.
+
+StaticAssets hooks into url_for, so templates keep asking for the source name
+(``url_for('static', filename='quiz.js')``) and get the current build
+(``/static/quiz.<hash>.js``).  Names missing from the manifest, or every
+name when there is no manifest, are linked unchanged.
+
+Source names were once served from static/ directly (``/static/style.css``),
+so a request for one is redirected to its current build rather than failing
+with a 404.  The redirect itself is not cached, since the target changes with
+every build.
+
+Fingerprinted files never change, so when Flask serves them itself (rather
+than the platform, see vercel.json) they are sent as ``immutable`` for a year.
+"""
+import json
+import logging
+import os
+
+from flask import redirect, request, url_for
+
+log = logging.getLogger('quizmaker.static_assets')
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+
+class StaticAssets:
+    def __init__(self, app, manifest_path=None):
+        self.app = app
+        self.manifest_path = manifest_path or os.path.join(app.static_folder, 'manifest.json')
+        self.manifest = self._load()
+        self._built = frozenset(self.manifest.values())
+        app.url_defaults(self._fingerprint)
+        app.before_request(self._redirect_source)
+        app.after_request(self._cache_built)
+
+    def _load(self):
+        try:
+            with open(self.manifest_path, encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            log.warning("No static asset manifest; run build_assets.py", extra={'path': self.manifest_path})
+        except (OSError, ValueError) as e:
+            log.warning("Ignoring static asset manifest: %s", e, extra={'path': self.manifest_path})
+        return {}
+
+    def url(self, filename):
+        """The fingerprinted name for a source asset, or filename itself if it wasn't built."""
+        return self.manifest.get(filename, filename)
+
+    def _fingerprint(self, endpoint, values):
+        if endpoint == 'static' and 'filename' in values:
+            values['filename'] = self.url(values['filename'])
+
+    def _redirect_source(self):
+        if request.endpoint != 'static':
+            return None
+        filename = (request.view_args or {}).get('filename')
+        if filename not in self.manifest or os.path.isfile(os.path.join(self.app.static_folder, filename)):
+            return None
+        response = redirect(url_for('static', filename=filename))
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+
+    def _cache_built(self, response):
+        if request.endpoint == 'static' and (request.view_args or {}).get('filename') in self._built:
+            response.headers['Cache-Control'] = IMMUTABLE
+        return response
@@ -0,0 +1,76 @@
+import csv
+import os
+import sys
+
+import pytest
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# The app's modules live at the top of the repo; the stand-ins for Sheets and Redis live in bench/
+sys.path[:0] = [REPO, os.path.join(REPO, 'bench')]
+
+from fake_sheets import FakeSheets, serve  # noqa: E402
+
+
+@pytest.fixture
+def sheets():
+    """A FakeSheets stand-in served on a free port; its base URL is in .url."""
+    sheets = FakeSheets(questions=5)
+    server = serve(sheets)
+    sheets.url = f'http://127.0.0.1:{server.server_address[1]}/'
+    yield sheets
+    server.shutdown()
+
+
+QUIZ_ROWS = [
+    ['Section', 'Question', 'Correct', 'Wrong 1', 'Wrong 2', 'Wrong 3'],
+    ['', '', '', '', '', ''],
+    ['Cells', 'Powerhouse of the cell?', 'Mitochondria', 'Nucleus', 'Ribosome', 'Golgi'],
+    ['Cells', 'Holds the DNA?', 'Nucleus', 'Mitochondria', 'Vacuole', 'Membrane'],
+    ['Cells', 'Makes proteins?', 'Ribosome', 'Lysosome', 'Nucleus', 'Vacuole'],
+    ['Genetics', 'Unit of heredity?', 'Gene', 'Cell', 'Atom', 'Organ'],
+    ['Genetics', 'Shape of DNA?', 'Double helix', 'Single strand', 'Circle', 'Square'],
+    ['Genetics', 'DNA base paired with adenine?', 'Thymine', 'Guanine', 'Cytosine', 'Uracil'],
+]
+
+
+@pytest.fixture(scope='session')
+def quiz_app(tmp_path_factory):
+    """The app module, configured with local CSV banks (csv:biology, tabs Unit1 and Unit2) and no network."""
+    root = tmp_path_factory.mktemp('app')
+    bank_dir = root / 'banks' / 'biology'
+    bank_dir.mkdir(parents=True)
+    for tab in ('Unit1', 'Unit2'):
+        with open(bank_dir / f'{tab}.csv', 'w', newline='', encoding='utf-8') as f:
+            csv.writer(f).writerows(QUIZ_ROWS if tab == 'Unit1' else QUIZ_ROWS[:2] + [
+                ['Ecology', f'{tab} question {i}?', f'Right {i}', f'Wrong {i}'] for i in range(4)])
+    os.environ.update(
+        FLASK_SECRET_KEY='test-secret',
+        SESSION_BACKEND='memory',
+        QUESTION_BANK_DIR=str(root / 'banks'),
+        ATTEMPT_STORE_PATH=str(root / 'attempts.db'),
+        ATTEMPT_FLUSH_INTERVAL='0.05',
+        PRECOMPILED_BANKS=str(root / 'banks.qmb'),
+        LOG_LEVEL='WARNING',
+    )
+    import app
+    return app
+
+
+@pytest.fixture
+def admin_client(quiz_app):
+    """A test client signed in as the quiz administrator."""
+    client = quiz_app.app.test_client()
+    with client.session_transaction() as session:
+        session['is_admin'] = True
+        session['email'] = quiz_app.ALLOWED_EMAIL
+    return client
+
+
+@pytest.fixture
+def app_attempts(quiz_app, tmp_path, monkeypatch):
+    """A fresh attempt store for the app, so a test only sees the attempts it makes."""
+    from attempt_store import AttemptStore
+    store = AttemptStore(str(tmp_path / 'attempts.db'), flush_interval=0.05)
+    monkeypatch.setattr(quiz_app, 'attempt_store', store)
+    yield store
+    store.close()
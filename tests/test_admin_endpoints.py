@@ -0,0 +1,49 @@
+import pytest
+
+
+@pytest.mark.parametrize('body, error', [
+    ({'spreadsheet_id': 'csv:biology', 'tabs': 'Unit1'}, 'tabs must be a list of tab names'),
+    ({'spreadsheet_id': 'csv:biology', 'tabs': [1, 2]}, 'tabs must be a list of tab names'),
+    ({'spreadsheet_id': 'csv:biology', 'tabs': ['Unit1', None]}, 'tabs must be a list of tab names'),
+    ({'spreadsheet_id': 'csv:biology', 'tabs': {'Unit1': True}}, 'tabs must be a list of tab names'),
+    ({'spreadsheet_id': 42}, 'No spreadsheet_id provided'),
+    ({'tabs': ['Unit1']}, 'No spreadsheet_id provided'),
+    (['csv:biology'], 'Expected a JSON object'),
+])
+def test_warm_rejects_malformed_bodies(admin_client, body, error):
+    response = admin_client.post('/admin/cache/warm', json=body)
+    assert response.status_code == 400
+    assert response.get_json() == {'error': error}
+
+
+def test_warm_listed_and_all_tabs(admin_client):
+    data = admin_client.post('/admin/cache/warm', json={'spreadsheet_id': 'csv:biology', 'tabs': ['Unit2']}).get_json()
+    assert data['success'] and list(data['tabs']) == ['Unit2']
+    data = admin_client.post('/admin/cache/warm', json={'spreadsheet_id': 'csv:biology'}).get_json()
+    assert data['success'] and sorted(data['tabs']) == ['Unit1', 'Unit2']
+    assert data['tabs']['Unit1']['questions'] == 6
+
+
+@pytest.mark.parametrize('body, error', [
+    ({'spreadsheet_id': 'csv:biology', 'tabs': 'Unit1'}, 'tabs must be a list of tab names'),
+    ({'spreadsheet_id': 'csv:biology', 'tabs': [['Unit1']]}, 'tabs must be a list of tab names'),
+    ({'spreadsheet_id': 'csv:biology', 'tab_name': ['Unit1']}, 'tab_name must be a tab name'),
+    ({'spreadsheet_id': 'csv:biology'}, 'Provide spreadsheet_id and tab_name or tabs'),
+    ({'spreadsheet_id': ['csv:biology'], 'tabs': ['Unit1']}, 'No spreadsheet_id provided'),
+    ({'spreadsheet_id': 'csv:biology', 'tabs': ['Unit1'], 'priority': '1'},
+     'priority must be an integer (lower runs first)'),
+    ('csv:biology', 'Expected a JSON object'),
+])
+def test_prewarm_rejects_malformed_bodies(admin_client, body, error):
+    response = admin_client.post('/admin/prewarm', json=body)
+    assert response.status_code == 400
+    assert response.get_json() == {'error': error}
+
+
+def test_prewarm_queues_tabs(admin_client):
+    response = admin_client.post('/admin/prewarm', json={'spreadsheet_id': 'csv:biology', 'tab_name': 'Unit1'})
+    assert response.status_code == 202
+    assert list(response.get_json()['tabs']) == ['Unit1']
+    response = admin_client.post('/admin/prewarm', json={'spreadsheet_id': 'csv:biology', 'tabs': ['Unit1', 'Unit2']})
+    assert response.status_code == 202
+    assert list(response.get_json()['tabs']) == ['Unit1', 'Unit2']
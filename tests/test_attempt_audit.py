@@ -0,0 +1,75 @@
+import logging
+
+import pytest
+
+
+@pytest.fixture
+def started(caplog):
+    """Records of the app's "Started attempt" lines (its logger does not propagate to the root)."""
+    logger = logging.getLogger('quizmaker')
+    logger.addHandler(caplog.handler)
+    level = logger.level
+    logger.setLevel(logging.INFO)
+    yield lambda: [record for record in caplog.records if record.getMessage() == 'Started attempt']
+    logger.setLevel(level)
+    logger.removeHandler(caplog.handler)
+
+
+def start(client, url):
+    """Start a quiz and answer it through; returns the questions in the order they were shown."""
+    client.get(url)
+    shown = []
+    while True:
+        question = client.post('/get_question').get_json()
+        if question.get('complete'):
+            return shown
+        shown.append((question['question'], question['answers']))
+        client.post('/check_answer', json={'answer': question['answers'][0]})
+
+
+def latest_attempt(quiz_app, started):
+    quiz_app.attempt_store.flush()
+    return started()[-1]
+
+
+def rebuilt(response):
+    assert response.status_code == 200, response.get_json()
+    return [(item['question'], item['answers']) for item in response.get_json()['questions']]
+
+
+def test_recorded_attempt_is_rebuilt_from_its_id(quiz_app, app_attempts, admin_client, started):
+    client = quiz_app.app.test_client()
+    shown = start(client, '/quiz/csv:biology?tabs=Unit1,Unit2&sections=Cells,Ecology&count=5')
+    record = latest_attempt(quiz_app, started)
+    assert record.sections == ['Cells', 'Ecology']
+    assert record.count == 5
+    data = admin_client.get(f'/admin/attempt/{record.attempt_id}').get_json()
+    assert data['seed'] == record.seed
+    assert data['tabs'] == ['Unit1', 'Unit2']
+    assert [(item['question'], item['answers']) for item in data['questions']] == shown
+    # The same attempt from the values in the log line
+    assert rebuilt(admin_client.get(
+        f'/admin/attempt/csv:biology/{record.seed}?tabs=Unit1,Unit2&sections=Cells,Ecology&count=5'
+        f'&version={record.bank_version}')) == shown
+
+
+def test_attempt_is_rebuilt_on_the_version_it_started_on(quiz_app, app_attempts, admin_client, started):
+    client = quiz_app.app.test_client()
+    shown = start(client, '/quiz/csv:biology/Unit1')
+    record = latest_attempt(quiz_app, started)
+    # A newer version of the tab replaces the cached one; the attempt's version is still retained
+    original = quiz_app.bank_cache.peek(('csv:biology', 'Unit1'))
+    edited = quiz_app.compile_bank([[]] * 2 + [[question.section, question.text + ' (edited)', *question.answers]
+                                               for question in original.questions])
+    quiz_app.bank_cache.put(('csv:biology', 'Unit1'), edited)
+    try:
+        assert rebuilt(admin_client.get(f'/admin/attempt/{record.attempt_id}')) == shown
+        response = admin_client.get(f'/admin/attempt/csv:biology/Unit1/{record.seed}?version=unknown')
+        assert response.status_code == 409
+        assert response.get_json()['current_version'] == edited.version
+    finally:
+        quiz_app.bank_cache.put(('csv:biology', 'Unit1'), original)
+
+
+def test_unknown_attempt(admin_client):
+    assert admin_client.get('/admin/attempt/0123456789abcdef').status_code == 404
@@ -0,0 +1,148 @@
+import sqlite3
+
+import pytest
+
+from attempt_store import AttemptStore, question_key
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = AttemptStore(str(tmp_path / 'attempts.db'), batch_size=50, flush_interval=0.05)
+    yield store
+    store.close()
+
+
+def answer(store, attempt_id, position, given, correct_answer='Paris', question='Capital of France?'):
+    return store.record_answer(attempt_id, 'sheet', position, question, correct_answer, given,
+                               given == correct_answer)
+
+
+def rows(store, sql, *params):
+    conn = sqlite3.connect(store.path)
+    try:
+        return conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+
+
+def test_events_are_written_in_batches(store):
+    store.record_start('a1', 'sheet', 'Unit1', 'v1', 120)
+    for position in range(120):
+        answer(store, 'a1', position, 'Paris', question=f'Question {position}?')
+    assert store.flush()
+    stats = store.stats()
+    assert stats['written'] == 121
+    assert 3 <= stats['batches'] <= 4  # 121 events, at most 50 per transaction
+    assert stats['queue_depth'] == 0
+    assert rows(store, 'SELECT answered, score, completed IS NOT NULL FROM attempts') == [(120, 120, 1)]
+
+
+def test_repeated_answer_is_counted_once(store):
+    store.record_start('a1', 'sheet', 'Unit1', 'v1', 2)
+    answer(store, 'a1', 0, 'Lyon')
+    store.flush()
+    answer(store, 'a1', 0, 'Paris')  # A retried request for the same position
+    store.flush()
+    assert store.stats()['ignored'] == 1
+    assert rows(store, 'SELECT position, answer FROM answers') == [(0, 'Lyon')]
+    stats = store.question_stats('sheet')[question_key('Capital of France?')]
+    assert (stats['answered'], stats['correct']) == (1, 0)
+
+
+def test_statistics_accumulate_across_batches(store):
+    for attempt, given in enumerate(['Paris', 'Lyon', 'Lyon', 'Nice']):
+        store.record_start(f'a{attempt}', 'sheet', 'Unit1', 'v1', 1)
+        answer(store, f'a{attempt}', 0, given)
+        store.flush()
+    stats = store.question_stats('sheet', ['Capital of France?', 'Never answered?'])
+    assert list(stats) == [question_key('Capital of France?')]
+    item = stats[question_key('Capital of France?')]
+    assert item['answered'] == 4
+    assert item['correct'] == 1
+    assert item['correct_answer'] == 'Paris'
+    assert item['wrong_answers'] == {'Lyon': 2, 'Nice': 1}
+    assert store.attempt_summary('sheet', 'Unit1') == {'started': 4, 'completed': 4, 'mean_percentage': 25.0}
+    assert store.attempt_summary('sheet', 'Unit2')['started'] == 0
+
+
+def test_attempt_records_how_to_rebuild_it(store):
+    store.record_start('a1', 'sheet', ['Unit1', 'Unit2'], 'v1', 5, seed=2 ** 62 + 1, sections=['Cells', 'Genes'],
+                       count=5)
+    store.record_start('a2', 'sheet', 'Unit1', 'v1', 3)
+    store.flush()
+    assert rows(store, 'SELECT id, tabs, seed, sections, count FROM attempts ORDER BY id') == [
+        ('a1', 'Unit1,Unit2', 2 ** 62 + 1, 'Cells,Genes', 5), ('a2', 'Unit1', None, None, None)]
+
+
+def test_columns_are_added_to_an_older_database(tmp_path):
+    path = str(tmp_path / 'attempts.db')
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE attempts (id TEXT PRIMARY KEY, spreadsheet_id TEXT NOT NULL, tabs TEXT NOT NULL, '
+                 'bank_version TEXT, mode TEXT NOT NULL, total INTEGER NOT NULL, answered INTEGER NOT NULL '
+                 'DEFAULT 0, score INTEGER NOT NULL DEFAULT 0, started REAL NOT NULL, updated REAL NOT NULL, '
+                 'completed REAL)')
+    conn.close()
+    store = AttemptStore(path)
+    store.record_start('a1', 'sheet', 'Unit1', 'v1', 3, seed=7)
+    store.close()
+    assert rows(store, 'SELECT seed FROM attempts') == [(7,)]
+
+
+def test_close_writes_what_is_queued(tmp_path):
+    store = AttemptStore(str(tmp_path / 'attempts.db'), batch_size=1000, flush_interval=60)
+    store.record_start('a1', 'sheet', 'Unit1', 'v1', 1)
+    answer(store, 'a1', 0, 'Paris')
+    store.close()
+    assert store.stats()['written'] == 2
+    assert rows(store, 'SELECT score FROM attempts') == [(1,)]
+    assert not answer(store, 'a1', 1, 'Paris')  # Ignored once closed
+
+
+def test_full_queue_drops_events(tmp_path):
+    store = AttemptStore(str(tmp_path / 'attempts.db'), flush_interval=60, max_queue=2)
+    try:
+        assert store.record_start('a1', 'sheet', 'Unit1', 'v1', 3)
+        assert answer(store, 'a1', 0, 'Paris')
+        assert not answer(store, 'a1', 1, 'Paris')
+        assert store.stats()['dropped'] == 1
+    finally:
+        store.close()
+
+
+def test_writer_survives_a_malformed_event(store):
+    store._put(('answer', 'a1', 'sheet'))  # Too short to unpack
+    store.flush()
+    store.record_start('a2', 'sheet', 'Unit1', 'v1', 1)
+    answer(store, 'a2', 0, 'Paris')
+    assert store.flush()
+    stats = store.stats()
+    assert stats['failed_batches'] == 1
+    assert stats['lost'] == 1
+    assert rows(store, 'SELECT id, score FROM attempts') == [('a2', 1)]
+
+
+def test_admin_analytics_lists_hardest_questions_first(quiz_app, app_attempts, admin_client):
+    client = quiz_app.app.test_client()
+    for _ in range(3):
+        client.get('/quiz/csv:biology/Unit1')
+        for _ in range(6):
+            question = client.post('/get_question').get_json()
+            # Right only on the DNA question, so it is the easiest
+            given = 'Nucleus' if question['question'] == 'Holds the DNA?' else 'Nothing'
+            client.post('/check_answer', json={'answer': given})
+    app_attempts.flush()
+    data = admin_client.get('/admin/analytics/csv:biology/Unit1').get_json()
+    assert data['attempts'] == {'started': 3, 'completed': 3, 'mean_percentage': 16.7}
+    assert data['total_questions'] == 6
+    questions = data['questions']
+    assert questions[-1]['question'] == 'Holds the DNA?'
+    assert questions[-1]['correct_rate'] == 1.0
+    hardest = questions[0]
+    assert hardest['correct_rate'] == 0.0
+    assert hardest['answers'][0]['correct']
+    assert {'answer': 'Nothing', 'correct': False, 'picks': hardest['answered'], 'share': 1.0} in hardest['answers']
+
+
+def test_admin_analytics_requires_admin(quiz_app):
+    response = quiz_app.app.test_client().get('/admin/analytics/csv:biology/Unit1')
+    assert response.status_code == 302
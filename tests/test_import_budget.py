@@ -0,0 +1,12 @@
+import os
+import subprocess
+import sys
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_app_import_stays_within_budget():
+    """bench/import_budget.py with its default budgets, as CI would run it."""
+    result = subprocess.run([sys.executable, os.path.join(REPO, 'bench', 'import_budget.py'), '--top', '15'],
+                            cwd=REPO, capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stdout + result.stderr
@@ -0,0 +1,34 @@
+from question_bank import compile_bank
+
+HEADER = [['Section', 'Question', 'Answer', 'Wrong 1'], ['', '', '', '']]
+
+
+def rows(*questions):
+    return HEADER + [['Unit 1', text, 'Yes', 'No'] for text in questions]
+
+
+def test_unchanged_tab_returns_previous_bank():
+    bank = compile_bank(rows('A?', 'B?'))
+    assert compile_bank(rows('A?', 'B?'), previous=bank) is bank
+
+
+def test_unchanged_tab_with_duplicate_rows_returns_previous_bank():
+    bank = compile_bank(rows('A?', 'B?', 'A?', 'A?'))
+    assert [question.row for question in bank.questions] == [3, 4, 5, 6]
+    assert compile_bank(rows('A?', 'B?', 'A?', 'A?'), previous=bank) is bank
+
+
+def test_duplicate_rows_keep_their_own_row_numbers():
+    bank = compile_bank(rows('A?', 'B?', 'A?'))
+    updated = compile_bank(rows('C?', 'A?', 'B?', 'A?'), previous=bank)
+    assert [question.row for question in updated.questions] == [3, 4, 5, 6]
+    assert updated.questions[1] == bank.questions[0]._replace(row=4)
+    assert updated.questions[3] == bank.questions[2]._replace(row=6)
+    assert updated.diagnostics['recompiled_rows'] == 1
+
+
+def test_extra_duplicate_is_compiled():
+    bank = compile_bank(rows('A?', 'A?'))
+    updated = compile_bank(rows('A?', 'A?', 'A?'), previous=bank)
+    assert [question.row for question in updated.questions] == [3, 4, 5]
+    assert updated.diagnostics['recompiled_rows'] == 1
@@ -0,0 +1,100 @@
+import csv
+import json
+import sqlite3
+
+import pytest
+
+from question_bank import compile_bank
+from question_sources import (SQLITE_COLUMNS, CSVSource, JSONLSource, SQLiteSource, SourceError, import_rows,
+                              open_source)
+
+HEADER = [['Section', 'Question', 'Correct', 'Wrong 1', 'Wrong 2', 'Wrong 3'], ['', '', '', '', '', '']]
+QUESTIONS = [
+    ['Cells', 'Powerhouse of the cell?', 'Mitochondria', 'Nucleus', 'Ribosome'],
+    ['', 'Unit of heredity?', 'Gene', 'Cell', 'Atom', 'Organ'],
+    ['Cells', 'No wrong answers?', 'Yes'],
+]
+
+
+@pytest.fixture
+def bank_dir(tmp_path):
+    (tmp_path / 'biology').mkdir()
+    with open(tmp_path / 'biology' / 'Unit1.csv', 'w', newline='', encoding='utf-8-sig') as f:
+        csv.writer(f).writerows(HEADER + QUESTIONS)
+    with open(tmp_path / 'biology' / 'Unit1.jsonl', 'w', encoding='utf-8') as f:
+        f.write(json.dumps(QUESTIONS[0]) + '\n\n')
+        f.write(json.dumps({'question': QUESTIONS[1][1], 'correct': 'Gene', 'wrong': QUESTIONS[1][3:]}) + '\n')
+        f.write(json.dumps({'section': 'Cells', 'question': QUESTIONS[2][1], 'correct': 'Yes'}) + '\n')
+        f.write('not json\n')
+    (tmp_path / 'biology' / 'notes.txt').write_text('not a tab')
+    assert import_rows(HEADER + QUESTIONS, str(tmp_path / 'biology.db'), 'Unit1', header_rows=2) == 3
+    return str(tmp_path)
+
+
+def test_csv_source(bank_dir):
+    source = open_source('csv:biology', bank_dir)
+    assert isinstance(source, CSVSource)
+    assert source.tabs() == ['Unit1']
+    rows = list(source.rows('Unit1'))
+    assert rows[0] == HEADER[0]  # The byte order mark is dropped
+    assert rows[2:] == QUESTIONS
+
+
+def test_jsonl_source(bank_dir):
+    source = open_source('jsonl:biology', bank_dir)
+    assert isinstance(source, JSONLSource)
+    assert source.tabs() == ['Unit1']
+    assert list(source.rows('Unit1')) == [QUESTIONS[0], [], ['', *QUESTIONS[1][1:]], QUESTIONS[2], []]
+
+
+def test_sqlite_source(bank_dir):
+    source = open_source('sqlite:biology', bank_dir)
+    assert isinstance(source, SQLiteSource)
+    assert source.tabs() == ['Unit1']
+    width = len(SQLITE_COLUMNS)
+    assert list(source.rows('Unit1')) == [(row + [''] * width)[:width] for row in QUESTIONS]
+
+
+def test_import_replaces_the_table_without_extra_indexes(bank_dir):
+    path = f'{bank_dir}/biology.db'
+    assert import_rows(QUESTIONS[:1], path, 'Unit1') == 1
+    assert [row[0] for row in SQLiteSource(path).rows('Unit1')] == ['Cells']
+    conn = sqlite3.connect(path)
+    try:
+        assert conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'index'").fetchone() == (0,)
+    finally:
+        conn.close()
+
+
+@pytest.mark.parametrize('scheme', ['csv', 'jsonl', 'sqlite'])
+def test_sources_compile_to_the_same_bank(bank_dir, scheme):
+    source = open_source(f'{scheme}:biology', bank_dir)
+    bank = compile_bank(source.rows('Unit1'), source.header_rows)
+    assert [question.text for question in bank.questions] == ['Powerhouse of the cell?', 'Unit of heredity?']
+    assert bank.diagnostics['reasons']['no_wrong_answers']['count'] == 1
+    assert bank.version == compile_bank(HEADER + QUESTIONS).version
+
+
+@pytest.mark.parametrize('scheme', ['csv', 'jsonl', 'sqlite'])
+def test_missing_tab(bank_dir, scheme):
+    with pytest.raises(SourceError, match='No tab'):
+        list(open_source(f'{scheme}:biology', bank_dir).rows('Unit9'))
+
+
+@pytest.mark.parametrize('scheme', ['csv', 'jsonl', 'sqlite'])
+def test_missing_bank(bank_dir, scheme):
+    with pytest.raises(SourceError):
+        open_source(f'{scheme}:chemistry', bank_dir).tabs()
+
+
+@pytest.mark.parametrize('name', ['../biology', 'Unit1"; DROP TABLE x; --', '.hidden'])
+def test_unsafe_names_are_rejected(bank_dir, name):
+    with pytest.raises(SourceError, match='Invalid'):
+        list(open_source('sqlite:biology', bank_dir).rows(name))
+    with pytest.raises(SourceError, match='Invalid'):
+        open_source(f'csv:{name}', bank_dir)
+
+
+def test_spreadsheet_ids_are_sheets_sources(bank_dir):
+    assert type(open_source('1AbC-def_ghI', bank_dir)).__name__ == 'SheetsSource'
+    assert type(open_source('ftp:biology', bank_dir)).__name__ == 'SheetsSource'
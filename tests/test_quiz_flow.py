@@ -0,0 +1,8 @@
+def test_answer_and_next_returns_only_the_next_question_by_default(quiz_app):
+    client = quiz_app.app.test_client()
+    client.get('/quiz/csv:biology/Unit1')
+    question = client.post('/get_question').get_json()
+    data = client.post('/answer_and_next', json={'answer': question['answers'][0]}).get_json()
+    assert [item['current'] for item in data['next']] == [2]
+    data = client.post('/answer_and_next', json={'answer': question['answers'][0], 'prefetch': 3}).get_json()
+    assert [item['current'] for item in data['next']] == [3, 4, 5]
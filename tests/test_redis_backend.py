@@ -0,0 +1,108 @@
+import time
+
+import pytest
+
+from fake_redis import FakeRedis, serve
+from session_backends import RedisError, RedisProtocolCache, RedisProtocolError
+
+
+@pytest.fixture
+def redis():
+    """A FakeRedis stand-in served on a free port; its server is in .server."""
+    redis = FakeRedis(password='secret')
+    redis.server = serve(redis)
+    yield redis
+    redis.server.shutdown()
+
+
+@pytest.fixture
+def cache(redis):
+    return RedisProtocolCache(f'redis://:secret@127.0.0.1:{redis.server.server_address[1]}/2', default_timeout=60)
+
+
+def test_get_set_delete(cache):
+    assert cache.get('session:a') is None
+    assert cache.set('session:a', {'score': 3, 'answers': ['b']})
+    assert cache.get('session:a') == {'score': 3, 'answers': ['b']}
+    assert cache.has('session:a')
+    assert cache.delete('session:a')
+    assert not cache.has('session:a')
+    assert not cache.delete('session:a')
+    assert cache.ping()
+
+
+def test_add_only_sets_missing_keys(cache):
+    assert cache.add('session:a', 1)
+    assert not cache.add('session:a', 2)
+    assert cache.get('session:a') == 1
+    cache.set('session:a', 3)
+    assert cache.get('session:a') == 3
+
+
+def test_keys_expire(cache):
+    cache.set('short', 'x', timeout=1)
+    cache.set('forever', 'y', timeout=0)
+    assert cache.get('short') == 'x'
+    time.sleep(1.1)
+    assert cache.get('short') is None
+    assert cache.get('forever') == 'y'
+
+
+def test_uses_the_database_in_the_url(redis, cache):
+    cache.set('session:a', 1)
+    other = RedisProtocolCache(f'redis://:secret@127.0.0.1:{redis.server.server_address[1]}/0')
+    assert other.get('session:a') is None
+
+
+def test_dropped_pooled_connection_is_replaced(redis, cache):
+    cache.set('session:a', 1)
+    assert len(cache._pool) == 1
+    assert redis.server.drop_connections() == 1
+    time.sleep(0.05)  # Let the server finish closing its side
+    assert cache.get('session:a') == 1
+    assert cache.set('session:b', 2)
+    assert len(cache._pool) == 1
+    # AUTH and SELECT again on the new connection
+    assert redis.commands['AUTH'] == 2
+    assert redis.commands['SELECT'] == 2
+
+
+def test_unreachable_server_raises(redis, cache):
+    cache.set('session:a', 1)
+    redis.server.drop_connections()
+    redis.server.shutdown()
+    redis.server.server_close()
+    with pytest.raises(OSError):
+        cache.get('session:a')
+    assert cache._pool == []
+
+
+def test_error_reply_keeps_the_connection(redis, cache):
+    cache.set('session:a', 1)
+    with pytest.raises(RedisError, match='unknown command'):
+        cache._execute('BOGUS')
+    assert len(cache._pool) == 1
+    assert cache.get('session:a') == 1
+    assert len(redis.server.connections) == 1
+
+
+def test_protocol_error_closes_the_connection(redis, cache):
+    execute = redis.execute
+    # A reply with a stray line after it leaves the client's next read out of step
+    redis.execute = lambda client, args: 'OK\r\n?garbage' if args[0] == b'SET' else execute(client, args)
+    assert cache.set('session:a', 1)
+    redis.execute = execute
+    with pytest.raises(RedisProtocolError):
+        cache.get('session:a')
+    assert cache._pool == []
+    assert cache.get('session:a') is None  # The SET never reached the store
+    assert len(cache._pool) == 1
+
+
+def test_failed_authentication_closes_the_connection(redis):
+    cache = RedisProtocolCache(f'redis://:wrong@127.0.0.1:{redis.server.server_address[1]}/0')
+    with pytest.raises(RedisError, match='WRONGPASS'):
+        cache.get('session:a')
+    assert cache._pool == []
+    time.sleep(0.05)
+    assert not redis.server.connections
@@ -0,0 +1,45 @@
+import time
+
+import pytest
+from googleapiclient.errors import HttpError
+
+from fake_sheets import fake_credentials
+from resilience import CircuitBreaker, CircuitOpenError, RateLimitExceeded, TokenBucket, UpstreamGuard
+from sheets_client import SheetsClient, classify_error
+
+RESET = 0.2
+
+
+def read(client):
+    return client.execute(lambda api: api.values().get(spreadsheetId='s', range='Sheet1'))
+
+
+def test_rate_limited_trial_does_not_wedge_half_open_breaker(sheets):
+    # One token at a time, refilled every 0.1 s, and no queueing for one
+    bucket = TokenBucket(10, burst=1, max_wait=0)
+    guard = UpstreamGuard(classify_error, bucket=bucket, breaker=CircuitBreaker(1, reset_timeout=RESET), max_retries=0)
+    client = SheetsClient(fake_credentials(sheets.url + 'token'), api_endpoint=sheets.url, guard=guard)
+    assert read(client)['values']
+
+    time.sleep(0.15)
+    sheets.fail_next(1, 503)
+    with pytest.raises(HttpError):
+        read(client)
+    assert guard.breaker.state() == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        read(client)
+
+    # The half-open trial is refused by the bucket before it reaches the API
+    time.sleep(RESET + 0.05)
+    bucket.acquire()
+    with pytest.raises(RateLimitExceeded):
+        read(client)
+    assert guard.breaker.state() == CircuitBreaker.HALF_OPEN
+
+    # Once the bucket refills, the next caller gets to probe and closes the breaker
+    time.sleep(0.15)
+    calls = sheets.calls['values.get']
+    assert read(client)['values']
+    assert sheets.calls['values.get'] == calls + 1
+    assert guard.breaker.state() == CircuitBreaker.CLOSED
+    assert guard.stats()['rate_limit_rejections'] == 1
@@ -0,0 +1,42 @@
+from flask import Flask, jsonify
+
+from response_policy import ResponsePolicy, cache_control
+
+
+def make_app():
+    app = Flask(__name__)
+    ResponsePolicy(app)
+
+    @app.route('/tabs/<name>')
+    @cache_control('private, max-age=60', etag=True)
+    def tabs(name):
+        if name == 'missing':
+            return jsonify({'error': 'No such spreadsheet'}), 404
+        if name == 'down':
+            response = jsonify({'error': 'Unavailable, retry shortly'})
+            response.headers['Retry-After'] = '5'
+            return response, 503
+        return jsonify({'tabs': ['Sheet1']})
+
+    @app.route('/attempt')
+    def attempt():
+        return jsonify({'score': 1})
+
+    return app
+
+
+def test_view_directive_only_applies_to_successful_responses():
+    client = make_app().test_client()
+    ok = client.get('/tabs/good')
+    assert ok.headers['Cache-Control'] == 'private, max-age=60'
+    assert client.get('/tabs/good', headers={'If-None-Match': ok.headers['ETag']}).status_code == 304
+
+    for name, status in (('missing', 404), ('down', 503)):
+        response = client.get(f'/tabs/{name}')
+        assert response.status_code == status
+        assert response.headers['Cache-Control'] == 'no-store'
+        assert 'ETag' not in response.headers
+
+
+def test_views_without_a_directive_are_not_stored():
+    assert make_app().test_client().get('/attempt').headers['Cache-Control'] == 'no-store'
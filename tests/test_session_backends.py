@@ -0,0 +1,112 @@
+import time
+from datetime import timedelta
+
+import pytest
+
+import session_backends
+from session_backends import MemoryLRUCache, SQLiteCache, create_session_cache
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def cache(request, tmp_path):
+    if request.param == 'memory':
+        return MemoryLRUCache(max_entries=100, default_timeout=60)
+    return SQLiteCache(str(tmp_path / 'sessions.db'), default_timeout=60)
+
+
+def test_get_set_add_delete(cache):
+    assert cache.get('session:a') is None
+    assert cache.set('session:a', {'score': 3, 'wrong': [[1, 'b']]})
+    assert cache.get('session:a') == {'score': 3, 'wrong': [[1, 'b']]}
+    assert not cache.add('session:a', {})
+    assert cache.add('session:b', {'score': 0})
+    assert cache.has('session:b')
+    assert cache.delete('session:b')
+    assert not cache.delete('session:b')
+    assert not cache.has('session:b')
+    cache.clear()
+    assert cache.get('session:a') is None
+
+
+def test_expired_entries_are_hidden_then_swept(cache):
+    cache.set('short', 1, timeout=1)
+    cache.set('forever', 2, timeout=0)
+    cache.set('long', 3)
+    assert cache.sweep() == 0
+    time.sleep(1.1)
+    assert not cache.has('short')
+    assert cache.get('short') is None
+    cache.set('short2', 4, timeout=1)
+    time.sleep(1.1)
+    assert cache.sweep() in (1, 2)  # memory get() above already removed 'short'
+    assert cache.get('forever') == 2
+    assert cache.get('long') == 3
+
+
+def test_expired_key_can_be_added_again(cache):
+    cache.set('session:a', 1, timeout=1)
+    time.sleep(1.1)
+    assert cache.add('session:a', 2)
+    assert cache.get('session:a') == 2
+
+
+def test_memory_cache_evicts_least_recently_used():
+    cache = MemoryLRUCache(max_entries=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+    assert cache.get('b') is None
+    assert (cache.get('a'), cache.get('c')) == (1, 3)
+
+
+def test_sqlite_sessions_are_shared_between_instances(tmp_path):
+    path = str(tmp_path / 'sessions.db')
+    SQLiteCache(path).set('session:a', 1)
+    assert SQLiteCache(path).get('session:a') == 1
+
+
+def stored(cache, key):
+    if isinstance(cache, MemoryLRUCache):
+        return key in cache._data
+    return cache._conn().execute('SELECT COUNT(*) FROM sessions WHERE key = ?', (key,)).fetchone()[0] > 0
+
+
+@pytest.mark.parametrize('backend', ['memory', 'sqlite'])
+def test_sweeper_removes_expired_sessions(backend, tmp_path):
+    cache = create_session_cache({
+        'SESSION_BACKEND': backend,
+        'PERMANENT_SESSION_LIFETIME': timedelta(seconds=1),
+        'SESSION_MEMORY_MAX_ENTRIES': 100,
+        'SESSION_SQLITE_PATH': str(tmp_path / 'sessions.db'),
+        'SESSION_SWEEP_INTERVAL': 0.2,
+    })
+    cache.set('session:a', 1)
+    cache.set('session:b', 2, timeout=0)
+    deadline = time.monotonic() + 5
+    while stored(cache, 'session:a'):  # Checked without get(), which would drop it itself
+        assert time.monotonic() < deadline, 'the sweeper did not remove the expired session'
+        time.sleep(0.1)
+    assert cache.get('session:b') == 2
+
+
+def test_sweeper_survives_a_failed_sweep():
+    calls = []
+
+    class FlakyCache:
+        def sweep(self):
+            calls.append(time.monotonic())
+            if len(calls) == 1:
+                raise OSError('disk full')
+            if len(calls) == 3:
+                raise SystemExit  # Ends the loop
+            return 1
+
+    with pytest.raises(SystemExit):
+        session_backends._sweep_forever(FlakyCache(), 0)
+    assert len(calls) == 3
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError, match='Unknown SESSION_BACKEND'):
+        create_session_cache({'SESSION_BACKEND': 'mongo', 'PERMANENT_SESSION_LIFETIME': timedelta(hours=1)})
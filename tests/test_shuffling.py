@@ -0,0 +1,52 @@
+import pytest
+
+from shuffling import AttemptOrder, Permutation
+
+# chi-square critical values at p = 0.001; a uniform order exceeds them once in a thousand seed sets
+CRITICAL = {7: 24.32, 11: 31.26, 19: 43.82}
+SEEDS = range(1, 40001)
+
+
+def chi_square(counts, expected):
+    return sum((count - expected) ** 2 / expected for count in counts)
+
+
+@pytest.mark.parametrize('n', [1, 2, 3, 7, 8, 100, 1000])
+def test_permutation_is_bijective(n):
+    for seed in (0, 1, 2 ** 62):
+        order = list(Permutation(n, seed))
+        assert sorted(order) == list(range(n))
+        assert [Permutation(n, seed)[i] for i in range(n)] == order
+
+
+def test_permutation_rejects_out_of_range_positions():
+    with pytest.raises(IndexError):
+        Permutation(5, 1)[5]
+    with pytest.raises(IndexError):
+        Permutation(5, 1)[-1]
+
+
+@pytest.mark.parametrize('n', [8, 12, 20])
+def test_first_position_is_uniform(n):
+    counts = [0] * n
+    for seed in SEEDS:
+        counts[Permutation(n, seed)[0]] += 1
+    assert chi_square(counts, len(SEEDS) / n) < CRITICAL[n - 1]
+
+
+@pytest.mark.parametrize('n, k', [(8, 2), (12, 3), (20, 5)])
+def test_first_k_positions_are_a_uniform_sample(n, k):
+    counts = [0] * n
+    for seed in SEEDS:
+        order = Permutation(n, seed)
+        for position in range(k):
+            counts[order[position]] += 1
+    # Each question is included with probability k/n; positions are dependent, so this is conservative
+    assert chi_square(counts, len(SEEDS) * k / n) < CRITICAL[n - 1]
+
+
+def test_attempt_order_is_reproducible():
+    first, again = AttemptOrder(42, 30), AttemptOrder(42, 30)
+    assert [first.question_index(p) for p in range(30)] == [again.question_index(p) for p in range(30)]
+    assert first.arrange_answers(3, ['a', 'b', 'c', 'd']) == again.arrange_answers(3, ['a', 'b', 'c', 'd'])
+    assert sorted(first.arrange_answers(3, ['a', 'b', 'c', 'd'])) == ['a', 'b', 'c', 'd']
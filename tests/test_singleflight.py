@@ -0,0 +1,85 @@
+import threading
+import time
+
+import pytest
+from googleapiclient.errors import HttpError
+
+import sheets_client
+from bank_cache import BankCache
+from fake_sheets import fake_credentials
+from question_bank import compile_bank
+from question_sources import SheetsSource
+from resilience import UpstreamGuard
+from sheets_client import SheetsClient, classify_error
+
+WAITERS = 20
+KEY = ('s', 'Sheet1')
+
+
+@pytest.fixture
+def client(sheets, monkeypatch):
+    # No retries or breaker, so every load makes exactly one API call
+    sheets.latency_ms = 200  # Long enough for every waiter to arrive while the fetch is in flight
+    client = SheetsClient(fake_credentials(sheets.url + 'token'), api_endpoint=sheets.url,
+                          guard=UpstreamGuard(classify_error, max_retries=0))
+    monkeypatch.setattr(sheets_client, '_client', client)
+    return client
+
+
+def load_bank():
+    return compile_bank(SheetsSource(KEY[0]).rows(KEY[1]))
+
+
+def get_concurrently(cache):
+    """get() KEY from WAITERS threads released at once; returns (results, errors)."""
+    start = threading.Barrier(WAITERS)
+    results = [None] * WAITERS
+    errors = [None] * WAITERS
+
+    def waiter(index):
+        start.wait()
+        try:
+            results[index] = cache.get(KEY, load_bank)
+        except Exception as e:
+            errors[index] = e
+
+    threads = [threading.Thread(target=waiter, args=(index,)) for index in range(WAITERS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, errors
+
+
+def test_cold_key_is_fetched_once_for_every_waiter(sheets, client):
+    cache = BankCache()
+    results, errors = get_concurrently(cache)
+    assert errors == [None] * WAITERS
+    assert sheets.calls['values.get'] == 1
+    bank = results[0]
+    assert bank is not None and len(bank.questions) == 5
+    assert all(result is bank for result in results)
+    stats = cache.stats()
+    assert stats['executions'] == 1 and stats['coalesced'] == WAITERS - 1
+
+
+def test_failed_load_reaches_every_waiter_and_is_suppressed(sheets, client):
+    cache = BankCache(failure_ttl=0.5)
+    sheets.outage = True
+    results, errors = get_concurrently(cache)
+    assert results == [None] * WAITERS
+    assert all(isinstance(error, HttpError) for error in errors)
+    assert sheets.calls['values.get'] == 1
+
+    # Within failure_ttl the failure is reported without another fetch
+    for _ in range(5):
+        with pytest.raises(HttpError):
+            cache.get(KEY, load_bank)
+    assert sheets.calls['values.get'] == 1
+    assert cache.stats()['suppressed_retries'] == 5
+
+    # Afterwards the next request tries the sheet again
+    sheets.outage = False
+    time.sleep(0.5)
+    assert cache.get(KEY, load_bank) is not None
+    assert sheets.calls['values.get'] == 2
@@ -0,0 +1,45 @@
+import os
+
+import pytest
+from flask import url_for
+
+from static_assets import IMMUTABLE
+
+
+@pytest.fixture
+def client(quiz_app):
+    return quiz_app.app.test_client()
+
+
+def test_url_for_resolves_to_the_built_asset(quiz_app):
+    manifest = quiz_app.static_assets.manifest
+    assert set(manifest) >= {'quiz.js', 'quiz.css', 'admin.js', 'admin.css', 'style.css'}
+    with quiz_app.app.test_request_context():
+        for source, built in manifest.items():
+            assert url_for('static', filename=source) == f'/static/{built}'
+            assert os.path.isfile(os.path.join(quiz_app.app.static_folder, built))
+        assert url_for('static', filename='robots.txt') == '/static/robots.txt'
+
+
+def test_built_assets_are_immutable(quiz_app, client):
+    with quiz_app.app.test_request_context():
+        url = url_for('static', filename='quiz.js')
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == IMMUTABLE
+    response.close()
+
+
+def test_source_names_redirect_to_the_current_build(quiz_app, client):
+    response = client.get('/static/style.css')
+    assert response.status_code == 302
+    assert response.headers['Location'] == f"/static/{quiz_app.static_assets.manifest['style.css']}"
+    assert response.headers['Cache-Control'] == 'no-cache'
+    response = client.get('/static/style.css', follow_redirects=True)
+    assert response.status_code == 200
+    assert response.mimetype == 'text/css'
+    response.close()
+
+
+def test_unknown_static_files_are_still_missing(client):
+    assert client.get('/static/missing.css').status_code == 404